@@ -1,57 +1,17 @@
 #!/bin/bash
-# Run MMS on all 4 languages in parallel
+# Run MMS on all 4 languages in ONE process:
+# the 1B base model is loaded once and only the language adapter is switched
 
 echo "======================================"
 echo "Starting MMS Processing - All Languages"
 echo "======================================"
 
-# Function to process a language
-process_language() {
-    local lang=$1
-    local lang_name=$2
-    
-    echo "Starting $lang_name ($lang)..."
-    
-    count=0
-    for file in data/wav/$lang/*.mp3; do
-        python scripts/run_mms.py \
-            --infile "$file" \
-            --hint-lang "$lang" \
-            --device cpu \
-            --save-json \
-            --outdir results/transcripts/hinted/mms
-        
-        count=$((count + 1))
-        if [ $((count % 100)) -eq 0 ]; then
-            echo "  $lang_name: Processed $count files..."
-        fi
-    done
-    
-    echo "✅ $lang_name completed: $count files"
-}
-
-# Export function for parallel execution
-export -f process_language
-
-# Run all 4 languages in parallel
-process_language mn "Mongolian" > mn_mms.log 2>&1 &
-process_language hu "Hungarian" > hu_mms.log 2>&1 &
-process_language es "Spanish" > es_mms.log 2>&1 &
-process_language fr "French" > fr_mms.log 2>&1 &
-
-echo ""
-echo "All 4 languages started in parallel!"
-echo "Monitor progress:"
-echo "  tail -f mn_mms.log"
-echo "  tail -f hu_mms.log"
-echo "  tail -f es_mms.log"
-echo "  tail -f fr_mms.log"
-echo ""
-echo "Check file counts:"
-echo "  ls results/transcripts/hinted/mms/*/*.json | wc -l"
-
-# Wait for all to complete
-wait
+python scripts/run_mms.py \
+    --in-dir data/wav \
+    --languages mn hu es fr \
+    --device cpu \
+    --save-json \
+    --outdir results/transcripts/hinted/mms 2>&1 | tee mms_all.log
 
 echo ""
 echo "======================================"
@@ -61,3 +21,4 @@ echo "  MN: $(ls results/transcripts/hinted/mms/mn/*.json 2>/dev/null | wc -l) f
 echo "  HU: $(ls results/transcripts/hinted/mms/hu/*.json 2>/dev/null | wc -l) files"
 echo "  ES: $(ls results/transcripts/hinted/mms/es/*.json 2>/dev/null | wc -l) files"
 echo "  FR: $(ls results/transcripts/hinted/mms/fr/*.json 2>/dev/null | wc -l) files"
+echo "  Adapter switch times: results/transcripts/hinted/mms/adapter_switch_times.json"
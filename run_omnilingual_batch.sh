@@ -11,34 +11,14 @@ echo "======================================"
 MODELS=("omniASR_CTC_300M" "omniASR_CTC_1B" "omniASR_LLM_1B")
 LANGUAGES=("mn" "hu" "es" "fr")
 
-for MODEL in "${MODELS[@]}"; do
-    echo ""
-    echo "======================================"
-    echo "Processing with $MODEL"
-    echo "======================================"
-    
-    for LANG in "${LANGUAGES[@]}"; do
-        echo ""
-        echo "--- Language: $LANG ---"
-        
-        count=0
-        for file in data/wav/$LANG/*.mp3; do
-            python scripts/run_omnilingual.py \
-                --infile "$file" \
-                --hint-lang "$LANG" \
-                --model "$MODEL" \
-                --save-json \
-                --outdir results/transcripts/hinted/omnilingual
-            
-            count=$((count + 1))
-            if [ $((count % 100)) -eq 0 ]; then
-                echo "  Processed $count files with $MODEL..."
-            fi
-        done
-        
-        echo "✅ $LANG completed: $count files with $MODEL"
-    done
-done
+# One process: each model is loaded once, files go through the pipeline in
+# duration-sorted batches with audio decoded ahead of the model
+python scripts/run_omnilingual_batch.py \
+    --models "${MODELS[@]}" \
+    --languages "${LANGUAGES[@]}" \
+    --audio-dir data/wav \
+    --output-dir results/transcripts/hinted/omnilingual \
+    --batch-size 8
 
 echo ""
 echo "======================================"
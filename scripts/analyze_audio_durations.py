@@ -4,19 +4,11 @@ Analyze audio file durations and group results by length buckets
 """
 
 import json
-import librosa
 from pathlib import Path
 import pandas as pd
 import argparse
 
-def get_duration(audio_file):
-    """Get audio duration in seconds"""
-    try:
-        duration = librosa.get_duration(path=str(audio_file))
-        return duration
-    except Exception as e:
-        print(f"Error reading {audio_file}: {e}")
-        return None
+from duration_index import durations
 
 def analyze_durations(audio_dir, results_dir, output_file):
     """Analyze audio durations and correlate with performance"""
@@ -44,12 +36,15 @@ def analyze_durations(audio_dir, results_dir, output_file):
         lang = lang_dir.name
         print(f"\nProcessing {lang.upper()}...")
         
-        for audio_file in sorted(lang_dir.glob("*.mp3")):
+        audio_files = sorted(lang_dir.glob("*.mp3"))
+        lang_durations = durations(audio_files)
+        for audio_file in audio_files:
             file_id = audio_file.stem
             
-            # Get duration
-            duration = get_duration(audio_file)
+            # Get duration (header-only, cached in the duration index)
+            duration = lang_durations[str(audio_file)]
             if duration is None:
+                print(f"Error reading {audio_file}")
                 continue
             
             # Determine bucket
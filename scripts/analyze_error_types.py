@@ -4,10 +4,11 @@ Analyze error types (insertion/deletion/substitution) from WER/CER results
 """
 
 import pandas as pd
-import jiwer
 from pathlib import Path
 import argparse
 
+from scoring import score_pair
+
 def analyze_error_types(results_csv, ref_dir, model_results_dir, output_file):
     """Analyze detailed error types"""
     
@@ -41,7 +42,7 @@ def analyze_error_types(results_csv, ref_dir, model_results_dir, output_file):
         
         # Calculate detailed measures
         try:
-            measures = jiwer.compute_measures(reference, hypothesis)
+            measures = score_pair(reference, hypothesis)
             
             error_data.append({
                 'file_id': file_id,
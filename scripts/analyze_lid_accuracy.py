@@ -9,15 +9,34 @@ from pathlib import Path
 import pandas as pd
 import re
 
+import results_store
+
 def extract_ground_truth_lang(filepath):
     """Extract language from file path (e.g., /es/ -> 'es')"""
     match = re.search(r'/(es|fr|hu|mn)/', filepath)
     return match.group(1) if match else None
 
 def load_lid_results(results_dir="results"):
-    """Load all LID→ASR JSON results"""
+    """Load all LID→ASR results (from the results store when it has data)"""
     results = []
     
+    if results_store.available():
+        df = results_store.load(['file', 'language', 'system', 'language_prob', 'fallback'],
+                                filters={'mode': 'lid2asr'})
+        for row in df.itertuples(index=False):
+            ground_truth = extract_ground_truth_lang(row.file)
+            if ground_truth and row.language != 'unk':
+                results.append({
+                    'file': Path(row.file).name,
+                    'ground_truth': ground_truth,
+                    'detected': row.language,
+                    'system': row.system or 'unknown',
+                    'lid_prob': row.language_prob,
+                    'fallback': row.fallback,
+                    'json_file': None
+                })
+        return results
+    
     # Look for lid2asr results
     json_files = glob.glob(f"{results_dir}/transcripts/lid2asr/**/*.json", recursive=True)
     
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 import argparse, os, json, time
-from faster_whisper import WhisperModel
+from model_registry import get_model
 
 LANGS = {"mn","hu","fr","es"}
 
@@ -10,6 +10,27 @@ def lang_hint_from_path(p):
         if pr in LANGS: return pr
     return None
 
+def transcribe_one(model, p, lang):
+    """Decode one file exactly once; text, segments and words all come from that pass"""
+    t0 = time.time()
+    segments, info = model.transcribe(p, language=lang, task="transcribe", word_timestamps=True)
+    segments = list(segments)  # generator: decoding happens here
+    dt = time.time()-t0
+
+    text = "".join(s.text for s in segments).strip()
+    side_segments = [
+        {"start": s.start, "end": s.end, "text": s.text,
+         "words": [{"start": w.start, "end": w.end, "word": w.word, "probability": w.probability}
+                   for w in (s.words or [])]}
+        for s in segments
+    ]
+    audio_sec = getattr(info, "duration", None)
+    return text, {
+        "file": p, "language_used": lang, "segments": side_segments,
+        "latency_sec": dt, "audio_sec": audio_sec,
+        "rtf": (dt/audio_sec) if audio_sec else None
+    }
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--mode", choices=["hinted"], default="hinted")
@@ -21,7 +42,7 @@ def main():
 
     os.makedirs(args.out, exist_ok=True)
     compute_type = "int8" if args.device=="cpu" else "float16"
-    model = WhisperModel(args.model, device=args.device, compute_type=compute_type)
+    model = get_model("whisper", args.model, args.device, compute_type)
 
     for root,_,files in os.walk(args.inp):
         for fn in files:
@@ -30,10 +51,8 @@ def main():
             lang = lang_hint_from_path(p)
             if not lang: continue
 
-            t0 = time.time()
-            segments, info = model.transcribe(p, language=lang, task="transcribe")
-            text = "".join(s.text for s in segments).strip()
-            dt = time.time()-t0
+            text, side = transcribe_one(model, p, lang)
+            side.update({"model": args.model, "device": args.device})
 
             base = os.path.splitext(os.path.basename(p))[0]
             out_txt_dir = os.path.join(args.out, lang, "txt")
@@ -41,11 +60,6 @@ def main():
             os.makedirs(out_txt_dir, exist_ok=True); os.makedirs(out_js_dir, exist_ok=True)
             with open(os.path.join(out_txt_dir, base + ".txt"), "w", encoding="utf-8") as f:
                 f.write(text)
-            side = {
-                "file": p, "language_used": lang,
-                "segments": [{"start": s.start, "end": s.end, "text": s.text} for s in model.transcribe(p, language=lang, task="transcribe")[0]],
-                "model": args.model, "device": args.device, "latency_sec": dt
-            }
             with open(os.path.join(out_js_dir, base + ".json"), "w", encoding="utf-8") as f:
                 json.dump(side, f, ensure_ascii=False, indent=2)
     print("ASR outputs →", args.out)
@@ -10,10 +10,12 @@ import sys
 import time
 from pathlib import Path
 
-import torch
-import soundfile as sf
-import numpy as np
-from transformers import Wav2Vec2ForCTC, Wav2Vec2Processor
+from model_registry import get_model
+import ctc_batch
+import audio_loader
+import results_store
+import run_shard
+from run_wav2vec2 import LANG_MODELS as XLSR53_MODELS
 
 
 # Language-specific fine-tuned models
@@ -24,6 +26,13 @@ LANG_MODELS = {
     "es": "jonatasgrosman/wav2vec2-large-xlsr-53-spanish",
 }
 
+# --model-set: the fine-tuned checkpoints above, or the facebook XLSR-53
+# checkpoints run_wav2vec2.py evaluates (run_full_evaluation.sh baseline)
+MODEL_SETS = {
+    "finetuned": LANG_MODELS,
+    "xlsr-53": XLSR53_MODELS,
+}
+
 # Language codes mapping
 LANG_MAP = {
     "mn": "mongolian",  # Mongolian
@@ -36,28 +45,24 @@ LANG_MAP = {
 class Wav2Vec2ASR:
     """Wav2Vec2-XLS-R ASR wrapper with language-specific models"""
     
-    def __init__(self, language="hu", device="cpu"):
+    def __init__(self, language="hu", device="cpu", chunk_sec=20.0, stride_sec=2.0, model_set="finetuned"):
         self.device = device
         self.language = language
+        # Long inputs are split into chunk_sec windows with stride_sec context (ctc_batch.py)
+        self.chunk_sec = chunk_sec
+        self.stride_sec = stride_sec
         
         # Get language-specific model
-        if language not in LANG_MODELS:
-            raise ValueError(f"Language '{language}' not supported. Available: {list(LANG_MODELS.keys())}")
+        models = MODEL_SETS[model_set]
+        if language not in models:
+            raise ValueError(f"Language '{language}' not supported. Available: {list(models.keys())}")
         
-        self.model_name = LANG_MODELS[language]
+        self.model_name = models[language]
         
-        print(f"[Wav2Vec2] Loading {self.model_name} ({language}) on {device}...", file=sys.stderr)
-        self.processor = Wav2Vec2Processor.from_pretrained(self.model_name)
-        self.model = Wav2Vec2ForCTC.from_pretrained(self.model_name).to(device)
-        self.model.eval()
-        print("[Wav2Vec2] Model loaded.", file=sys.stderr)
-    
-    def load_audio(self, audio_path, target_sr=16000):
-        """Load and resample audio to 16kHz mono"""
-        import librosa
-        # Load audio with librosa (handles MP3 and resampling)
-        waveform, _ = librosa.load(audio_path, sr=target_sr, mono=True)
-        return waveform
+        # Shared across instances/runners via the model registry (XLSR-53 loaded as run_wav2vec2.py does)
+        print(f"[Wav2Vec2] Using {self.model_name} ({language}) on {device}", file=sys.stderr)
+        load_kwargs = {"use_safetensors": True} if model_set == "xlsr-53" else {}
+        self.processor, self.model = get_model("wav2vec2", self.model_name, device, **load_kwargs)
     
     def transcribe(self, audio_path, language=None):
         """
@@ -68,41 +73,144 @@ class Wav2Vec2ASR:
             language: Language code (ignored for base model, kept for API compatibility)
         
         Returns:
-            dict with 'text', 'language_used', 'duration_sec', 'elapsed_sec'
+            dict with 'text', 'language_used', 'duration_sec', 'elapsed_sec' (audio
+            loading + inference, as always), 'decode_sec' and 'inference_sec'
         """
-        start_time = time.time()
-        
-        # Load audio
-        audio = self.load_audio(audio_path)
+        audio, decode_sec = audio_loader.decode_16k(audio_path)
         duration_sec = len(audio) / 16000.0
         
-        # Process with model
-        with torch.no_grad():
-            inputs = self.processor(
-                audio, 
-                sampling_rate=16000, 
-                return_tensors="pt",
-                padding=True
-            )
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            # Forward pass
-            logits = self.model(**inputs).logits
-            
-            # Decode
-            predicted_ids = torch.argmax(logits, dim=-1)
-            transcription = self.processor.batch_decode(predicted_ids)[0]
+        start_time = time.time()
+        # Forward pass + decode (chunked with logit stitching if longer than chunk_sec)
+        transcription = ctc_batch.transcribe_long(
+            self.processor, self.model, audio, self.device, self.chunk_sec, self.stride_sec
+        )
         
-        elapsed_sec = time.time() - start_time
+        inference_sec = time.time() - start_time
+        elapsed_sec = decode_sec + inference_sec
         
         return {
             "text": transcription.strip(),
             "language_used": language or "multi",  # Base model is multilingual
             "duration_sec": duration_sec,
             "elapsed_sec": elapsed_sec,
+            "decode_sec": decode_sec,
+            "inference_sec": inference_sec,
             "rtf": elapsed_sec / duration_sec if duration_sec > 0 else 0.0,
             "model": self.model_name,
         }
+    
+    def transcribe_many(self, audio_paths, language=None, max_batch_audio_sec=60.0, chunk_files=256):
+        """
+        Batched transcription: clips are length-bucketed and run a bucket per
+        forward pass (see ctc_batch.py). Audio is decoded ahead in background
+        processes (audio_loader.py). Yields (audio_path, result) in input order;
+        result is None for a clip that could not be decoded.
+        """
+        for items in audio_loader.iter_prefetched_chunks(audio_paths, chunk_files, skip_errors=True):
+            for path, audio, _ in items:
+                if audio is None:
+                    yield path, None
+            items = [item for item in items if item[1] is not None]
+            if not items:
+                continue
+            audios = [a for _, a, _ in items]
+            results = ctc_batch.transcribe_bucketed(
+                self.processor, self.model, audios, self.device, max_batch_audio_sec,
+                self.chunk_sec, self.stride_sec
+            )
+            for (path, _, decode_sec), r in zip(items, results):
+                # elapsed_sec keeps the per-file definition: audio loading + (amortized) inference
+                elapsed_sec = decode_sec + r["processing_time_sec"]
+                yield path, {
+                    "text": r["text"],
+                    "language_used": language or "multi",
+                    "duration_sec": r["duration_sec"],
+                    "elapsed_sec": elapsed_sec,
+                    "decode_sec": decode_sec,
+                    "inference_sec": r["processing_time_sec"],
+                    "rtf": elapsed_sec / r["duration_sec"] if r["duration_sec"] > 0 else 0.0,
+                    "model": self.model_name,
+                    "batch_size": r["batch_size"],
+                }
+
+
+def save_outputs(result, infile, mode, outdir, language, store=None):
+    """Write <outdir>/<mode>/wav2vec2/<lang>/<stem>.txt/.json"""
+    audio_name = Path(infile).stem
+    full_outdir = f"{outdir}/{mode}/wav2vec2/{language or 'multi'}"
+    os.makedirs(full_outdir, exist_ok=True)
+    
+    # Save text
+    txt_path = f"{full_outdir}/{audio_name}.txt"
+    with open(txt_path, "w", encoding="utf-8") as f:
+        f.write(result["text"])
+    
+    # Save JSON
+    json_path = f"{full_outdir}/{audio_name}.json"
+    result["audio_file"] = str(infile)
+    result["mode"] = mode
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    if store is not None:
+        store.append(result, system="wav2vec2", language=language or "multi")
+    return txt_path, json_path
+
+
+def save_shard(shard, result, infile, mode, language):
+    """One shard line instead of save_outputs' two files (run_shard.py export restores them)"""
+    result["audio_file"] = str(infile)
+    result["mode"] = mode
+    shard.append(infile, f"{language or 'multi'}/{Path(infile).stem}", result["text"], result,
+                 system="wav2vec2", language=language or "multi")
+
+
+def run_in_dir(args):
+    """Batched mode: data/wav/<lang>/* files, one model per language, bucketed batches"""
+    by_lang = {}
+    for path in sorted(Path(args.in_dir).rglob("*")):
+        if path.suffix.lower() not in (".wav", ".flac", ".mp3", ".m4a", ".ogg"):
+            continue
+        lang = args.hint_lang or path.parent.name.lower()
+        if lang in MODEL_SETS[args.model_set]:
+            by_lang.setdefault(lang, []).append(str(path))
+    
+    shard = None
+    if args.outputs == "shard":
+        tree = f"{args.outdir}/{args.mode}/wav2vec2"
+        # both model sets export to the same tree; their shards must not resume each other
+        name = run_shard.SHARD_NAME if args.model_set == "finetuned" else f"results.{args.model_set}.jsonl"
+        shard = run_shard.RunShard(args.shard or f"{tree}/{name}", args.store,
+                                   export_dir=tree if args.export_files else None,
+                                   resume=not args.no_resume)
+        if shard.resumed:
+            print(f"[Wav2Vec2] resuming {shard.path}: {shard.resumed} clips already done", file=sys.stderr)
+    sink = shard or results_store.ResultsWriter(args.store)
+    
+    with sink:
+        for lang, files in by_lang.items():
+            if shard is not None:
+                files = [f for f in files if not shard.done(f)]
+            if not files:
+                continue
+            asr = Wav2Vec2ASR(language=lang, device=args.device,
+                              chunk_sec=args.chunk_sec, stride_sec=args.stride_sec, model_set=args.model_set)
+            t0 = time.time()
+            audio_total = 0.0
+            failed = 0
+            for infile, result in asr.transcribe_many(files, language=lang,
+                                                      max_batch_audio_sec=args.max_batch_audio_sec):
+                if result is None:
+                    failed += 1
+                    continue
+                if shard is not None:
+                    save_shard(shard, result, infile, args.mode, lang)
+                else:
+                    save_outputs(result, infile, args.mode, args.outdir, lang, sink)
+                audio_total += result["duration_sec"]
+            wall = time.time() - t0
+            print(f"[Wav2Vec2] {lang}: {len(files) - failed} files ({failed} failed to decode), "
+                  f"audio {audio_total:.1f}s, wall {wall:.1f}s, "
+                  f"{audio_total / wall if wall > 0 else 0:.2f} audio-sec per wall-sec", file=sys.stderr)
 
 
 def main():
@@ -111,14 +219,40 @@ def main():
                         help="Inference mode (hinted=language provided, lid2asr=auto-detect)")
     parser.add_argument("--device", default="cpu", choices=["cpu", "cuda"],
                         help="Device (cpu/cuda)")
-    parser.add_argument("--infile", required=True, help="Input audio file")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--infile", help="Input audio file")
+    src.add_argument("--in-dir", help="Directory of <lang>/ audio folders (batched mode)")
     parser.add_argument("--hint-lang", help="Language hint (for hinted mode): mn/hu/fr/es")
+    parser.add_argument("--model-set", choices=sorted(MODEL_SETS), default="finetuned",
+                        help="Per-language checkpoints: fine-tuned community models or facebook XLSR-53")
     parser.add_argument("--outdir", default="results/transcripts",
                         help="Output directory for transcripts")
     parser.add_argument("--save-json", action="store_true",
                         help="Save detailed JSON output")
+    parser.add_argument("--max-batch-audio-sec", type=float, default=60.0,
+                        help="Padded audio seconds per forward pass in --in-dir mode")
+    parser.add_argument("--chunk-sec", type=float, default=20.0,
+                        help="Window length for long inputs (bounds peak memory)")
+    parser.add_argument("--stride-sec", type=float, default=2.0,
+                        help="Left/right context per window, dropped when stitching")
+    parser.add_argument("--outputs", choices=["shard", "files"], default="shard",
+                        help="--in-dir: append-only results.jsonl (resumable) or per-clip .txt/.json files "
+                             "written as it goes")
+    parser.add_argument("--export-files", action="store_true",
+                        help="With --outputs shard: also write the per-clip .txt/.json tree for this run's clips")
+    parser.add_argument("--shard", default=None,
+                        help="Shard path (default: <outdir>/<mode>/wav2vec2/results.jsonl, "
+                             "results.<model-set>.jsonl for xlsr-53)")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Start a fresh shard (the existing one is kept as <shard>.<time>.bak)")
+    parser.add_argument("--store", default=results_store.STORE_ROOT,
+                        help='Columnar results store to append to ("off" disables)')
     args = parser.parse_args()
     
+    if args.in_dir:
+        run_in_dir(args)
+        return
+    
     # Determine language FIRST (needed to load correct model)
     language = None
     if args.mode == "hinted":
@@ -140,7 +274,8 @@ def main():
               file=sys.stderr)
     
     # Initialize language-specific model
-    asr = Wav2Vec2ASR(language=language, device=args.device)
+    asr = Wav2Vec2ASR(language=language, device=args.device,
+                      chunk_sec=args.chunk_sec, stride_sec=args.stride_sec, model_set=args.model_set)
     
     # Transcribe
     print(f"[Wav2Vec2] Transcribing: {args.infile}", file=sys.stderr)
@@ -151,31 +286,8 @@ def main():
     
     # Save detailed output if requested
     if args.save_json or args.outdir:
-        os.makedirs(args.outdir, exist_ok=True)
-        
-        # Determine output filename
-        audio_name = Path(args.infile).stem
-        if args.mode == "hinted":
-            mode_dir = f"{args.outdir}/hinted/wav2vec2"
-        else:
-            mode_dir = f"{args.outdir}/lid2asr/wav2vec2"
-        
-        lang = language or "multi"
-        full_outdir = f"{mode_dir}/{lang}"
-        os.makedirs(full_outdir, exist_ok=True)
-        
-        # Save text
-        txt_path = f"{full_outdir}/{audio_name}.txt"
-        with open(txt_path, "w", encoding="utf-8") as f:
-            f.write(result["text"])
-        
-        # Save JSON
-        json_path = f"{full_outdir}/{audio_name}.json"
-        result["audio_file"] = args.infile
-        result["mode"] = args.mode
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
-        
+        with results_store.ResultsWriter(args.store) as store:
+            txt_path, json_path = save_outputs(result, args.infile, args.mode, args.outdir, language, store)
         print(f"[Wav2Vec2] Saved: {txt_path}", file=sys.stderr)
         print(f"[Wav2Vec2] Saved: {json_path}", file=sys.stderr)
     
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import argparse, os, json, time, whisper
+import results_store
 
 def transcribe(model, wav_path, language, task="transcribe"):
     import time, soundfile as sf
@@ -21,6 +22,7 @@ def main():
     ap.add_argument("--out", required=True)
     ap.add_argument("--model", default="small")
     ap.add_argument("--device", default="cpu")
+    ap.add_argument("--store", default=results_store.STORE_ROOT, help='Columnar results store ("off" disables)')
     args = ap.parse_args()
 
     os.makedirs(args.out, exist_ok=True)
@@ -35,6 +37,8 @@ def main():
                 with open(os.path.join(lid_dir, fn), "r", encoding="utf-8") as f:
                     j = json.load(f); lid_cache[j["file"]] = j
 
+    store = results_store.ResultsWriter(args.store)
+    system = os.path.basename(os.path.normpath(args.out))  # .../transcripts/<mode>/<system>
     for root,_,files in os.walk(args.inp):
         parts = root.replace("\\","/").split("/")
         lang_hint = parts[-1] if parts and parts[-1] in {"mn","hu","fr","es"} else None
@@ -75,7 +79,9 @@ def main():
             }
             with open(os.path.join(out_js_dir, base + ".json"), "w", encoding="utf-8") as f:
                 json.dump(side, f, ensure_ascii=False, indent=2)
+            store.append(side, system=system, mode=args.mode, transcript=result.get("text", ""))
 
+    store.close()
     print("ASR outputs →", args.out)
 
 if __name__ == "__main__":
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of decoded 16 kHz mono float32 audio.
+
+Every model / beam size / mode used to re-decode the same data/wav MP3s.
+Decoded PCM is stored as .npy keyed by a hash of the file *content* (so
+renamed or copied clips still hit) and read back with np.load(mmap_mode='r'),
+i.e. zero-copy from the page cache.
+
+    ASR_AUDIO_CACHE      cache directory (default data/cache/pcm16k, "off" disables)
+    ASR_AUDIO_CACHE_GB   size cap (default 20); least-recently-used files are evicted
+
+Writes go to a temp file + os.replace, so concurrent decoder processes are safe.
+"""
+
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+CACHE_DIR = os.environ.get("ASR_AUDIO_CACHE", "data/cache/pcm16k")
+CACHE_GB = float(os.environ.get("ASR_AUDIO_CACHE_GB", "20"))
+EVICT_EVERY = 100  # puts between size checks
+
+_hash_memo = {}  # (path, size, mtime_ns) -> content hash
+
+
+def enabled():
+    return CACHE_DIR.lower() not in ("", "off", "0", "none")
+
+
+def content_hash(path):
+    """blake2b of the file bytes, memoized per (path, size, mtime)"""
+    st = os.stat(path)
+    memo_key = (str(path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _hash_memo:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _hash_memo[memo_key] = h.hexdigest()
+    return _hash_memo[memo_key]
+
+
+class AudioCache:
+    def __init__(self, root=CACHE_DIR, cap_gb=CACHE_GB):
+        self.root = Path(root)
+        self.cap_bytes = cap_gb * 1e9
+        self._puts = 0
+
+    def path_for(self, audio_path, tag="pcm16k"):
+        key = content_hash(audio_path)
+        return self.root / key[:2] / f"{key}.{tag}.npy"
+
+    def get(self, audio_path, tag="pcm16k"):
+        """Read-only memmap of the cached array, or None"""
+        entry = self.path_for(audio_path, tag)
+        try:
+            arr = np.load(entry, mmap_mode="r")
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        try:
+            os.utime(entry)  # LRU order = mtime
+        except OSError:
+            pass
+        return arr
+
+    def put(self, audio_path, array, tag="pcm16k"):
+        entry = self.path_for(audio_path, tag)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        tmp = entry.with_name(f".{entry.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(array))
+        os.replace(tmp, entry)
+
+        self._puts += 1
+        if self._puts % EVICT_EVERY == 0:
+            self.evict()
+        return entry
+
+    def size_bytes(self):
+        return sum(p.stat().st_size for p in self.root.rglob("*.npy"))
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache is under its cap"""
+        if not self.root.exists():
+            return 0
+        entries = []
+        for p in self.root.rglob("*.npy"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, p in sorted(entries):
+            if total <= self.cap_bytes:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+_default = None
+
+
+def default_cache():
+    """Process-wide cache, or None if ASR_AUDIO_CACHE=off"""
+    global _default
+    if not enabled():
+        return None
+    if _default is None:
+        _default = AudioCache()
+    return _default
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Background audio decoding shared by all runners.
+
+Decoding MP3 and resampling to 16 kHz mono float32 happens in a process
+pool; a bounded number of decoded clips is kept ready ahead of the engine,
+so the model is not idle while the next file is decoded.
+
+    for path, audio, decode_sec in AudioPrefetcher(files, workers=4):
+        ...
+
+decode_sec is the decode time measured in the worker; runners report it as
+its own metric instead of folding it into inference time.
+
+Decoded clips are stored in the audio cache (audio_cache.py). Cache hits are
+opened as memmaps in the calling process (no worker, no copy), so a repeated
+sweep spends ~0 s decoding.
+"""
+
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import audio_cache
+
+SAMPLE_RATE = 16000
+
+
+def cached_16k(path):
+    """Cached decode of path as a read-only memmap, or None"""
+    cache = audio_cache.default_cache()
+    return cache.get(path) if cache else None
+
+
+def decode_16k(path, use_cache=True):
+    """Decode one file to 16 kHz mono float32. Returns (audio, decode_sec)."""
+    t0 = time.perf_counter()
+    cache = audio_cache.default_cache() if use_cache else None
+    if cache:
+        audio = cache.get(path)
+        if audio is not None:
+            return audio, time.perf_counter() - t0
+
+    import librosa
+    audio, _ = librosa.load(str(path), sr=SAMPLE_RATE, mono=True)
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    decode_sec = time.perf_counter() - t0
+    if cache:
+        cache.put(path, audio)
+    return audio, decode_sec
+
+
+def decode_head_16k(path, head_sec):
+    """
+    First head_sec seconds of path at 16 kHz mono float32 (in-process, no
+    temp file). A cached full decode is sliced; otherwise only the head is
+    decoded. Returns (audio, decode_sec).
+    """
+    t0 = time.perf_counter()
+    audio = cached_16k(path)
+    if audio is not None:
+        return audio[:int(head_sec * SAMPLE_RATE)], time.perf_counter() - t0
+
+    import librosa
+    audio, _ = librosa.load(str(path), sr=SAMPLE_RATE, mono=True, duration=head_sec)
+    return np.ascontiguousarray(audio, dtype=np.float32), time.perf_counter() - t0
+
+
+def default_workers():
+    """ASR_DECODE_WORKERS, else min(4, usable cores / 2)"""
+    if os.environ.get("ASR_DECODE_WORKERS"):
+        return max(1, int(os.environ["ASR_DECODE_WORKERS"]))
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 2)
+    return max(1, min(4, cores // 2))
+
+
+class AudioPrefetcher:
+    """
+    Iterate (path, audio, decode_sec) in input order while up to max_ready
+    files are decoded ahead in worker processes.
+
+    skip_errors=True prints failures and yields (path, None, exception)
+    instead of raising.
+    """
+
+    def __init__(self, paths, workers=None, max_ready=16, skip_errors=False):
+        self.paths = list(paths)
+        self.workers = workers or default_workers()
+        self.max_ready = max(1, max_ready)
+        self.skip_errors = skip_errors
+        self.decode_sec = 0.0
+        self.cache_hits = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __iter__(self):
+        if self.workers <= 1:
+            for path in self.paths:
+                yield self._wrap(path, lambda: decode_16k(path))
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            it = iter(self.paths)
+            for path in it:
+                pending.append((path, self._submit(pool, path)))
+                if len(pending) >= self.max_ready:
+                    break
+            while pending:
+                path, get = pending.popleft()
+                nxt = next(it, None)
+                if nxt is not None:
+                    pending.append((nxt, self._submit(pool, nxt)))
+                yield self._wrap(path, get)
+
+    def _submit(self, pool, path):
+        """Cache hits are opened here (zero-copy memmap); misses go to a worker"""
+        t0 = time.perf_counter()
+        try:
+            audio = cached_16k(path)
+        except OSError:
+            audio = None
+        if audio is not None:
+            self.cache_hits += 1
+            hit = (audio, time.perf_counter() - t0)
+            return lambda: hit
+        return pool.submit(decode_16k, path).result
+
+    def _wrap(self, path, get):
+        try:
+            audio, decode_sec = get()
+        except Exception as e:
+            if not self.skip_errors:
+                raise
+            print(f"❌ decode failed {path}: {e}", file=sys.stderr)
+            return path, None, e
+        self.decode_sec += decode_sec
+        return path, audio, decode_sec
+
+
+def iter_prefetched_chunks(paths, n, **kwargs):
+    """Group prefetched (path, audio, decode_sec) items into lists of n"""
+    chunk = []
+    for item in AudioPrefetcher(paths, **kwargs):
+        chunk.append(item)
+        if len(chunk) == n:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
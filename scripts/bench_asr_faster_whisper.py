@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Regression benchmark for scripts/asr_faster_whisper.py
+
+Runs transcribe_one() over a directory with model.transcribe / model.encode
+wrapped in counters and fails if any file is decoded more than once
+(one transcribe call, at most one encoder call per 30 s window).
+Also reports latency_sec and RTF so regressions in speed show up.
+
+Usage: python scripts/bench_asr_faster_whisper.py --in data/wav/mn --limit 20
+"""
+import argparse, math, os, sys, time
+from faster_whisper import WhisperModel
+
+from asr_faster_whisper import transcribe_one, lang_hint_from_path
+
+def count_calls(obj, name, counter):
+    fn = getattr(obj, name)
+    def wrapped(*a, **kw):
+        counter[name] += 1
+        return fn(*a, **kw)
+    setattr(obj, name, wrapped)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="inp", required=True)
+    ap.add_argument("--model", default="tiny")
+    ap.add_argument("--device", default="cpu")
+    ap.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args()
+
+    files = []
+    for root,_,fns in os.walk(args.inp):
+        for fn in sorted(fns):
+            p = os.path.join(root, fn)
+            if fn.lower().endswith((".wav",".flac",".mp3",".m4a",".ogg")) and lang_hint_from_path(p):
+                files.append(p)
+    files = sorted(files)[:args.limit]
+    if not files:
+        print(f"No audio with a language folder under {args.inp}"); sys.exit(1)
+
+    compute_type = "int8" if args.device=="cpu" else "float16"
+    model = WhisperModel(args.model, device=args.device, compute_type=compute_type)
+    counter = {"transcribe": 0, "encode": 0}
+    count_calls(model, "transcribe", counter)
+    count_calls(model, "encode", counter)
+
+    failures = []
+    lat = audio = 0.0
+    t0 = time.time()
+    for p in files:
+        before = dict(counter)
+        _, side = transcribe_one(model, p, lang_hint_from_path(p))
+        n_tr = counter["transcribe"] - before["transcribe"]
+        n_enc = counter["encode"] - before["encode"]
+        windows = max(1, math.ceil((side["audio_sec"] or 0) / 30.0))
+        if n_tr != 1 or n_enc > windows:
+            failures.append(f"{p}: transcribe x{n_tr}, encode x{n_enc} (windows={windows})")
+        lat += side["latency_sec"]; audio += side["audio_sec"] or 0.0
+    wall = time.time() - t0
+
+    print(f"files={len(files)} wall={wall:.2f}s latency_sum={lat:.2f}s audio={audio:.1f}s "
+          f"RTF={lat/audio if audio else 0:.3f}")
+    print(f"transcribe calls={counter['transcribe']} encode calls={counter['encode']}")
+    if failures:
+        print("❌ files decoded more than once:"); print("\n".join(failures)); sys.exit(1)
+    print("✅ every file decoded exactly once")
+
+if __name__ == "__main__":
+    main()
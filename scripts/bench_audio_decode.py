@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Files/sec of the old ffmpeg conversion vs in-process decoding.
+
+  ffmpeg      one `ffmpeg ... -ar 16000 -ac 1 out.wav` subprocess per file,
+              then the WAV is read back (what auto_asr.ensure_wav16k and
+              lid_from_whisper.trim_head used to do)
+  inproc      audio_loader.decode_16k in this process, no temp file
+  parallel    audio_loader.AudioPrefetcher with --workers processes
+
+The decoded-audio cache is bypassed so every mode really decodes.
+--head-sec N benchmarks the LID head trim instead of full files.
+
+Usage: python scripts/bench_audio_decode.py --in data/wav/mn --limit 50 --workers 4
+"""
+import argparse, os, shlex, shutil, subprocess, sys, tempfile, time
+
+os.environ["ASR_AUDIO_CACHE"] = "off"  # before audio_cache is imported (workers inherit it)
+import audio_loader
+
+AUDIO_EXTS = (".wav", ".flac", ".mp3", ".m4a", ".ogg")
+
+
+def ffmpeg_decode(path, head_sec=None):
+    import soundfile as sf
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "out.wav")
+        trim = f"-t {head_sec} " if head_sec else ""
+        cmd = f"ffmpeg -y -hide_banner -loglevel error {trim}-i {shlex.quote(path)} -ac 1 -ar 16000 {shlex.quote(out)}"
+        subprocess.run(cmd, shell=True, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        audio, _ = sf.read(out, dtype="float32")
+    return audio
+
+
+def inproc_decode(path, head_sec=None):
+    if head_sec:
+        return audio_loader.decode_head_16k(path, head_sec)[0]
+    return audio_loader.decode_16k(path, use_cache=False)[0]
+
+
+def run_serial(files, fn, head_sec):
+    t0 = time.perf_counter()
+    samples = sum(len(fn(p, head_sec)) for p in files)
+    return time.perf_counter() - t0, samples
+
+
+def run_parallel(files, workers):
+    t0 = time.perf_counter()
+    prefetcher = audio_loader.AudioPrefetcher(files, workers=workers, max_ready=4 * workers)
+    samples = sum(len(audio) for _, audio, _ in prefetcher)
+    return time.perf_counter() - t0, samples
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="inp", required=True)
+    ap.add_argument("--limit", type=int, default=50)
+    ap.add_argument("--workers", type=int, default=audio_loader.default_workers())
+    ap.add_argument("--head-sec", type=float, default=None)
+    args = ap.parse_args()
+
+    files = []
+    for root, _, fns in os.walk(args.inp):
+        files += [os.path.join(root, fn) for fn in fns if fn.lower().endswith(AUDIO_EXTS)]
+    files = sorted(files)[:args.limit]
+    if not files:
+        print(f"No audio under {args.inp}"); sys.exit(1)
+
+    modes = []
+    if shutil.which("ffmpeg"):
+        modes.append(("ffmpeg", lambda: run_serial(files, ffmpeg_decode, args.head_sec)))
+    else:
+        print("ffmpeg not on PATH, skipping the ffmpeg baseline")
+    modes.append(("inproc", lambda: run_serial(files, inproc_decode, args.head_sec)))
+    if not args.head_sec:
+        modes.append((f"parallel x{args.workers}", lambda: run_parallel(files, args.workers)))
+
+    print(f"files={len(files)} head_sec={args.head_sec or 'full'}")
+    print(f"{'mode':<14} {'wall_s':>8} {'files/s':>8} {'audio_s':>9}")
+    base = None
+    for name, fn in modes:
+        wall, samples = fn()
+        fps = len(files) / wall if wall > 0 else 0.0
+        base = base or fps
+        print(f"{name:<14} {wall:8.2f} {fps:8.1f} {samples / audio_loader.SAMPLE_RATE:9.1f}  x{fps / base:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,19 @@
 """
 Calculate WER (Word Error Rate) and CER (Character Error Rate)
 for ASR model outputs against reference transcripts
+
+All model x language pairs are collected first and scored in one pass:
+cached scores (score_cache.py, keyed by hypothesis/reference hash and
+scorer version) are reused and only new or changed pairs are scored, in a
+process pool.
 """
 
-import json
 import argparse
+import time
 from pathlib import Path
 import pandas as pd
-import jiwer
+
+from score_cache import ScoreCache
 
 def load_reference_files(ref_dir, lang):
     """Load reference transcripts from individual .txt files"""
@@ -31,51 +37,16 @@ def load_reference_files(ref_dir, lang):
     
     return references
 
-def calculate_metrics(hypothesis, reference):
-    """Calculate WER and CER for a single pair"""
-    # Normalize
-    hyp = hypothesis.strip()
-    ref = reference.strip()
-    
-    if not ref:
-        return None, None
-    
-    # WER
-    try:
-        wer = jiwer.wer(ref, hyp)
-    except:
-        wer = None
-    
-    # CER  
-    try:
-        cer = jiwer.cer(ref, hyp)
-    except:
-        cer = None
-    
-    return wer, cer
-
-def process_model_language(model_dir, ref_data, lang):
-    """Process all files for one model/language"""
-    results = []
+def process_model_language(model_dir, ref_data, lang, cache):
+    """Collect (file_id, hypothesis, reference) pairs for one model/language"""
+    pairs = []
     
     json_files = list(model_dir.glob("*.json"))
     
     for json_file in json_files:
         try:
-            with open(json_file) as f:
-                data = json.load(f)
-            
-            file_id = Path(data.get('file', '')).stem
-            
-            # Get hypothesis - check JSON first, then .txt file
-            hypothesis = data.get('transcript', '')
-            
-            if not hypothesis:
-                # Whisper saves transcripts as separate .txt files
-                txt_file = json_file.with_suffix('.txt')
-                if txt_file.exists():
-                    with open(txt_file, 'r', encoding='utf-8') as f:
-                        hypothesis = f.read().strip()
+            # Hypothesis from the JSON, else the .txt (Whisper); cached by mtime
+            file_id, hypothesis = cache.read_sidecar(json_file)
             
             if not hypothesis:
                 print(f"⚠️  No transcript for {file_id}")
@@ -91,20 +62,35 @@ def process_model_language(model_dir, ref_data, lang):
                 print(f"⚠️  No reference for {file_id}")
                 continue
             
-            wer, cer = calculate_metrics(hypothesis, reference)
-            
-            if wer is not None:
-                results.append({
-                    'file_id': file_id,
-                    'wer': wer,
-                    'cer': cer,
-                    'hypothesis': hypothesis,
-                    'reference': reference
-                })
+            pairs.append((file_id, hypothesis, reference))
         
         except Exception as e:
             print(f"Error processing {json_file}: {e}")
     
+    return pairs
+
+def score_pairs(pairs, cache, workers=None):
+    """
+    WER, CER and word-level error counts per (file_id, hypothesis, reference)
+    pair, or None if the pair cannot be scored (e.g. empty reference)
+    """
+    scores = cache.score([(ref.strip(), hyp.strip()) for _, hyp, ref in pairs], workers)
+    results = []
+    for (file_id, hypothesis, reference), m in zip(pairs, scores):
+        if m is None:
+            results.append(None)
+            continue
+        results.append({
+            'file_id': file_id,
+            'wer': m['wer'],
+            'cer': m['cer'],
+            'hypothesis': hypothesis,
+            'reference': reference,
+            'substitutions': m['substitutions'],
+            'deletions': m['deletions'],
+            'insertions': m['insertions'],
+            'hits': m['hits'],
+        })
     return results
 
 def main():
@@ -117,6 +103,10 @@ def main():
                       help='Languages to process')
     parser.add_argument('--output', default='results/wer_cer_results.csv',
                       help='Output CSV file')
+    parser.add_argument('--workers', type=int, default=None,
+                      help='Scoring processes (default: all cores)')
+    parser.add_argument('--no-cache', action='store_true',
+                      help='Score everything from scratch (in-memory cache only)')
     
     args = parser.parse_args()
     
@@ -124,6 +114,10 @@ def main():
     ref_base = Path(args.ref_dir)
     
     all_results = []
+    groups = []  # (model_name, lang, [(file_id, hypothesis, reference)])
+    references = {}
+    cache = ScoreCache(':memory:') if args.no_cache else ScoreCache()
+    t_start = time.time()
     
     print("="*60)
     print("WER/CER CALCULATION")
@@ -145,8 +139,10 @@ def main():
         for lang in args.languages:
             print(f"\n  Language: {lang.upper()}")
             
-            # Load references from individual files
-            ref_data = load_reference_files(ref_base, lang)
+            # Load references from individual files (once per language)
+            if lang not in references:
+                references[lang] = load_reference_files(ref_base, lang)
+            ref_data = references[lang]
             if not ref_data:
                 print(f"    ⚠️  No reference files found")
                 continue
@@ -163,23 +159,40 @@ def main():
                 print(f"    ⚠️  Model directory not found: {model_dir}")
                 continue
             
-            # Process files
-            lang_results = process_model_language(model_dir, ref_data, lang)
+            # Collect pairs (scored below, all groups at once)
+            pairs = process_model_language(model_dir, ref_data, lang, cache)
+            if pairs:
+                groups.append((model_name, lang, pairs))
+                print(f"    ✓ Collected {len(pairs)} files")
+    
+    # Score every pair in one pass: cache hits are free, misses fan out to a pool
+    all_pairs = [p for _, _, pairs in groups for p in pairs]
+    scored = score_pairs(all_pairs, cache, args.workers) if all_pairs else []
+    stats = cache.stats()
+    print(f"\n✓ Scored {len(all_pairs)} pairs ({stats['hits']} cached, {stats['misses']} new "
+          f"in {stats['score_sec']:.2f}s)")
+    
+    i = 0
+    for model_name, lang, pairs in groups:
+        lang_results = [r for r in scored[i:i + len(pairs)] if r is not None]
+        i += len(pairs)
+        
+        if lang_results:
+            # Calculate averages
+            df_lang = pd.DataFrame(lang_results)
+            avg_wer = df_lang['wer'].mean()
+            avg_cer = df_lang['cer'].mean()
+            
+            print(f"  {model_name} {lang.upper()}: {len(lang_results)} files  "
+                  f"WER: {avg_wer:.2%}  CER: {avg_cer:.2%}")
             
-            if lang_results:
-                # Calculate averages
-                df_lang = pd.DataFrame(lang_results)
-                avg_wer = df_lang['wer'].mean()
-                avg_cer = df_lang['cer'].mean()
-                
-                print(f"    ✓ Processed {len(lang_results)} files")
-                print(f"    WER: {avg_wer:.2%}  CER: {avg_cer:.2%}")
-                
-                # Add to overall results
-                for result in lang_results:
-                    result['model'] = model_name
-                    result['language'] = lang
-                    all_results.append(result)
+            # Add to overall results
+            for result in lang_results:
+                result['model'] = model_name
+                result['language'] = lang
+                all_results.append(result)
+    cache.close()
+    print(f"✓ Total {time.time() - t_start:.2f}s")
     
     if not all_results:
         print("\n❌ No results calculated!")
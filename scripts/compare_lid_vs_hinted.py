@@ -10,10 +10,24 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
+import results_store
+
+STORE_COLUMNS = ['file', 'system', 'model', 'config', 'mode', 'language', 'duration_sec', 'processing_time_sec',
+                 'rtf', 'device']
+
 def load_all_results(results_dir="results"):
-    """Load both hinted and LID results"""
+    """Load both hinted and LID results (from the results store when it has data)"""
     results = {'hinted': [], 'lid2asr': []}
     
+    if results_store.available():
+        df = results_store.load(STORE_COLUMNS, filters={'mode': list(results)})
+        # hinted and lid2asr rows of a system/model must come from the same decode config
+        df = results_store.one_config(df)
+        df = df.rename(columns={'language': 'language_used'})
+        for mode in results:
+            results[mode] = df[df['mode'] == mode].to_dict('records')
+        return results
+    
     for mode in ['hinted', 'lid2asr']:
         json_files = glob.glob(f"{results_dir}/transcripts/{mode}/**/*.json", recursive=True)
         
@@ -11,15 +11,38 @@ import seaborn as sns
 from pathlib import Path
 import numpy as np
 
+import results_store
+
 # Set style
 sns.set_style("whitegrid")
 plt.rcParams['figure.figsize'] = (14, 10)
 plt.rcParams['font.size'] = 10
 
-def load_results(base_dir, system, model, languages):
-    """Load all JSON results for a system/model"""
+# results/transcripts/<mode>/whisper-small/ is run_whisper_beam.py's tree (beam 5, VAD);
+# greedy run_whisper.py rows of the same model live under <mode>/small/
+WHISPER_STORE = {'model': 'small', 'config': results_store.config_key({'beam_size': 5})}
+
+def load_results(base_dir, system, model, languages, store_filters=None):
+    """
+    Load all results for a system/model (from the results store when it has
+    data; store_filters narrows the store to what the sidecar directory holds)
+    """
     results = []
     
+    if results_store.available():
+        filters = {'mode': Path(base_dir).name, 'system': system, 'language': list(languages)}
+        if model:
+            filters['model'] = model
+        filters.update(store_filters or {})
+        df = results_store.load(['file', 'language', 'duration_sec', 'processing_time_sec', 'rtf', 'transcript',
+                                 'model', 'config'], filters=filters)
+        df = results_store.one_config(df).drop(columns=['model', 'config'])
+        for lang in languages:
+            print(f"  {system}/{model}/{lang}: {int((df['language'] == lang).sum())} rows (results store)")
+        df.insert(0, 'system', system)
+        df.insert(1, 'model', model)
+        return df.fillna({'duration_sec': 0, 'processing_time_sec': 0, 'rtf': 0, 'transcript': ''})
+    
     for lang in languages:
         result_dir = Path(base_dir) / system / model / lang
         if not result_dir.exists():
@@ -64,7 +87,7 @@ def main():
     
     # Whisper
     print("\nWhisper-small:")
-    df_whisper = load_results(base_dir, "whisper-small", "", languages)
+    df_whisper = load_results(base_dir, "whisper-small", "", languages, WHISPER_STORE)
     if not df_whisper.empty:
         df_whisper['model'] = 'Whisper-small'
         all_results.append(df_whisper)
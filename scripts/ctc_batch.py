@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Length-bucketed padded batching for CTC models (Wav2Vec2 / MMS).
+
+Clips are sorted by duration and packed into buckets whose padded size
+(batch size x longest clip) stays under --max-batch-audio-sec, so padding
+waste stays low. Each bucket is one forward pass with an attention mask;
+logits are cut back to each clip's real frame count before batch_decode.
+Batch wall time is attributed to clips in proportion to their duration.
+
+Checkpoints whose feature extractor has return_attention_mask=False (the
+group-norm wav2vec2-base style models) must not see padding: without a
+mask each clip's logits would depend on its bucket mates. For those only
+clips of identical length share a bucket (in practice batch size 1), as
+the transformers docs recommend.
+
+Clips longer than chunk_sec go through chunked_logits(): fixed-size windows
+with left/right context, where only each window's centre frames are kept
+and concatenated, so peak memory is bounded by the window size and long
+files (concatenate_audio.py, 60-300 s) can be transcribed too.
+"""
+
+import math
+import time
+
+import torch
+
+SAMPLE_RATE = 16000
+
+
+def iter_chunks(items, n):
+    for i in range(0, len(items), n):
+        yield items[i:i + n]
+
+
+def make_buckets(lengths, max_batch_audio_sec, sr=SAMPLE_RATE, equal_length=False):
+    """
+    Group indices of lengths (in samples) into buckets of similar length.
+    Padded cost of a bucket = len(bucket) * longest clip <= budget
+    (a single clip over budget gets its own bucket). equal_length=True only
+    puts clips of exactly the same length together (no padding at all).
+    """
+    budget = max_batch_audio_sec * sr
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    buckets, current = [], []
+    for i in order:
+        # ascending order: the new clip is the longest in the bucket
+        if current and ((len(current) + 1) * lengths[i] > budget
+                        or (equal_length and lengths[i] != lengths[current[0]])):
+            buckets.append(current)
+            current = []
+        current.append(i)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def uses_attention_mask(processor):
+    return getattr(processor.feature_extractor, "return_attention_mask", True)
+
+
+def forward_logits(processor, model, audios, device):
+    """
+    One padded forward pass. Returns list of per-clip logits (frames x vocab) on CPU.
+    Models without an attention mask get one pass per distinct clip length instead.
+    """
+    use_mask = uses_attention_mask(processor)
+    if not use_mask and len({len(a) for a in audios}) > 1:
+        return [forward_logits(processor, model, [a], device)[0] for a in audios]
+    inputs = processor(
+        audios,
+        sampling_rate=SAMPLE_RATE,
+        return_tensors="pt",
+        padding=True,
+        return_attention_mask=use_mask,
+    )
+    inputs = {k: v.to(device) for k, v in inputs.items()}
+    with torch.no_grad():
+        logits = model(**inputs).logits
+
+    lengths = torch.tensor([len(a) for a in audios])
+    out_lengths = model._get_feat_extract_output_lengths(lengths).tolist()
+    return [logits[i, :int(n)].cpu() for i, n in enumerate(out_lengths)]
+
+
+def frames_per_sample_ratio(model):
+    """Input samples per output logit frame (320 for wav2vec2 conv front-end)"""
+    return math.prod(model.config.conv_stride)
+
+
+def chunk_windows(n_samples, chunk_sec, stride_sec, sr=SAMPLE_RATE):
+    """
+    Split [0, n_samples) into windows of chunk_sec with stride_sec of context
+    on each side. Yields (win_start, win_end, core_start, core_end) in samples;
+    the cores tile the input exactly.
+    """
+    chunk = int(chunk_sec * sr)
+    stride = int(stride_sec * sr)
+    core = chunk - 2 * stride
+    if core <= 0:
+        raise ValueError("chunk_sec must be larger than 2 * stride_sec")
+    for core_start in range(0, n_samples, core):
+        core_end = min(core_start + core, n_samples)
+        yield max(0, core_start - stride), min(n_samples, core_end + stride), core_start, core_end
+
+
+def chunked_logits(processor, model, audio, device, chunk_sec=20.0, stride_sec=2.0, windows_per_pass=1):
+    """
+    Logits for a waveform of any length with bounded memory.
+
+    Each window is run with its context, then only the frames of its core
+    region are kept; the kept frames are concatenated (CTC logit stitching).
+    Inputs no longer than chunk_sec take a single pass.
+    """
+    if len(audio) <= chunk_sec * SAMPLE_RATE:
+        return forward_logits(processor, model, [audio], device)[0]
+
+    ratio = frames_per_sample_ratio(model)
+    windows = list(chunk_windows(len(audio), chunk_sec, stride_sec))
+    pieces = []
+    for group in iter_chunks(windows, windows_per_pass):
+        logits = forward_logits(processor, model, [audio[w0:w1] for w0, w1, _, _ in group], device)
+        for (w0, w1, c0, c1), lg in zip(group, logits):
+            first = int(round((c0 - w0) / ratio))
+            last = int(round((c1 - w0) / ratio))
+            pieces.append(lg[first:min(last, lg.shape[0])])
+    return torch.cat(pieces, dim=0)
+
+
+def transcribe_long(processor, model, audio, device, chunk_sec=20.0, stride_sec=2.0):
+    """Text for one waveform of any length via chunked_logits"""
+    logits = chunked_logits(processor, model, audio, device, chunk_sec, stride_sec)
+    return decode_logits(processor, [logits])[0]
+
+
+def decode_logits(processor, logits_list):
+    ids = [torch.argmax(l, dim=-1).tolist() for l in logits_list]
+    return processor.batch_decode(ids)
+
+
+def transcribe_batch(processor, model, audios, device):
+    """Returns (texts, wall_sec) for one bucket"""
+    t0 = time.time()
+    texts = decode_logits(processor, forward_logits(processor, model, audios, device))
+    return texts, time.time() - t0
+
+
+def transcribe_bucketed(processor, model, audios, device, max_batch_audio_sec,
+                        chunk_sec=20.0, stride_sec=2.0):
+    """
+    Transcribe a list of 16 kHz waveforms with length bucketing.
+    Clips longer than chunk_sec are transcribed on their own with chunking.
+
+    Returns one dict per input (same order): text, duration_sec,
+    processing_time_sec (amortized share of the bucket), rtf, batch_size.
+    """
+    results = [None] * len(audios)
+    short = []
+    for i, audio in enumerate(audios):
+        if len(audio) <= chunk_sec * SAMPLE_RATE:
+            short.append(i)
+            continue
+        t0 = time.time()
+        text = transcribe_long(processor, model, audio, device, chunk_sec, stride_sec)
+        proc = time.time() - t0
+        duration_sec = len(audio) / SAMPLE_RATE
+        results[i] = {
+            "text": text.strip(),
+            "duration_sec": duration_sec,
+            "processing_time_sec": proc,
+            "rtf": proc / duration_sec if duration_sec > 0 else 0.0,
+            "batch_size": 1,
+        }
+
+    equal_length = not uses_attention_mask(processor)
+    for sub in make_buckets([len(audios[i]) for i in short], max_batch_audio_sec, equal_length=equal_length):
+        bucket = [short[j] for j in sub]
+        texts, wall_sec = transcribe_batch(processor, model, [audios[i] for i in bucket], device)
+        total = sum(len(audios[i]) for i in bucket) or 1
+        for i, text in zip(bucket, texts):
+            duration_sec = len(audios[i]) / SAMPLE_RATE
+            proc = wall_sec * len(audios[i]) / total
+            results[i] = {
+                "text": text.strip(),
+                "duration_sec": duration_sec,
+                "processing_time_sec": proc,
+                "rtf": proc / duration_sec if duration_sec > 0 else 0.0,
+                "batch_size": len(bucket),
+            }
+    return results
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Persistent audio duration / metadata index.
+
+Durations used to come from librosa.get_duration / ffprobe / soundfile on
+every run - for match_by_duration.py that is the whole Common Voice clips
+directory. This index stores one row per file
+
+    path, size, mtime_ns, sample_rate, frames, duration
+
+in a SQLite file (ASR_DURATION_INDEX, default data/cache/durations.sqlite).
+Rows are refreshed only when size or mtime change; new/stale files are
+probed in parallel worker processes.
+
+Probing never decodes audio:
+  mp3   frame headers: Xing/Info (+ LAME encoder delay/padding) or VBRI
+        frame count, else a walk over the frame table
+  other soundfile.info (header only), librosa.get_duration as last resort
+
+    from duration_index import durations
+    durs = durations(paths)            # {str(path): seconds or None}
+
+CLI: python scripts/duration_index.py data/wav cv-corpus-*/es/clips
+"""
+
+import argparse
+import os
+import sqlite3
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+INDEX_PATH = os.environ.get("ASR_DURATION_INDEX", "data/cache/durations.sqlite")
+AUDIO_EXTS = (".mp3", ".wav", ".flac", ".ogg", ".m4a")
+
+# --- MP3 header parsing ------------------------------------------------------
+
+_BITRATES = {  # kbit/s, index 1..14
+    (1, 1): (32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 25: (11025, 12000, 8000)}
+
+
+def _frame_header(buf, pos):
+    """Parse the 4-byte MPEG audio frame header at pos, or None"""
+    if pos + 4 > len(buf) or buf[pos] != 0xFF or (buf[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = buf[pos + 1], buf[pos + 2], buf[pos + 3]
+    version = {3: 1, 2: 2, 0: 25}.get((b1 >> 3) & 0x3)
+    layer = {3: 1, 2: 2, 1: 3}.get((b1 >> 1) & 0x3)
+    br_idx, sr_idx = b2 >> 4, (b2 >> 2) & 0x3
+    if version is None or layer is None or br_idx in (0, 15) or sr_idx == 3:
+        return None
+    bitrate = _BITRATES[(1 if version == 1 else 2, layer)][br_idx - 1] * 1000
+    sr = _SAMPLE_RATES[version][sr_idx]
+    pad = (b2 >> 1) & 0x1
+    mono = (b3 >> 6) == 3
+    if layer == 1:
+        spf, length = 384, (12 * bitrate // sr + pad) * 4
+    elif layer == 3 and version != 1:
+        spf, length = 576, 72 * bitrate // sr + pad
+    else:
+        spf, length = 1152, 144 * bitrate // sr + pad
+    side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+    return {"sr": sr, "spf": spf, "length": length, "side_info": side_info, "layer": layer}
+
+
+def _skip_id3v2(buf):
+    if buf[:3] != b"ID3" or len(buf) < 10:
+        return 0
+    size = (buf[6] << 21) | (buf[7] << 14) | (buf[8] << 7) | buf[9]
+    footer = 10 if buf[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _xing_samples(buf, pos, hdr):
+    """Total samples from a Xing/Info or VBRI header in the first frame, or None"""
+    x = pos + 4 + hdr["side_info"]
+    if buf[x:x + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", buf[x + 4:x + 8])[0]
+        if not flags & 0x1:
+            return None
+        n_frames = struct.unpack(">I", buf[x + 8:x + 12])[0]
+        lame = x + 12 + (4 if flags & 0x2 else 0) + (100 if flags & 0x4 else 0) + (4 if flags & 0x8 else 0)
+        delay = padding = 0
+        if buf[lame:lame + 4] in (b"LAME", b"Lavc", b"Lavf") and len(buf) >= lame + 24:
+            d = buf[lame + 21:lame + 24]
+            delay, padding = (d[0] << 4) | (d[1] >> 4), ((d[1] & 0x0F) << 8) | d[2]
+        return max(0, n_frames * hdr["spf"] - delay - padding)
+    v = pos + 4 + 32
+    if buf[v:v + 4] == b"VBRI":
+        n_frames = struct.unpack(">I", buf[v + 14:v + 18])[0]
+        return n_frames * hdr["spf"]
+    return None
+
+
+def probe_mp3(path):
+    """(sample_rate, frames) from MP3 headers without decoding"""
+    with open(path, "rb") as f:
+        buf = f.read()
+    pos = _skip_id3v2(buf)
+    # resync to the first frame whose successor is also a valid header
+    while pos < len(buf) - 4:
+        hdr = _frame_header(buf, pos)
+        if hdr and hdr["length"] > 0 and (pos + hdr["length"] >= len(buf) or _frame_header(buf, pos + hdr["length"])):
+            break
+        pos += 1
+    else:
+        raise ValueError("no MPEG audio frames found")
+
+    total = _xing_samples(buf, pos, hdr)
+    if total is not None:
+        return hdr["sr"], total
+
+    total = 0
+    while True:
+        h = _frame_header(buf, pos)
+        if h is None or h["length"] <= 0:
+            break
+        total += h["spf"]
+        pos += h["length"]
+    return hdr["sr"], total
+
+
+def probe(path):
+    """Header-only (sample_rate, frames, duration) for one file"""
+    path = str(path)
+    if path.lower().endswith(".mp3"):
+        try:
+            sr, frames = probe_mp3(path)
+            return sr, frames, frames / sr
+        except (OSError, ValueError, struct.error):
+            pass
+    try:
+        import soundfile as sf
+        info = sf.info(path)
+        return info.samplerate, info.frames, info.frames / info.samplerate
+    except Exception:
+        import librosa
+        sr = librosa.get_samplerate(path)
+        duration = librosa.get_duration(path=path)
+        return sr, int(round(duration * sr)), duration
+
+
+def _probe_row(args):
+    path, size, mtime_ns = args
+    try:
+        sr, frames, duration = probe(path)
+    except Exception:
+        sr = frames = duration = None
+    return path, size, mtime_ns, sr, frames, duration
+
+
+# --- index -------------------------------------------------------------------
+
+class DurationIndex:
+    def __init__(self, db_path=INDEX_PATH):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path), timeout=60)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS audio ("
+            " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+            " sample_rate INTEGER, frames INTEGER, duration REAL)"
+        )
+        self.probed = 0
+
+    def lookup(self, paths, workers=None):
+        """
+        {str(path): {"sample_rate", "frames", "duration"}} for paths, probing
+        files that are new or changed since they were indexed. Missing files
+        map to None.
+        """
+        paths = [str(p) for p in paths]
+        keys = {p: os.path.abspath(p) for p in paths}
+        rows = {}
+        cur = self.conn.cursor()
+        uniq = list(dict.fromkeys(keys.values()))
+        for i in range(0, len(uniq), 500):
+            chunk = uniq[i:i + 500]
+            q = f"SELECT * FROM audio WHERE path IN ({','.join('?' * len(chunk))})"
+            rows.update({r[0]: r for r in cur.execute(q, chunk)})
+
+        todo, stat = [], {}
+        for key in uniq:
+            try:
+                st = os.stat(key)
+            except OSError:
+                continue
+            stat[key] = st
+            row = rows.get(key)
+            if row is None or row[1] != st.st_size or row[2] != st.st_mtime_ns:
+                todo.append((key, st.st_size, st.st_mtime_ns))
+
+        if todo:
+            self._refresh(todo, workers)
+            for key, *_ in todo:
+                rows[key] = self.conn.execute("SELECT * FROM audio WHERE path = ?", (key,)).fetchone()
+
+        out = {}
+        for p, key in keys.items():
+            row = rows.get(key) if key in stat else None
+            out[p] = {"sample_rate": row[3], "frames": row[4], "duration": row[5]} if row else None
+        return out
+
+    def _refresh(self, todo, workers=None):
+        t0 = time.time()
+        workers = workers or min(8, os.cpu_count() or 1)
+        if workers > 1 and len(todo) > 64:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_probe_row, todo, chunksize=256))
+        else:
+            results = [_probe_row(t) for t in todo]
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO audio VALUES (?, ?, ?, ?, ?, ?)", results)
+        self.probed += len(results)
+        if len(results) > 100:
+            print(f"[duration_index] indexed {len(results)} files in {time.time() - t0:.1f}s", file=sys.stderr)
+
+    def close(self):
+        self.conn.close()
+
+
+_default = None
+
+
+def default_index():
+    global _default
+    if _default is None:
+        _default = DurationIndex()
+    return _default
+
+
+def durations(paths, workers=None):
+    """{str(path): duration in seconds, or None if unreadable/missing}"""
+    info = default_index().lookup(paths, workers)
+    return {p: (i["duration"] if i else None) for p, i in info.items()}
+
+
+def duration(path):
+    return durations([path])[str(path)]
+
+
+def iter_audio(root):
+    for dirpath, _, fns in os.walk(root):
+        for fn in fns:
+            if fn.lower().endswith(AUDIO_EXTS):
+                yield os.path.join(dirpath, fn)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build / update the audio duration index")
+    ap.add_argument("roots", nargs="+", help="Audio files or directories to index")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--index", default=INDEX_PATH)
+    args = ap.parse_args()
+
+    paths = []
+    for root in args.roots:
+        paths += [root] if os.path.isfile(root) else list(iter_audio(root))
+    index = DurationIndex(args.index)
+    t0 = time.time()
+    info = index.lookup(paths, args.workers)
+    bad = sum(1 for i in info.values() if not i or i["duration"] is None)
+    total = sum(i["duration"] for i in info.values() if i and i["duration"])
+    print(f"{len(paths)} files ({index.probed} probed, {bad} unreadable), "
+          f"{total / 3600:.2f} h of audio, {time.time() - t0:.1f}s → {args.index}")
+
+
+if __name__ == "__main__":
+    main()
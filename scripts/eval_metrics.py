@@ -1,30 +1,73 @@
 #!/usr/bin/env python
-import argparse, csv, os
-from jiwer import wer, cer
+import argparse, csv, json, os, re, sys
+from collections import defaultdict
+from score_cache import ScoreCache
+
+LANG_DIR = re.compile(r"(?:^|/)(mn|hu|fr|es)(?:/|$)")
 
 ap = argparse.ArgumentParser()
-ap.add_argument("--refs", required=True, help="CSV with columns: file,ref")
+ap.add_argument("--refs", required=True, help="CSV with columns: file,ref  or  refs.jsonl ({audio, ref} per line, src/build_refs.py)")
 ap.add_argument("--hyps_dir", required=True, help="Folder with .txt transcripts")
 ap.add_argument("--out_csv", default="results/metrics/wer_cer_run.csv")
+ap.add_argument("--workers", type=int, default=None, help="Scoring processes (default: all cores)")
 args = ap.parse_args()
 
-rows = []
-with open(args.refs, encoding="utf-8") as f:
-    for line in f:
-        if not line.strip(): continue
-        file, ref = line.rstrip("\n").split(",", 1)
-        stem = os.path.splitext(os.path.basename(file))[0]
-        hyp_path = None
-        for root,_,_files in os.walk(args.hyps_dir):
-            cand = os.path.join(root, f"{stem}.txt")
-            if os.path.exists(cand):
-                hyp_path = cand; break
-        if not hyp_path: continue
-        hyp = open(hyp_path, encoding="utf-8").read().strip()
-        rows.append({"file": file, "wer": wer(ref, hyp), "cer": cer(ref, hyp)})
+def iter_refs(path):
+    """(file, ref) from the CSV (file,ref) or JSONL ({audio, ref}) format"""
+    with open(path, encoding="utf-8") as f:
+        jsonl = path.endswith(".jsonl")
+        for line in f:
+            if not line.strip(): continue
+            if jsonl or line.lstrip().startswith("{"):
+                item = json.loads(line)
+                yield item["audio"], item["ref"]
+            else:
+                file, ref = line.rstrip("\n").split(",", 1)
+                yield file, ref
+
+def lang_of(path):
+    m = LANG_DIR.search(path.replace("\\", "/"))
+    return m.group(1) if m else None
+
+# stem -> [paths], built with a single walk of the hypothesis tree
+index = defaultdict(list)
+for root, _, files in os.walk(args.hyps_dir):
+    for fn in files:
+        if fn.endswith(".txt"):
+            index[fn[:-4]].append(os.path.join(root, fn))
+dupes = {s: p for s, p in index.items() if len(p) > 1}
+if dupes:
+    print(f"⚠️  {len(dupes)} stems appear in several folders (e.g. {next(iter(dupes))}); "
+          f"resolved by the reference's language folder", file=sys.stderr)
+
+def find_hyp(file):
+    stem = os.path.splitext(os.path.basename(file))[0]
+    cands = index.get(stem) or (index.get(stem[:-4]) if stem.endswith("_16k") else None)  # auto_asr keys
+    if not cands: return None
+    if len(cands) > 1:
+        lang = lang_of(file)
+        same = [c for c in cands if lang and lang_of(os.path.relpath(c, args.hyps_dir)) == lang]
+        if len(same) == 1: return same[0]
+        print(f"⚠️  ambiguous hypothesis for {file}: {cands}", file=sys.stderr)
+        return None
+    return cands[0]
+
+files, pairs, missing = [], [], 0
+for file, ref in iter_refs(args.refs):
+    hyp_path = find_hyp(file)
+    if not hyp_path:
+        missing += 1; continue
+    with open(hyp_path, encoding="utf-8") as f:
+        hyp = f.read().strip()
+    files.append(file); pairs.append((ref, hyp))
+
+cache = ScoreCache()
+rows = [{"file": file, "wer": m["wer"], "cer": m["cer"]}
+        for file, m in zip(files, cache.score(pairs, args.workers)) if m is not None]
+cache.close()
 
 os.makedirs(os.path.dirname(args.out_csv), exist_ok=True)
 with open(args.out_csv, "w", newline="", encoding="utf-8") as f:
     w = csv.DictWriter(f, fieldnames=["file","wer","cer"])
     w.writeheader(); w.writerows(rows)
-print(f"Wrote {args.out_csv} ({len(rows)} rows)")
+print(f"Wrote {args.out_csv} ({len(rows)} rows, {missing} refs without hypothesis)")
@@ -0,0 +1,758 @@
+#!/usr/bin/env python3
+"""
+Resumable experiment scheduler.
+
+Replaces the serial bash loops (run_full_evaluation.sh,
+run_all_models_v23.sh, run_comparison_batch.sh). A grid of
+
+    system x model x language x mode x decode config
+
+is expanded into tasks, one runner process per task (manifest/in-dir
+mode, so the model loads once per task). Every task's state is kept in a
+SQLite ledger (ASR_EXPERIMENT_LEDGER, default results/logs/experiments.sqlite):
+
+    pending -> running -> done | failed     (attempts, wall_sec, audio_sec, run_audio_sec, error, log)
+
+Re-running the same command skips done tasks, picks up pending/failed/
+interrupted ones, and each runner resumes inside its own shard
+(run_shard.py), so a crash at file 3000 costs one partial batch, not the
+run. Failures are retried with exponential backoff (--retries, --backoff).
+
+ETA: audio seconds per task come from the duration index (header-only,
+cached); RTF is observed from finished tasks per system/model/mode, falling
+back to the system's mean. A resumed run only processes what its shard does
+not hold yet, so RTF is wall_sec / run_audio_sec, the audio of the clips the
+last attempt added to the shard.
+
+    python scripts/experiments.py plan --grid full
+    python scripts/experiments.py run --grid v23 --device cpu --retries 2
+    python scripts/experiments.py run --grid full --systems whisper --models tiny --configs default batch-size=8
+    python scripts/experiments.py status
+
+A config is "default" or comma-separated runner flags without the dashes
+(batch-size=8,compute-type=int8); configs other than default write under
+<outdir>-configs/<config>/. Every task has its own shard
+(<runner tree>/results.<lang>.jsonl), so tasks running side by side never
+append to, resume from or compact the same file.
+
+CPU packing: --workers N runs N tasks at once, each runner pinned to its
+own --threads cores (sched_setaffinity) with OMP/MKL/OpenBLAS threads,
+faster-whisper cpu_threads / torch threads (ASR_CPU_THREADS, see
+model_registry.py) and audio decode processes sized to match, so the
+workers do not oversubscribe the machine. Tasks are started longest first.
+--workers auto picks N x threads per system/model from a short calibration:
+every layout that fills the cores (16 x 1, 8 x 2, ... 1 x 16) runs N copies
+of the task on a few clips, and the one with the best aggregate audio
+seconds per wall second wins. Layouts whose N copies of the model would
+not fit in available RAM (peak RSS of a warm-up run) are not tried, and N
+is capped at the number of tasks in the group (threads = cores / N).
+Results are kept in the ledger, so a model is calibrated once per machine
+(--recalibrate to redo it):
+
+    python scripts/experiments.py run --grid full --workers auto
+    python scripts/experiments.py run --grid full --workers 4 --threads 4
+    python scripts/experiments.py calibrate --grid full --models tiny small
+"""
+
+import argparse
+import itertools
+import json
+import os
+import queue
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+LEDGER_PATH = os.environ.get("ASR_EXPERIMENT_LEDGER", "results/logs/experiments.sqlite")
+LOG_DIR = "results/logs/experiments"
+LANGS = ["mn", "hu", "es", "fr"]
+AUDIO_EXTS = (".wav", ".flac", ".mp3", ".m4a", ".ogg")
+SCRIPTS = Path(__file__).resolve().parent
+THREAD_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+CALIBRATION_TIMEOUT = 1800
+MEMORY_HEADROOM = 0.8  # share of available RAM calibration may fill with model copies
+
+GRIDS = {
+    # run_full_evaluation.sh: Whisper sizes on all languages, Wav2Vec2 on ES/FR
+    "full": [
+        {"system": "whisper", "models": ["tiny", "base", "small"], "langs": LANGS, "modes": ["hinted"]},
+        # facebook/wav2vec2-large-xlsr-53-{spanish,french}, the checkpoints run_wav2vec2.py used here
+        {"system": "wav2vec2", "models": ["xlsr-53"], "langs": ["es", "fr"], "modes": ["hinted"]},
+    ],
+    # run_all_models_v23.sh: Whisper-small + the three OmniLingual cards
+    "v23": [
+        {"system": "whisper", "models": ["small"], "langs": LANGS, "modes": ["hinted"],
+         "outdir": "results_v23/transcripts"},
+        {"system": "omnilingual", "models": ["omniASR_CTC_300M", "omniASR_CTC_1B", "omniASR_LLM_1B"],
+         "langs": LANGS, "modes": ["hinted"], "outdir": "results_v23/transcripts"},
+    ],
+    # run_comparison_batch.sh: compare_systems.py, Whisper vs Wav2Vec2
+    "comparison": [
+        {"system": "compare", "models": ["small"], "langs": ["mn", "hu"], "modes": ["hinted"],
+         "outdir": "results/comparison"},
+    ],
+    # MMS, all languages (run_mms_all.sh)
+    "mms": [
+        {"system": "mms", "models": ["mms-1b-all"], "langs": LANGS, "modes": ["hinted"]},
+    ],
+}
+
+
+# --- grid ---------------------------------------------------------------------
+
+def config_flags(config):
+    """"batch-size=8,vad" -> ["--batch-size", "8", "--vad"]"""
+    if config == "default":
+        return []
+    flags = []
+    for item in config.split(","):
+        key, _, value = item.partition("=")
+        flags.append(f"--{key.strip()}")
+        if value:
+            flags.append(value.strip())
+    return flags
+
+
+def task_id(t):
+    return f"{t['system']}/{t['model']}/{t['mode']}/{t['lang']}/{t['config']}"
+
+
+def expand(grid, systems=None, models=None, langs=None, modes=None, configs=None, outdir=None):
+    """Tasks (dicts) for the cross product of each grid entry, optionally narrowed"""
+    tasks = []
+    for entry in grid:
+        if systems and entry["system"] not in systems:
+            continue
+        for model, lang, mode, config in itertools.product(
+                entry["models"], entry["langs"], entry["modes"], configs or entry.get("configs", ["default"])):
+            if (models and model not in models) or (langs and lang not in langs) or (modes and mode not in modes):
+                continue
+            t = {"system": entry["system"], "model": model, "lang": lang, "mode": mode, "config": config,
+                 "outdir": outdir or entry.get("outdir", "results/transcripts")}
+            t["id"] = task_id(t)
+            tasks.append(t)
+    return tasks
+
+
+# --- runner commands ----------------------------------------------------------
+
+def task_shard(task):
+    """Shard the task's runner appends to (one per task), or None for compare tasks"""
+    system, model, lang, mode = task["system"], task["model"], task["lang"], task["mode"]
+    tree = os.path.join(task_outdir(task), mode)
+    if system == "whisper":
+        return os.path.join(tree, model, f"results.{lang}.jsonl")
+    if system == "wav2vec2":
+        # both wav2vec2 model sets share one tree
+        return os.path.join(tree, "wav2vec2", f"results.{model}.{lang}.jsonl")
+    if system == "mms":
+        return os.path.join(tree, "mms", f"results.{lang}.jsonl")
+    if system == "omnilingual":
+        return os.path.join(tree, "omnilingual", model, f"results.{lang}.jsonl")
+    return None
+
+
+def task_outdir(task):
+    if task["config"] == "default":
+        return task["outdir"]
+    # a sibling root, so scans of the default tree do not pick up other configs
+    return os.path.join(task["outdir"].rstrip("/") + "-configs", task["config"].replace("=", "-").replace(",", "_"))
+
+
+def command(task, audio_dir="data/wav", device="cpu", resume=True):
+    """argv for one task (resume=False: the runner starts a fresh shard)"""
+    py = [sys.executable]
+    system, model, lang, mode = task["system"], task["model"], task["lang"], task["mode"]
+    outdir = task_outdir(task)
+    lang_dir = os.path.join(audio_dir, lang)
+    if system == "whisper":
+        cmd = py + [str(SCRIPTS / "run_whisper.py"), "--mode", mode, "--model", model, "--device", device,
+                    "--in-dir", lang_dir, "--outdir", outdir]
+        if mode == "hinted":
+            cmd += ["--hint-lang", lang]
+        cmd += ["--shard", task_shard(task)]
+    elif system == "wav2vec2":
+        cmd = py + [str(SCRIPTS / "asr_wav2vec2.py"), "--mode", mode, "--model-set", model, "--device", device,
+                    "--in-dir", lang_dir, "--hint-lang", lang, "--outdir", outdir]
+        cmd += ["--shard", task_shard(task)]
+    elif system == "mms":
+        mms_dir = os.path.join(outdir, mode, "mms")
+        cmd = py + [str(SCRIPTS / "run_mms.py"), "--in-dir", audio_dir, "--languages", lang,
+                    "--device", device, "--save-json", "--outdir", mms_dir]
+        cmd += ["--shard", task_shard(task)]
+    elif system == "omnilingual":
+        omni_dir = os.path.join(outdir, mode, "omnilingual")
+        cmd = py + [str(SCRIPTS / "run_omnilingual_batch.py"), "--models", model, "--languages", lang,
+                    "--audio-dir", audio_dir, "--output-dir", omni_dir]
+        cmd += ["--shard", task_shard(task)]
+    elif system == "compare":
+        out_csv = os.path.join(outdir, f"system_comparison_{model}_{lang}_{task['config']}.csv")
+        cmd = py + [str(SCRIPTS / "compare_systems.py"), "--audio", lang_dir, "--mode", mode,
+                    "--langs", lang, "--whisper-model", model, "--device", device, "--out-csv", out_csv]
+    else:
+        raise ValueError(f"unknown system: {system}")
+    if not resume and system != "compare":
+        cmd.append("--no-resume")
+    return cmd + config_flags(task["config"])
+
+
+def task_files(task, audio_dir="data/wav"):
+    """Audio files a task will process (for ETA)"""
+    lang_dir = Path(audio_dir) / task["lang"]
+    if task["system"] in ("mms", "omnilingual"):
+        return sorted(str(p) for p in lang_dir.glob("*.mp3"))
+    return sorted(str(p) for p in lang_dir.rglob("*") if p.suffix.lower() in AUDIO_EXTS)
+
+
+# --- ledger -------------------------------------------------------------------
+
+class Ledger:
+    COLUMNS = ["task_id", "system", "model", "lang", "mode", "config", "status", "attempts",
+               "audio_sec", "run_audio_sec", "wall_sec", "started_at", "finished_at", "error", "log"]
+
+    def __init__(self, path=LEDGER_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # shared by the worker threads; every access goes through the lock
+        self.conn = sqlite3.connect(str(self.path), timeout=60, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " task_id TEXT PRIMARY KEY, system TEXT, model TEXT, lang TEXT, mode TEXT, config TEXT,"
+            " status TEXT, attempts INTEGER DEFAULT 0, audio_sec REAL, wall_sec REAL,"
+            " started_at REAL, finished_at REAL, error TEXT, log TEXT)"
+        )
+        if "run_audio_sec" not in {r[1] for r in self.conn.execute("PRAGMA table_info(tasks)")}:
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN run_audio_sec REAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS calibration ("
+            " system TEXT, model TEXT, device TEXT, cores INTEGER, workers INTEGER, threads INTEGER,"
+            " audio_per_sec REAL, measured_at REAL, PRIMARY KEY (system, model, device, cores, workers, threads))"
+        )
+        # per calibration: workers that fit in RAM (from the warm-up run's peak RSS; NULL if
+        # unknown) and the largest worker count measured
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS calibration_limits ("
+            " system TEXT, model TEXT, device TEXT, cores INTEGER, worker_rss REAL, memory_workers INTEGER,"
+            " measured_workers INTEGER, measured_at REAL, PRIMARY KEY (system, model, device, cores))"
+        )
+
+    def register(self, tasks):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tasks (task_id, system, model, lang, mode, config, status)"
+                " VALUES (?, ?, ?, ?, ?, ?, 'pending')",
+                [(t["id"], t["system"], t["model"], t["lang"], t["mode"], t["config"]) for t in tasks],
+            )
+
+    def get(self, tid):
+        with self.lock:
+            row = self.conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM tasks WHERE task_id = ?",
+                                    (tid,)).fetchone()
+        return dict(zip(self.COLUMNS, row)) if row else None
+
+    def rows(self):
+        with self.lock:
+            cur = self.conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM tasks ORDER BY task_id")
+            return [dict(zip(self.COLUMNS, r)) for r in cur]
+
+    def update(self, tid, **fields):
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        with self.lock, self.conn:
+            self.conn.execute(f"UPDATE tasks SET {sets} WHERE task_id = ?", (*fields.values(), tid))
+
+    def start(self, tid, log):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE tasks SET status = 'running', attempts = attempts + 1, started_at = ?,"
+                              " log = ?, error = NULL WHERE task_id = ?", (time.time(), log, tid))
+
+    def observed_rtf(self):
+        """{(system, model, mode): rtf} and {system: rtf} from finished tasks"""
+        by_key, by_system = {}, {}
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT system, model, mode, SUM(wall_sec), SUM(COALESCE(run_audio_sec, audio_sec)) FROM tasks"
+                " WHERE status = 'done' AND COALESCE(run_audio_sec, audio_sec) > 0"
+                " GROUP BY system, model, mode").fetchall()
+        for system, model, mode, wall, audio in rows:
+            by_key[(system, model, mode)] = wall / audio
+            w, a = by_system.get(system, (0.0, 0.0))
+            by_system[system] = (w + wall, a + audio)
+        return by_key, {s: w / a for s, (w, a) in by_system.items()}
+
+    def record_calibration(self, system, model, device, cores, workers, threads, audio_per_sec):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO calibration VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              (system, model, device, cores, workers, threads, audio_per_sec, time.time()))
+
+    def record_limits(self, system, model, device, cores, worker_rss, memory_workers, measured_workers):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO calibration_limits VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              (system, model, device, cores, worker_rss, memory_workers, measured_workers,
+                               time.time()))
+
+    def limits(self, system, model, device, cores):
+        """(workers that fit in RAM or None, largest measured worker count), or None before any calibration"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT memory_workers, measured_workers FROM calibration_limits WHERE system = ? AND model = ?"
+                " AND device = ? AND cores = ?", (system, model, device, cores)).fetchone()
+        return tuple(row) if row else None
+
+    def best_layout(self, system, model, device, cores, max_workers=None):
+        """(workers, threads) with the best calibrated throughput (at most max_workers), or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT workers, threads FROM calibration WHERE system = ? AND model = ? AND device = ?"
+                " AND cores = ? AND audio_per_sec > 0 AND workers <= ? ORDER BY audio_per_sec DESC LIMIT 1",
+                (system, model, device, cores, max_workers or cores)).fetchone()
+        return tuple(row) if row else None
+
+    def close(self):
+        self.conn.close()
+
+
+def row_rtf(row):
+    """wall_sec over the audio the last attempt processed (the task's total if unknown), or None"""
+    audio = row["run_audio_sec"] if row["run_audio_sec"] is not None else row["audio_sec"]
+    return row["wall_sec"] / audio if row["wall_sec"] and audio else None
+
+
+def estimate(ledger, tasks, audio_sec):
+    """Remaining seconds for tasks not done (None where no RTF has been observed yet)"""
+    by_key, by_system = ledger.observed_rtf()
+    total, unknown = 0.0, 0
+    for t in tasks:
+        if (ledger.get(t["id"]) or {}).get("status") == "done":
+            continue
+        rtf = by_key.get((t["system"], t["model"], t["mode"]), by_system.get(t["system"]))
+        if rtf is None:
+            unknown += 1
+        else:
+            total += rtf * audio_sec.get(t["id"], 0.0)
+    return total, unknown
+
+
+def fmt_sec(sec):
+    h, rem = divmod(int(sec), 3600)
+    return f"{h}h{rem // 60:02d}m" if h else f"{rem // 60}m{rem % 60:02d}s"
+
+
+def task_audio(tasks, audio_dir):
+    """{task id: audio seconds} via the shared duration index"""
+    from duration_index import durations
+    files = {t["id"]: task_files(t, audio_dir) for t in tasks}
+    durs = durations(sorted({p for fs in files.values() for p in fs}))
+    return {tid: sum(durs.get(p) or 0.0 for p in fs) for tid, fs in files.items()}
+
+
+# --- execution ----------------------------------------------------------------
+
+def available_cpus(limit=None):
+    """CPU ids this process may run on (first `limit` of them)"""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    return cpus[:limit] if limit else cpus
+
+
+def cpu_layout(workers, threads, cpus):
+    """Disjoint core sets, one per worker slot ([None] * workers where pinning is unavailable)"""
+    if not hasattr(os, "sched_setaffinity") or workers * threads > len(cpus):
+        return [None] * workers
+    return [cpus[i * threads:(i + 1) * threads] for i in range(workers)]
+
+
+def worker_env(threads, base=None):
+    """Environment for a runner limited to `threads` cores"""
+    env = dict(os.environ if base is None else base)
+    for var in THREAD_VARS:
+        env[var] = str(threads)
+    env["ASR_CPU_THREADS"] = str(threads)
+    env["ASR_NUM_WORKERS"] = "1"
+    env["ASR_DECODE_WORKERS"] = str(max(1, threads // 4))
+    return env
+
+
+def _pin(pid, cpus):
+    # set right after fork: the runner's compute threads are created at model
+    # load and inherit the mask
+    if cpus:
+        try:
+            os.sched_setaffinity(pid, cpus)
+        except OSError:
+            pass
+
+
+def _shard_keys(path):
+    from run_shard import read_shard
+    return {r.get("key") for r in read_shard(path)}
+
+
+def _added_audio(path, done_before):
+    """Audio seconds of the clips in the shard that were not in done_before"""
+    from duration_index import durations
+    added = sorted(_shard_keys(path) - done_before - {None})
+    return sum(d or 0.0 for d in durations(added).values()) if added else 0.0
+
+
+def run_task(task, ledger, opts, env=None, cpus=None):
+    """Run one task with retries; returns True if it finished"""
+    tid = task["id"]
+    log = os.path.join(LOG_DIR, tid.replace("/", "__") + ".log")
+    os.makedirs(LOG_DIR, exist_ok=True)
+    os.makedirs(task_outdir(task), exist_ok=True)
+    shard = task_shard(task)
+    for attempt in range(opts.retries + 1):
+        # --force recomputes: the first attempt starts a fresh shard, retries resume it
+        resume = not (opts.force and attempt == 0)
+        cmd = command(task, opts.audio_dir, opts.device, resume=resume)
+        done_before = _shard_keys(shard) if shard and resume else set()
+        ledger.start(tid, log)
+        t0 = time.time()
+        with open(log, "a", encoding="utf-8") as f:
+            f.write(f"\n=== {time.strftime('%Y-%m-%d %H:%M:%S')} attempt {attempt + 1}: {' '.join(cmd)}\n")
+            if cpus:
+                f.write(f"=== cpus {cpus[0]}-{cpus[-1]}, {len(cpus)} threads\n")
+            f.flush()
+            proc = subprocess.Popen(cmd, stdout=f, stderr=subprocess.STDOUT, env=env)
+            _pin(proc.pid, cpus)
+            try:
+                rc = proc.wait(timeout=opts.timeout)
+                error = None if rc == 0 else f"exit code {rc}"
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+                error = f"timeout after {opts.timeout}s"
+        wall = time.time() - t0
+        if error is None:
+            ledger.update(tid, status="done", wall_sec=wall, finished_at=time.time(),
+                          run_audio_sec=_added_audio(shard, done_before) if shard else None)
+            return True
+        ledger.update(tid, status="failed", wall_sec=wall, finished_at=time.time(), error=error)
+        if attempt < opts.retries:
+            delay = opts.backoff * 2 ** attempt
+            print(f"   ↻ {tid}: {error}, retry in {delay:.0f}s (log: {log})", file=sys.stderr)
+            time.sleep(delay)
+    print(f"   ❌ {tid}: {error} after {opts.retries + 1} attempts (log: {log})", file=sys.stderr)
+    return False
+
+
+# --- calibration --------------------------------------------------------------
+
+def available_memory():
+    """Bytes of RAM available to new processes, or None if unknown"""
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def candidates(cores, max_workers=None):
+    """(workers, threads) layouts filling `cores`: cores x 1, ..., 1 x cores, at most max_workers"""
+    layouts = [(cores // t, t) for t in range(1, cores + 1) if cores % t == 0]
+    if max_workers and max_workers < cores:
+        layouts = [(w, t) for w, t in layouts if w <= max_workers]
+        if (max_workers, cores // max_workers) not in layouts:
+            layouts.insert(0, (max_workers, cores // max_workers))
+    return layouts
+
+
+def _wait(proc, timeout):
+    """(exit code or None on timeout, peak RSS in bytes or None)"""
+    if not hasattr(os, "wait4"):
+        try:
+            return proc.wait(timeout=timeout), None
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            return None, None
+    deadline = time.time() + timeout
+    while True:
+        pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+        if pid:
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            return proc.returncode, usage.ru_maxrss * 1024  # KiB on Linux
+        if time.time() > deadline:
+            proc.kill()
+            proc.wait()
+            return None, None
+        time.sleep(0.2)
+
+
+def _launch(task, audio_dir, outdir, opts, env, cpus):
+    os.makedirs(outdir, exist_ok=True)
+    log = open(os.path.join(outdir, "calibration.log"), "w", encoding="utf-8")
+    proc = subprocess.Popen(command(dict(task, outdir=outdir), audio_dir, opts.device),
+                            stdout=log, stderr=subprocess.STDOUT, env=env)
+    _pin(proc.pid, cpus)
+    return proc, log
+
+
+def _window(outdir):
+    """(first clip start, last clip end) from a calibration run's shards, or None"""
+    from results_store import normalize
+    from run_shard import read_shard
+    records = [r for p in Path(outdir).rglob("results*.jsonl") for r in read_shard(p)]
+    if not records:
+        return None
+    first = min(records, key=lambda r: r["written_at"])
+    took = normalize(first.get("sidecar") or {})["processing_time_sec"] or 0.0
+    return first["written_at"] - took, max(r["written_at"] for r in records)
+
+
+def measure(task, opts, audio_dir, tmp, workers, threads, cpus, sample_sec):
+    """(aggregate audio seconds per wall second of `workers` concurrent copies of the task, peak RSS per copy)"""
+    env = worker_env(threads)
+    env["ASR_RESULTS_STORE"] = "off"
+    runs = []
+    t0 = time.time()
+    for w, slot in enumerate(cpu_layout(workers, threads, cpus)):
+        outdir = os.path.join(tmp, f"{workers}x{threads}", f"w{w}")
+        runs.append((outdir, *_launch(task, audio_dir, outdir, opts, env, slot)))
+    ok, rss = True, None
+    for _, proc, log in runs:
+        rc, peak = _wait(proc, opts.timeout or CALIBRATION_TIMEOUT)
+        ok &= rc == 0
+        rss = max(rss or 0, peak) if peak else rss
+        log.close()
+    wall = time.time() - t0
+    if not ok:
+        return None, rss
+    # model loading is not part of steady-state throughput: time from the first
+    # clip started to the last clip finished across all workers (wall time for
+    # runners without a shard)
+    windows = [_window(outdir) for outdir, _, _ in runs]
+    if all(windows):
+        wall = max(end for _, end in windows) - min(start for start, _ in windows)
+    return (workers * sample_sec / wall if wall > 0 else None), rss
+
+
+def calibrate(task, ledger, opts, cpus, max_workers=None):
+    """
+    Measure every layout for the task's system/model with at most max_workers
+    workers (and no more than fit in RAM); returns the best (workers, threads)
+    """
+    from duration_index import durations
+    files = task_files(task, opts.audio_dir)
+    if not files:
+        print(f"   ⚠️  {task['system']}/{task['model']}: no audio to calibrate on, 1 worker", file=sys.stderr)
+        return 1, None
+    step = max(1, len(files) // opts.calibration_clips)
+    sample = files[::step][:opts.calibration_clips]
+    sample_sec = sum(durations(sample).get(p) or 0.0 for p in sample) or float(len(sample))
+
+    print(f"🔧 calibrating {task['system']}/{task['model']} on {len(sample)} clips ({sample_sec:.0f}s audio), "
+          f"{len(cpus)} cores", file=sys.stderr)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="asr-calibrate-") as tmp:
+        audio_dir = os.path.join(tmp, "audio")
+        lang_dir = os.path.join(audio_dir, task["lang"])
+        os.makedirs(lang_dir)
+        for p in sample:
+            link = os.path.join(lang_dir, os.path.basename(p))
+            if not os.path.lexists(link):
+                os.symlink(os.path.abspath(p), link)
+        # warm-up: model download / page cache, so the first layout is not penalised;
+        # its peak RSS bounds how many copies of the model fit in memory
+        _, rss = measure(task, opts, audio_dir, os.path.join(tmp, "warmup"), 1, len(cpus), cpus, sample_sec)
+        memory = available_memory()
+        fit = None
+        if rss and memory:
+            fit = max(1, int(memory * MEMORY_HEADROOM // rss))
+            print(f"   {rss / 1e9:.1f} GB per worker, {memory / 1e9:.1f} GB available → at most {fit} workers",
+                  file=sys.stderr)
+            max_workers = min(max_workers or fit, fit)
+        else:
+            print("   ⚠️  worker memory unknown, layouts not checked against RAM (use --max-workers)",
+                  file=sys.stderr)
+        layouts = candidates(len(cpus), max_workers)
+        ledger.record_limits(task["system"], task["model"], opts.device, len(cpus), rss, fit,
+                             max(w for w, _ in layouts))
+        for workers, threads in layouts:
+            rate, _ = measure(task, opts, audio_dir, tmp, workers, threads, cpus, sample_sec)
+            results[(workers, threads)] = rate
+            ledger.record_calibration(task["system"], task["model"], opts.device, len(cpus),
+                                      workers, threads, rate)
+            shown = f"{rate:.1f} audio-s/s" if rate else "failed"
+            print(f"   {workers:3d} x {threads:<3d} threads: {shown}", file=sys.stderr)
+    best = max((k for k, v in results.items() if v), key=lambda k: results[k], default=None)
+    if best is None:
+        print("   ⚠️  every layout failed, running 1 worker", file=sys.stderr)
+        return 1, None
+    print(f"   → {best[0]} workers x {best[1]} threads", file=sys.stderr)
+    return best
+
+
+def layouts(todo, ledger, opts, cpus):
+    """[(workers, threads, tasks)]: all tasks at --workers/--threads, or one group per system/model for auto"""
+    if opts.workers != "auto":
+        workers = int(opts.workers)
+        threads = opts.threads or (max(1, len(cpus) // workers) if workers > 1 else None)
+        return [(workers, threads, todo)] if todo else []
+    groups = {}
+    for t in todo:
+        groups.setdefault((t["system"], t["model"]), []).append(t)
+    out = []
+    for (system, model), group in groups.items():
+        # no more workers than tasks to run side by side, than asked for, or than fit in RAM;
+        # a calibration capped lower than that (e.g. for a smaller group) is redone
+        cap = min(len(group), opts.max_workers or len(group))
+        limits = ledger.limits(system, model, opts.device, len(cpus))
+        layout = None
+        if limits and not opts.recalibrate and limits[1] >= min(cap, limits[0] or cap):
+            layout = ledger.best_layout(system, model, opts.device, len(cpus), min(cap, limits[0] or cap))
+        if opts.device != "cpu":
+            layout = (1, None)
+        elif layout is None and opts.dry_run:
+            print(f"   (would calibrate {system}/{model})", file=sys.stderr)
+            layout = (1, None)
+        elif layout is None:
+            calibrate(group[0], ledger, opts, cpus, cap)
+            fit = ledger.limits(system, model, opts.device, len(cpus))[0]
+            layout = ledger.best_layout(system, model, opts.device, len(cpus), min(cap, fit or cap)) or (1, None)
+        out.append((*layout, group))
+    return out
+
+
+# --- scheduling ---------------------------------------------------------------
+
+def run_pool(todo, ledger, opts, audio, cpus, workers=1, threads=None):
+    """Run tasks on `workers` slots, each pinned to its own `threads` cores; returns failures"""
+    if workers > 1:
+        todo = sorted(todo, key=lambda t: -audio[t["id"]])  # longest first: short tasks fill the tail
+    slots = queue.Queue()
+    for slot in (cpu_layout(workers, threads, cpus) if threads else [None] * workers):
+        slots.put(slot)
+    env = worker_env(threads) if threads else None
+    counter = itertools.count(1)
+    lock = threading.Lock()
+
+    def job(t):
+        slot = slots.get()
+        try:
+            with lock:
+                i = next(counter)
+                remaining, unknown = estimate(ledger, todo, audio)
+                eta = fmt_sec(remaining / workers) + (f" + {unknown} tasks without RTF yet" if unknown else "")
+                print(f"[{i}/{len(todo)}] {t['id']} ({audio[t['id']]:.0f}s audio) — ETA {eta}", file=sys.stderr)
+                if opts.dry_run:
+                    print("   " + " ".join(command(t, opts.audio_dir, opts.device, resume=not opts.force)))
+                    return True
+            if not run_task(t, ledger, opts, env=env, cpus=slot):
+                return False
+            row = ledger.get(t["id"])
+            rtf = row_rtf(row)
+            print(f"   ✅ {t['id']} {fmt_sec(row['wall_sec'])}" + (f", RTF {rtf:.3f}" if rtf else ""),
+                  file=sys.stderr)
+            return True
+        finally:
+            slots.put(slot)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(not ok for ok in pool.map(job, todo))
+
+
+def run(tasks, ledger, opts):
+    audio = task_audio(tasks, opts.audio_dir)
+    for t in tasks:
+        ledger.update(t["id"], audio_sec=audio[t["id"]])
+    todo = [t for t in tasks if opts.force or ledger.get(t["id"])["status"] != "done"]
+    print(f"{len(tasks)} tasks, {len(tasks) - len(todo)} already done, {len(todo)} to run", file=sys.stderr)
+
+    cpus = available_cpus(opts.cores)
+    failed = 0
+    for workers, threads, group in layouts(todo, ledger, opts, cpus):
+        if workers > 1 or threads:
+            print(f"▶ {len(group)} tasks on {workers} workers x {threads or '-'} threads", file=sys.stderr)
+        failed += run_pool(group, ledger, opts, audio, cpus, workers, threads)
+    print(f"{len(todo) - failed}/{len(todo)} tasks finished, {failed} failed", file=sys.stderr)
+    return failed
+
+
+def status(ledger, tasks=None):
+    ids = {t["id"] for t in tasks} if tasks else None
+    rows = [r for r in ledger.rows() if ids is None or r["task_id"] in ids]
+    counts = {}
+    for r in rows:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+        rtf = f"{row_rtf(r):.3f}" if row_rtf(r) else "-"
+        print(f"{r['status']:8s} {r['task_id']:55s} attempts={r['attempts']} rtf={rtf}"
+              + (f"  {r['error']}" if r["error"] else ""))
+    print(json.dumps(counts))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Resumable ASR experiment scheduler")
+    ap.add_argument("action", choices=["plan", "run", "status", "calibrate"])
+    ap.add_argument("--grid", choices=sorted(GRIDS), default="full")
+    ap.add_argument("--systems", nargs="+")
+    ap.add_argument("--models", nargs="+")
+    ap.add_argument("--langs", nargs="+")
+    ap.add_argument("--modes", nargs="+", choices=["hinted", "lid2asr"])
+    ap.add_argument("--configs", nargs="+", help='Decode configs ("default" or flag=value,...)')
+    ap.add_argument("--audio-dir", default="data/wav")
+    ap.add_argument("--outdir", default=None, help="Transcripts root (default: per grid)")
+    ap.add_argument("--device", default="cpu")
+    ap.add_argument("--ledger", default=LEDGER_PATH)
+    ap.add_argument("--retries", type=int, default=2, help="Extra attempts per failed task")
+    ap.add_argument("--backoff", type=float, default=30.0, help="Seconds before the first retry (doubles)")
+    ap.add_argument("--timeout", type=float, default=None, help="Seconds per attempt")
+    ap.add_argument("--force", action="store_true", help="Re-run tasks already done")
+    ap.add_argument("--dry-run", action="store_true", help="Print commands instead of running them")
+    ap.add_argument("--workers", default="1",
+                    help='Tasks run concurrently, or "auto" to calibrate per system/model (CPU only)')
+    ap.add_argument("--threads", type=int, default=None, help="Cores per worker (default: cores / workers)")
+    ap.add_argument("--max-workers", type=int, default=None,
+                    help="auto: cap on concurrent workers (each holds its own copy of the model; "
+                         "calibration also caps by available RAM)")
+    ap.add_argument("--cores", type=int, default=None, help="Use only the first N usable cores")
+    ap.add_argument("--calibration-clips", type=int, default=8, help="auto: clips per calibration run")
+    ap.add_argument("--recalibrate", action="store_true", help="auto: ignore stored calibrations")
+    args = ap.parse_args()
+    if args.workers != "auto" and not (args.workers.isdigit() and int(args.workers) > 0):
+        ap.error('--workers must be a positive integer or "auto"')
+
+    tasks = expand(GRIDS[args.grid], args.systems, args.models, args.langs, args.modes, args.configs,
+                   args.outdir)
+    ledger = Ledger(args.ledger)
+    ledger.register(tasks)
+    try:
+        if args.action == "status":
+            status(ledger, tasks)
+        elif args.action == "plan":
+            audio = task_audio(tasks, args.audio_dir)
+            remaining, unknown = estimate(ledger, tasks, audio)
+            for t in tasks:
+                print(f"{ledger.get(t['id'])['status']:8s} {t['id']:55s} {audio[t['id']]:8.0f}s audio")
+            print(f"ETA {fmt_sec(remaining)}" + (f" + {unknown} tasks without an observed RTF" if unknown else ""))
+        elif args.action == "calibrate":
+            cpus = available_cpus(args.cores)
+            seen = set()
+            for t in tasks:
+                if (t["system"], t["model"]) not in seen:
+                    seen.add((t["system"], t["model"]))
+                    calibrate(t, ledger, args, cpus, args.max_workers)
+        else:
+            sys.exit(1 if run(tasks, ledger, args) else 0)
+    finally:
+        ledger.close()
+
+
+if __name__ == "__main__":
+    main()
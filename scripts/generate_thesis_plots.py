@@ -4,7 +4,8 @@ import matplotlib.pyplot as plt
 import json
 from pathlib import Path
 import numpy as np
-import os
+
+from duration_index import durations as indexed_durations
 
 def setup_thesis_style():
     """Set up publication-quality plot styling"""
@@ -75,17 +76,15 @@ def plot_duration_analysis(out_dir):
     durations = []
     languages = ['mn', 'hu', 'es', 'fr']
     
-    # Collect durations using ffprobe
+    # Collect durations from the duration index
     for lang in languages:
         lang_durations = []
-        wav_dir = Path(f'data/wav/{lang}')
-        for audio_file in wav_dir.glob('*.mp3'):
-            cmd = f"ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 {audio_file}"
-            try:
-                duration = float(os.popen(cmd).read().strip())
-                lang_durations.append({'language': lang, 'duration': duration, 'file': audio_file.name})
-            except:
+        audio_files = sorted(Path(f'data/wav/{lang}').glob('*.mp3'))
+        for audio_file, duration in zip(audio_files, indexed_durations(audio_files).values()):
+            if duration is None:
                 print(f"Warning: Could not get duration for {audio_file}")
+                continue
+            lang_durations.append({'language': lang, 'duration': duration, 'file': audio_file.name})
         durations.extend(lang_durations)
     
     # Convert to DataFrame
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Compact the legacy results/transcripts tree into the columnar results store.
+
+Historical sidecars come in every runner's schema (processing_time_sec,
+elapsed_sec, latency_sec, ...) and some clips only have a .txt. The tree is
+walked once; every sidecar is paired with its transcript (same folder, or
+the txt/ sibling of a json/ folder), .txt files without a sidecar become
+transcript-only rows, and system / model / mode / language missing from a
+sidecar are taken from its path:
+
+    <mode>/<system>/<lang>/               mms, wav2vec2, whisper-small (beam)
+    <mode>/<size>/<lang>/                 run_whisper.py (system whisper-<size>)
+    <mode>/<system>/<model>/<lang>/       omnilingual/<card>
+    <mode>/<system>/<lang>/{json,txt}/    asr_whisper.py, sweep_decode.py
+
+Files are parsed in worker processes and normalized with
+results_store.normalize(); rows keep the sidecar's mtime as written_at, so
+a later live run of the same key still wins. Sidecars that do not name
+their audio file (run_whisper.py's) are matched by stem (and language
+folder) against --audio-dir, so `file` has the same path form as the live
+runners' rows and the store key dedupes. Their duration_sec is wall time;
+it becomes processing_time_sec and the audio length comes from
+duration_index.py.
+
+A completed import writes <store>/_import/complete; until then analyses
+keep reading the sidecars (results_store.available()).
+
+The import is resumable: <store>/_import/state.sqlite records each file's
+size/mtime once its rows are flushed, and re-runs only read new or changed
+files (--full re-reads everything). Skipped and corrupt files are listed in
+<store>/_import/skipped.csv.
+
+    python scripts/import_results.py results/transcripts --workers 8
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import duration_index
+import results_store
+
+MODES = {"hinted", "lid2asr", "sweep"}
+LANGS = {"mn", "hu", "fr", "es", "en", "multi", "unk"}
+WHISPER_SIZES = {"tiny", "base", "small", "medium", "large", "large-v1", "large-v2", "large-v3", "turbo"}
+LAYOUT_DIRS = {"json", "txt"}
+
+
+def _stat_key(*paths):
+    key = []
+    for p in paths:
+        if p is None:
+            continue
+        try:
+            st = os.stat(p)
+            key.append(f"{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            key.append("-")
+    return "|".join(key)
+
+
+def path_fields(rel_dir):
+    """mode / system / model / language implied by a folder relative to the tree root"""
+    parts = [p for p in Path(rel_dir).parts if p not in (".", "")]
+    if parts and parts[-1] in LAYOUT_DIRS:
+        parts = parts[:-1]
+    fields = {}
+    if parts and parts[0] in MODES:
+        fields["mode"] = parts.pop(0)
+    if parts and parts[-1] in LANGS:
+        fields["language"] = parts.pop()
+    if len(parts) == 1:
+        name = parts[0]
+        if name in WHISPER_SIZES:
+            fields["system"], fields["model"] = f"whisper-{name}", name
+        else:
+            fields["system"] = name
+            if name.startswith("whisper-"):
+                fields["model"] = name[len("whisper-"):]
+    elif len(parts) >= 2:
+        fields["system"], fields["model"] = parts[0], parts[-1]
+    return fields
+
+
+def scan(root):
+    """One walk of the tree: [(json_path or None, txt_path or None)]"""
+    units, txts = [], set()
+    jsons = []
+    for dirpath, _, files in os.walk(root):
+        for fn in files:
+            if fn.endswith(".json"):
+                jsons.append(os.path.join(dirpath, fn))
+            elif fn.endswith(".txt"):
+                txts.add(os.path.join(dirpath, fn))
+    for jp in sorted(jsons):
+        d, fn = os.path.split(jp)
+        stem = fn[:-5]
+        txt = os.path.join(d, stem + ".txt")
+        if txt not in txts and os.path.basename(d) == "json":
+            txt = os.path.join(os.path.dirname(d), "txt", stem + ".txt")
+        if txt in txts:
+            txts.discard(txt)
+            units.append((jp, txt))
+        else:
+            units.append((jp, None))
+    units.extend((None, tp) for tp in sorted(txts))
+    return units
+
+
+def audio_paths(audio_dirs):
+    """{stem: [audio paths]} under the audio directories, in canonical form"""
+    index = {}
+    for d in audio_dirs:
+        for path in duration_index.iter_audio(d):
+            index.setdefault(Path(path).stem, []).append(results_store.canonical_file(path))
+    return index
+
+
+def resolve_audio(index, stem, language=None):
+    """Audio path for a sidecar stem (preferring the language folder), or None"""
+    candidates = index.get(stem, [])
+    if language:
+        in_lang = [p for p in candidates if f"/{language}/" in f"/{p}"]
+        candidates = in_lang or candidates
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def read_unit(args):
+    """(key_path, stat, record, fields) for one sidecar/transcript, or (key_path, stat, None, reason)"""
+    root, (json_path, txt_path) = args
+    key_path = json_path or txt_path
+    stat = _stat_key(json_path, txt_path)
+    data = {}
+    if json_path:
+        try:
+            with open(json_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            return key_path, stat, None, f"corrupt: {e}"
+        except OSError as e:
+            return key_path, stat, None, f"unreadable: {e}"
+        if not isinstance(data, dict) or not (data.keys() & {"file", "audio_file", "transcript", "text",
+                                                             "language_used", "language", "lang"}):
+            return key_path, stat, None, "not a result sidecar"
+
+    transcript = data.get("transcript") or data.get("text")
+    if not transcript and txt_path:
+        try:
+            with open(txt_path, encoding="utf-8") as f:
+                transcript = f.read().strip()
+        except (OSError, UnicodeDecodeError) as e:
+            if not json_path:
+                return key_path, stat, None, f"unreadable: {e}"
+
+    stem = Path(key_path).stem
+    implied = path_fields(os.path.relpath(os.path.dirname(key_path), root))
+    fields = {
+        "file": None if (data.get("file") or data.get("audio_file")) else stem,
+        "file_id": stem,
+        "mode": None if data.get("mode") else implied.get("mode"),
+        "system": None if data.get("system") else implied.get("system"),
+        "model": None if (data.get("model") or data.get("cfg")) else implied.get("model"),
+        "language": implied.get("language"),
+        "transcript": transcript,
+        "written_at": os.path.getmtime(key_path),
+    }
+    record = dict(data)
+    record["sidecar"] = key_path
+    return key_path, stat, record, fields
+
+
+class ImportState:
+    def __init__(self, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), timeout=60)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, stat TEXT, status TEXT)")
+
+    def done(self):
+        return dict(self.conn.execute("SELECT path, stat FROM files"))
+
+    def mark(self, entries):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?)", entries)
+
+    def close(self):
+        self.conn.close()
+
+
+def run_import(roots, store_root, workers=None, chunk=2000, full=False, audio_dirs=("data/wav",)):
+    store_root = Path(store_root)
+    state = ImportState(store_root / "_import" / "state.sqlite")
+    seen = {} if full else state.done()
+
+    t0 = time.time()
+    todo = []
+    for root in roots:
+        for unit in scan(root):
+            key_path = unit[0] or unit[1]
+            if seen.get(key_path) != _stat_key(*unit):
+                todo.append((root, unit))
+    print(f"[import] {len(todo)} new/changed files ({time.time() - t0:.1f}s scan)", file=sys.stderr)
+
+    writer = results_store.ResultsWriter(store_root, run_id=f"import-{time.strftime('%Y%m%d-%H%M%S')}",
+                                         flush_rows=10 ** 9)
+    if not writer.enabled:
+        state.close()
+        return 1
+    audio = audio_paths(audio_dirs)
+    skipped = []
+    imported = unresolved = 0
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for i in range(0, len(todo), chunk):
+            batch = todo[i:i + chunk]
+            marks = []
+            units = list(pool.map(read_unit, batch, chunksize=64))
+            for _, _, record, fields in units:
+                if record is not None and fields["file"] is not None:
+                    found = resolve_audio(audio, fields["file"], fields["language"] or record.get("language"))
+                    if found:
+                        fields["file"] = found
+                    else:
+                        unresolved += 1
+            wall = {key_path: results_store.canonical_file(
+                        fields["file"] or record.get("file") or record.get("audio_file"))
+                    for key_path, _, record, fields in units
+                    if record is not None and results_store.wall_time_sidecar(record)}
+            durs = duration_index.durations(list(wall.values())) if wall else {}
+            for key_path, stat, record, fields in units:
+                if record is None:
+                    skipped.append((key_path, fields))
+                    marks.append((key_path, stat, fields))
+                    continue
+                if results_store.wall_time_sidecar(record):
+                    fields["duration_sec"] = durs.get(wall[key_path])
+                writer.append(record, **fields)
+                marks.append((key_path, stat, "ok"))
+                imported += 1
+            # rows are on disk before their files are marked done
+            writer.flush()
+            state.mark(marks)
+            print(f"[import] {min(i + chunk, len(todo))}/{len(todo)} files", file=sys.stderr)
+    writer.close()
+    state.close()
+    if unresolved:
+        print(f"[import] ⚠️  {unresolved} sidecars without a file path matched no unique audio under "
+              f"{', '.join(audio_dirs)}: stored by stem (they will not dedupe with live rows)", file=sys.stderr)
+
+    if skipped:
+        report = store_root / "_import" / "skipped.csv"
+        with open(report, "a", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            if f.tell() == 0:
+                w.writerow(["path", "reason", "imported_at"])
+            now = time.strftime("%Y-%m-%d %H:%M:%S")
+            w.writerows((p, reason, now) for p, reason in skipped)
+        print(f"[import] {len(skipped)} skipped → {report}", file=sys.stderr)
+    with open(store_root / results_store.IMPORT_MARKER, "a", encoding="utf-8") as f:
+        f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')}\t{' '.join(map(str, roots))}\t{imported} rows\n")
+    print(f"[import] {imported} rows → {store_root} in {time.time() - t0:.1f}s", file=sys.stderr)
+    return 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Import legacy transcript sidecars into the results store")
+    ap.add_argument("roots", nargs="*", default=["results/transcripts"], help="Transcript trees to import")
+    ap.add_argument("--store", default=results_store.STORE_ROOT)
+    ap.add_argument("--workers", type=int, default=None, help="Parsing processes (default: all cores)")
+    ap.add_argument("--chunk", type=int, default=2000, help="Files per flush/checkpoint")
+    ap.add_argument("--full", action="store_true", help="Re-read files already imported")
+    ap.add_argument("--audio-dir", action="append", default=None,
+                    help="Audio tree to resolve sidecars without a file path (repeatable; default data/wav)")
+    args = ap.parse_args()
+    sys.exit(run_import(args.roots, args.store, args.workers, args.chunk, args.full,
+                        args.audio_dir or ["data/wav"]))
+
+
+if __name__ == "__main__":
+    main()
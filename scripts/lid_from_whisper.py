@@ -1,16 +1,16 @@
 #!/usr/bin/env python
-import json, argparse, time, os, tempfile, subprocess, shlex, re
+import json, argparse, time, os, re
 from faster_whisper import WhisperModel
 
+import audio_loader
+
 LANG_RE = re.compile(r"/(mn|hu|fr|es)/", re.IGNORECASE)
 
 def trim_head(infile, head_sec):
+    """16 kHz mono array of the first head_sec seconds (whole file if head_sec <= 0)"""
     if head_sec is None or head_sec <= 0:
-        return infile, None
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".wav"); tmp.close()
-    cmd = f"ffmpeg -y -hide_banner -loglevel error -t {head_sec} -i {shlex.quote(infile)} -ac 1 -ar 16000 {shlex.quote(tmp.name)}"
-    subprocess.check_call(cmd, shell=True)
-    return tmp.name, tmp.name
+        return audio_loader.decode_16k(infile)
+    return audio_loader.decode_head_16k(infile, head_sec)
 
 def guess_lang_from_path(path):
     m = LANG_RE.search("/" + path.replace("\\","/") + "/")
@@ -18,7 +18,7 @@ def guess_lang_from_path(path):
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--model", default="tiny")
-parser.add_argument("--head-sec", type=float, default=10.0, help="Use only first N seconds (ffmpeg trim).")
+parser.add_argument("--head-sec", type=float, default=10.0, help="Use only first N seconds (decoded in-process).")
 parser.add_argument("--infile", required=True)
 parser.add_argument("--device", default="cpu", help='"cpu", "cuda", or "auto"')
 args = parser.parse_args()
@@ -29,13 +29,13 @@ if args.device == "cpu":
 t0 = time.time()
 model = WhisperModel(args.model, device=args.device)
 
-use_path, tmp_to_rm = trim_head(args.infile, args.head_sec)
+use_audio, decode_sec = trim_head(args.infile, args.head_sec)
 language = None; lang_prob = None; tried = []
 
 try:
     # 1) attempt with VAD
     tried.append("vad_filter=True")
-    segments, info = model.transcribe(use_path, task="transcribe", language=None, without_timestamps=True, vad_filter=True)
+    segments, info = model.transcribe(use_audio, task="transcribe", language=None, without_timestamps=True, vad_filter=True)
     language = getattr(info, "language", None)
     lang_prob = getattr(info, "language_probability", None)
 except Exception:
@@ -45,7 +45,7 @@ if not language:
     try:
         # 2) retry without VAD
         tried.append("vad_filter=False")
-        segments, info = model.transcribe(use_path, task="transcribe", language=None, without_timestamps=True, vad_filter=False)
+        segments, info = model.transcribe(use_audio, task="transcribe", language=None, without_timestamps=True, vad_filter=False)
         language = getattr(info, "language", None)
         lang_prob = getattr(info, "language_probability", None)
     except Exception:
@@ -64,10 +64,7 @@ out = {
     "head_sec": args.head_sec,
     "device": args.device,
     "tried": tried,
+    "decode_sec": round(decode_sec, 3),
     "elapsed_sec": round(time.time() - t0, 3),
 }
 print(json.dumps(out, ensure_ascii=False))
-
-if tmp_to_rm and os.path.exists(tmp_to_rm):
-    try: os.remove(tmp_to_rm)
-    except OSError: pass
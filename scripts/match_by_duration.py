@@ -6,20 +6,36 @@ Finds correct references for existing audio files without re-running ASR
 
 import csv
 import json
+import time
 from pathlib import Path
-import librosa
 import argparse
 
-def get_audio_duration(audio_file):
-    """Get audio duration in seconds"""
-    try:
-        duration = librosa.get_duration(path=str(audio_file))
-        return round(duration, 3)  # Round to milliseconds
-    except Exception as e:
-        print(f"Error reading {audio_file}: {e}")
-        return None
+import numpy as np
 
-def match_by_duration(lang, tsv_file, audio_dir, cv_clips_dir, output_dir):
+from duration_index import durations
+
+def get_audio_durations(audio_files):
+    """Durations in seconds (rounded to ms) from the duration index, keyed by file"""
+    durs = durations(audio_files)
+    out = {}
+    for audio_file in audio_files:
+        duration = durs[str(audio_file)]
+        if duration is None:
+            print(f"Error reading {audio_file}")
+        out[audio_file] = round(duration, 3) if duration is not None else None
+    return out
+
+def candidate_windows(cv_sorted, our_durations, tolerance):
+    """
+    [lo, hi) index ranges into the sorted CV durations with
+    |cv - ours| < tolerance, for all of our durations at once
+    """
+    lo = np.searchsorted(cv_sorted, our_durations - tolerance, side='right')
+    hi = np.searchsorted(cv_sorted, our_durations + tolerance, side='left')
+    return lo, hi
+
+def match_by_duration(lang, tsv_file, audio_dir, cv_clips_dir, output_dir,
+                      tolerance=0.01, skip_ambiguous=False):
     """Match audio files using duration"""
     
     print(f"\n{'='*60}")
@@ -48,16 +64,13 @@ def match_by_duration(lang, tsv_file, audio_dir, cv_clips_dir, output_dir):
         print(f"❌ CV clips directory not found: {cv_clips_dir}")
         return 0
     
-    clip_files = list(cv_clips_path.glob("*.mp3"))
-    print(f"Found {len(clip_files)} CV clip files")
+    # only clips with a TSV sentence can be a match
+    clip_files = [p for p in cv_clips_path.glob("*.mp3") if p.name in cv_data]
+    print(f"Found {len(clip_files)} CV clip files listed in the TSV")
     
-    for i, clip_file in enumerate(clip_files):
-        duration = get_audio_duration(clip_file)
+    for clip_file, duration in get_audio_durations(clip_files).items():
         if duration:
             cv_durations[clip_file.name] = duration
-        
-        if (i + 1) % 1000 == 0:
-            print(f"  Processed {i+1} CV clips...")
     
     print(f"✓ Got durations for {len(cv_durations)} CV clips")
     
@@ -65,49 +78,75 @@ def match_by_duration(lang, tsv_file, audio_dir, cv_clips_dir, output_dir):
     print(f"\nMatching our audio files from {audio_dir}...")
     audio_path = Path(audio_dir)
     our_files = sorted(audio_path.glob("*.mp3"))
+    our_durations = get_audio_durations(our_files)
+    n_ours = len(our_files)
+    our_files = [f for f in our_files if our_durations[f]]
+    
+    # Sorted CV durations: candidates for each file are a contiguous slice
+    t0 = time.time()
+    cv_names = np.array(list(cv_durations.keys()))
+    cv_values = np.array(list(cv_durations.values()), dtype=np.float64)
+    order = np.argsort(cv_values, kind='stable')
+    cv_names, cv_values = cv_names[order], cv_values[order]
+    ours = np.array([our_durations[f] for f in our_files], dtype=np.float64)
+    lo, hi = candidate_windows(cv_values, ours, tolerance)
     
     matches = []
     matched_count = 0
+    ambiguous_count = 0
     
-    for our_file in our_files:
-        our_duration = get_audio_duration(our_file)
-        if not our_duration:
+    for our_file, our_duration, a, b in zip(our_files, ours, lo, hi):
+        if a >= b:
+            print(f"⚠️  No match for {our_file.name} (duration: {our_duration:.3f}s)")
             continue
         
-        # Find CV clip with same duration (within 10ms tolerance)
-        best_match = None
-        best_diff = float('inf')
+        diffs = np.abs(cv_values[a:b] - our_duration)
+        best = a + int(np.argmin(diffs))
+        best_match = str(cv_names[best])
+        best_diff = float(diffs.min())
         
-        for cv_filename, cv_duration in cv_durations.items():
-            diff = abs(our_duration - cv_duration)
-            if diff < 0.01 and diff < best_diff:  # Within 10ms
-                best_diff = diff
-                best_match = cv_filename
+        # Several clips in the window with different sentences -> ambiguous
+        candidates = [str(n) for n in cv_names[a:b]]
+        sentences = {cv_data[n] for n in candidates}
+        ambiguous = len(sentences) > 1
+        if ambiguous:
+            ambiguous_count += 1
+            if skip_ambiguous:
+                print(f"⚠️  Ambiguous: {our_file.name} has {len(candidates)} candidates, skipped")
+                continue
         
-        if best_match and best_match in cv_data:
-            reference = cv_data[best_match]
-            
-            # Save reference
-            ref_file = Path(output_dir) / f"{our_file.stem}.txt"
-            ref_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(ref_file, 'w', encoding='utf-8') as f:
-                f.write(reference)
-            
-            matches.append({
-                'our_file': our_file.name,
-                'cv_file': best_match,
-                'duration': our_duration,
-                'diff_ms': best_diff * 1000,
-                'reference': reference
-            })
-            matched_count += 1
-            
-            if matched_count % 100 == 0:
-                print(f"  Matched {matched_count} files...")
-        else:
-            print(f"⚠️  No match for {our_file.name} (duration: {our_duration:.3f}s)")
+        reference = cv_data[best_match]
+        
+        # Save reference
+        ref_file = Path(output_dir) / f"{our_file.stem}.txt"
+        ref_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(ref_file, 'w', encoding='utf-8') as f:
+            f.write(reference)
+        
+        match = {
+            'our_file': our_file.name,
+            'cv_file': best_match,
+            'duration': float(our_duration),
+            'diff_ms': best_diff * 1000,
+            'reference': reference,
+            'n_candidates': len(candidates),
+            'ambiguous': ambiguous,
+        }
+        if ambiguous:
+            match['candidates'] = candidates[:10]
+        matches.append(match)
+        matched_count += 1
+        
+        if matched_count % 100 == 0:
+            print(f"  Matched {matched_count} files...")
+    
+    print(f"✓ Matching took {time.time() - t0:.2f}s "
+          f"({len(our_files)} files vs {len(cv_values)} CV clips)")
+    if ambiguous_count:
+        print(f"⚠️  {ambiguous_count} files had several candidate clips with different sentences"
+              + (" (skipped)" if skip_ambiguous else " (closest duration used, see report)"))
     
-    print(f"\n✓ Matched {matched_count}/{len(our_files)} files")
+    print(f"\n✓ Matched {matched_count}/{n_ours} files")
     
     # Save matching report
     report_file = Path(f"data/duration_match_report_{lang}.json")
@@ -125,6 +164,9 @@ def main():
     parser.add_argument('--audio-dir', required=True, help='Our audio directory (e.g., data/wav/es)')
     parser.add_argument('--cv-clips-dir', required=True, help='CV clips directory (e.g., cv-corpus-*/es/clips)')
     parser.add_argument('--output-dir', required=True, help='Output directory for references')
+    parser.add_argument('--tolerance-ms', type=float, default=10.0, help='Max duration difference (default 10 ms)')
+    parser.add_argument('--skip-ambiguous', action='store_true',
+                        help='Do not write references for files with several candidate sentences')
     
     args = parser.parse_args()
     
@@ -133,7 +175,9 @@ def main():
         args.tsv_file,
         args.audio_dir,
         args.cv_clips_dir,
-        args.output_dir
+        args.output_dir,
+        tolerance=args.tolerance_ms / 1000,
+        skip_ambiguous=args.skip_ambiguous
     )
     
     print("\n" + "="*60)
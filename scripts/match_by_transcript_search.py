@@ -5,40 +5,42 @@ Match references by searching TSV with model outputs (faster than duration)
 
 import csv
 import json
+import time
 from pathlib import Path
-from difflib import get_close_matches
 import argparse
 
+from transcript_assign import assign_references, write_confidence_report
+
 def load_tsv_fast(tsv_file):
-    """Load TSV into searchable dict"""
+    """Load TSV sentences (one entry per clip, duplicates kept for one-to-one matching)"""
     print(f"Loading TSV: {tsv_file}")
-    data = {}
+    sentences = []
     with open(tsv_file, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f, delimiter='\t')
         for row in reader:
-            sentence = row.get('sentence', '').strip().lower()
+            sentence = row.get('sentence', '').strip()
             if sentence:
-                data[sentence] = row.get('sentence', '').strip()  # Keep original
-    print(f"✓ Loaded {len(data)} unique sentences")
-    return data
+                sentences.append(sentence)
+    print(f"✓ Loaded {len(sentences)} sentences ({len(set(s.lower() for s in sentences))} unique)")
+    return sentences
 
-def match_files(lang, tsv_file, model_dir, output_dir):
-    """Match using model transcripts"""
+def match_files(lang, tsv_file, model_dir, output_dir, shortlist=20, cutoff=0.6):
+    """Match using model transcripts (one-to-one, best total similarity)"""
     
     print(f"\n{'='*60}")
     print(f"Matching {lang.upper()} using transcript search")
     print(f"{'='*60}")
     
     # Load TSV
-    tsv_data = load_tsv_fast(tsv_file)
+    sentences = load_tsv_fast(tsv_file)
     
     # Process model outputs
     json_files = sorted(Path(model_dir).glob("*.json"))
     print(f"Found {len(json_files)} files to match")
     
-    matched = 0
     Path(output_dir).mkdir(parents=True, exist_ok=True)
     
+    file_ids, hypotheses = [], []
     for json_file in json_files:
         file_id = json_file.stem
         
@@ -56,23 +58,33 @@ def match_files(lang, tsv_file, model_dir, output_dir):
         
         if not hypothesis:
             continue
+        file_ids.append(file_id)
+        hypotheses.append(hypothesis)
+    
+    # Shortlist via trigram index, then global one-to-one assignment
+    t0 = time.time()
+    rows = assign_references(hypotheses, [s.lower() for s in sentences],
+                             k=shortlist, min_score=cutoff)
+    
+    matched = 0
+    for file_id, r in zip(file_ids, rows):
+        if r['tsv_index'] < 0:
+            continue
+        reference = sentences[r['tsv_index']]
         
-        # Find best match
-        matches = get_close_matches(hypothesis, tsv_data.keys(), n=1, cutoff=0.6)
+        # Save reference
+        ref_file = Path(output_dir) / f"{file_id}.txt"
+        with open(ref_file, 'w', encoding='utf-8') as f:
+            f.write(reference)
         
-        if matches:
-            reference = tsv_data[matches[0]]
-            
-            # Save reference
-            ref_file = Path(output_dir) / f"{file_id}.txt"
-            with open(ref_file, 'w', encoding='utf-8') as f:
-                f.write(reference)
-            
-            matched += 1
-            if matched % 100 == 0:
-                print(f"  Matched {matched}...")
+        matched += 1
+    
+    print(f"\n✓ Matched {matched}/{len(json_files)} files in {time.time() - t0:.2f}s")
     
-    print(f"\n✓ Matched {matched}/{len(json_files)} files")
+    confidence_file = Path(f"data/transcript_search_confidence_{lang}.csv")
+    confidence_file.parent.mkdir(parents=True, exist_ok=True)
+    write_confidence_report(confidence_file, file_ids, hypotheses, sentences, rows)
+    print(f"✓ Saved confidence report: {confidence_file}")
     return matched
 
 def main():
@@ -81,13 +93,17 @@ def main():
     parser.add_argument('--tsv-file', required=True)
     parser.add_argument('--model-dir', default=None)
     parser.add_argument('--output-dir', required=True)
+    parser.add_argument('--shortlist', type=int, default=20,
+                        help='Candidates per file from the trigram index (0 = all sentences)')
+    parser.add_argument('--cutoff', type=float, default=0.6, help='Minimum similarity for a match')
     
     args = parser.parse_args()
     
     if not args.model_dir:
         args.model_dir = f"results/transcripts/hinted/omnilingual/omniASR_CTC_300M/{args.lang}"
     
-    matched = match_files(args.lang, args.tsv_file, args.model_dir, args.output_dir)
+    matched = match_files(args.lang, args.tsv_file, args.model_dir, args.output_dir,
+                          args.shortlist, args.cutoff)
     
     print("\n" + "="*60)
     if matched > 900:
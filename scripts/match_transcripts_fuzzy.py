@@ -6,10 +6,13 @@ Uses model transcriptions to find the correct reference in TSV
 
 import csv
 import json
+import time
 from pathlib import Path
 from difflib import SequenceMatcher
 import argparse
 
+from transcript_assign import assign_references, write_confidence_report
+
 def normalize_text(text):
     """Normalize text for comparison"""
     import unicodedata
@@ -24,8 +27,13 @@ def similarity(a, b):
     """Calculate similarity ratio between two strings"""
     return SequenceMatcher(None, normalize_text(a), normalize_text(b)).ratio()
 
-def match_transcripts(lang, tsv_file, model_dir, ref_dir):
-    """Match transcripts using fuzzy matching"""
+def match_transcripts(lang, tsv_file, model_dir, ref_dir, shortlist=50, min_score=0.5):
+    """
+    Match transcripts using fuzzy matching.
+    Each hypothesis is scored exactly against the `shortlist` TSV sentences
+    sharing the most character trigrams (0 = score against all sentences);
+    files and sentences are then paired one-to-one with the best total score.
+    """
     
     print(f"\n{'='*60}")
     print(f"Matching transcripts for {lang.upper()}")
@@ -48,9 +56,7 @@ def match_transcripts(lang, tsv_file, model_dir, ref_dir):
     json_files = sorted(Path(model_dir).glob("*.json"))
     print(f"✓ Found {len(json_files)} model outputs")
     
-    matches = []
-    matched_indices = set()
-    
+    file_ids, hypotheses = [], []
     for json_file in json_files:
         file_id = json_file.stem
         
@@ -69,41 +75,42 @@ def match_transcripts(lang, tsv_file, model_dir, ref_dir):
         if not hypothesis:
             print(f"⚠️  No transcript for {file_id}")
             continue
+        file_ids.append(file_id)
+        hypotheses.append(hypothesis)
+    
+    # Normalize once, shortlist via the trigram index, assign globally
+    t0 = time.time()
+    tsv_norm = [normalize_text(t['sentence']) for t in tsv_transcripts]
+    rows = assign_references([normalize_text(h) for h in hypotheses], tsv_norm,
+                             k=shortlist, min_score=min_score)
+    
+    matches = []
+    for file_id, hypothesis, r in zip(file_ids, hypotheses, rows):
+        if r['tsv_index'] < 0:
+            print(f"⚠️  Poor match for {file_id} (best score: {r['best_score']:.2f})")
+            continue
+        best_match = tsv_transcripts[r['tsv_index']]
+        matches.append({
+            'file_id': file_id,
+            'reference': best_match['sentence'],
+            'hypothesis': hypothesis,
+            'match_score': r['score'],
+            'tsv_index': r['tsv_index'],
+            'margin': r['margin'],
+            'top_choice': r['top_choice'],
+        })
         
-        # Find best match in TSV
-        best_match = None
-        best_score = 0.0
-        best_idx = -1
-        
-        for idx, tsv_entry in enumerate(tsv_transcripts):
-            if idx in matched_indices:
-                continue  # Already matched
-            
-            score = similarity(hypothesis, tsv_entry['sentence'])
-            if score > best_score:
-                best_score = score
-                best_match = tsv_entry
-                best_idx = idx
-        
-        if best_score > 0.5:  # Accept reasonable matches
-            matches.append({
-                'file_id': file_id,
-                'reference': best_match['sentence'],
-                'hypothesis': hypothesis,
-                'match_score': best_score,
-                'tsv_index': best_idx
-            })
-            matched_indices.add(best_idx)
-            
-            # Save reference
-            ref_file = Path(ref_dir) / f"{file_id}.txt"
-            with open(ref_file, 'w', encoding='utf-8') as f:
-                f.write(best_match['sentence'])
-        else:
-            print(f"⚠️  Poor match for {file_id} (score: {best_score:.2f})")
-    
-    print(f"\n✓ Matched {len(matches)}/{len(json_files)} files")
-    print(f"  Average match score: {sum(m['match_score'] for m in matches) / len(matches):.2%}")
+        # Save reference
+        ref_file = Path(ref_dir) / f"{file_id}.txt"
+        with open(ref_file, 'w', encoding='utf-8') as f:
+            f.write(best_match['sentence'])
+    
+    print(f"\n✓ Matched {len(matches)}/{len(json_files)} files in {time.time() - t0:.2f}s")
+    if matches:
+        print(f"  Average match score: {sum(m['match_score'] for m in matches) / len(matches):.2%}")
+        contested = sum(1 for m in matches if not m['top_choice'])
+        low_margin = sum(1 for m in matches if m['margin'] < 0.05)
+        print(f"  Not their top candidate: {contested}, margin < 0.05: {low_margin}")
     
     # Save matching report
     report_file = Path(f"data/matching_report_{lang}.txt")
@@ -119,6 +126,11 @@ def match_transcripts(lang, tsv_file, model_dir, ref_dir):
     
     print(f"✓ Saved report: {report_file}")
     
+    confidence_file = Path(f"data/matching_confidence_{lang}.csv")
+    write_confidence_report(confidence_file, file_ids, hypotheses,
+                            [t['sentence'] for t in tsv_transcripts], rows)
+    print(f"✓ Saved confidence report: {confidence_file}")
+    
     return len(matches)
 
 def main():
@@ -127,6 +139,8 @@ def main():
     parser.add_argument('--tsv-file', required=True, help='Path to test.tsv')
     parser.add_argument('--model-dir', default=None, help='Model output directory (defaults to OmniLingual CTC_300M)')
     parser.add_argument('--ref-dir', default=None, help='Reference directory (defaults to data/ref/{lang})')
+    parser.add_argument('--shortlist', type=int, default=50,
+                        help='Candidates per file from the trigram index (0 = exhaustive scan)')
     
     args = parser.parse_args()
     
@@ -140,7 +154,7 @@ def main():
     Path(args.ref_dir).mkdir(parents=True, exist_ok=True)
     
     # Run matching
-    matched = match_transcripts(args.lang, args.tsv_file, args.model_dir, args.ref_dir)
+    matched = match_transcripts(args.lang, args.tsv_file, args.model_dir, args.ref_dir, args.shortlist)
     
     print("\n" + "="*60)
     if matched > 900:
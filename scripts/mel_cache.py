@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Optional log-mel feature cache for Whisper model-size sweeps.
+
+tiny/base/small/medium (and large-v1/v2) share the same 80-bin front-end,
+so a sweep over model sizes recomputes identical features for every clip.
+Features are cached per (audio content hash, n_mels), unpadded, and padded
+to the 30 s window on use.
+
+Only the code paths that run the encoder themselves use it: batched
+decoding (run_whisper.py --batch-size > 1, test_beam_batch.py) and the
+lid2asr language-ID window (whisper_batch.detect_language_single).
+model.transcribe() computes its own features, so per-file hinted runs and
+the lid2asr transcript never hit the cache.
+
+    ASR_MEL_CACHE = off | memory | disk   (default off; --mel-cache on the runners)
+    disk entries live next to the decoded audio (audio_cache.py, tag mel<N>)
+    and are read back as memmaps, so separate processes share them.
+
+stats() reports hits/misses and the estimated time saved: hits x mean
+feature-extraction time per clip (measured on misses, or once on a hit if
+the process never missed). Runners print it as "mel cache: {...}"; report
+totals it over a set of logs:
+
+    python scripts/mel_cache.py report results/logs/experiments/*.log
+"""
+
+import argparse
+import ast
+import glob
+import os
+import time
+from collections import OrderedDict
+
+import audio_cache
+
+MEMORY_ITEMS = 8192
+
+_mode = os.environ.get("ASR_MEL_CACHE", "off").lower()
+_memory = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "compute_sec": 0.0, "calibrated_sec": None}
+
+
+def set_mode(mode):
+    """off | memory | disk (also exported to the environment for subprocesses)"""
+    global _mode
+    _mode = mode
+    os.environ["ASR_MEL_CACHE"] = mode
+
+
+def mode():
+    return _mode
+
+
+def _compute(model, audio):
+    t0 = time.perf_counter()
+    feats = model.feature_extractor(audio)[..., :-1]
+    return feats, time.perf_counter() - t0
+
+
+def _key(path, n_mels):
+    return f"{audio_cache.content_hash(path)}:{n_mels}"
+
+
+def features(model, audio, path=None):
+    """Unpadded log-mel features (n_mels x frames) for audio, cached when path is given"""
+    if _mode == "off" or path is None:
+        return _compute(model, audio)[0]
+
+    n_mels = model.feature_extractor.mel_filters.shape[0]
+    tag = f"mel{n_mels}"
+
+    cached = None
+    if _mode == "memory":
+        key = _key(path, n_mels)
+        cached = _memory.get(key)
+        if cached is not None:
+            _memory.move_to_end(key)
+    else:
+        cache = audio_cache.default_cache()
+        cached = cache.get(path, tag=tag) if cache else None
+
+    if cached is not None:
+        _stats["hits"] += 1
+        if _stats["misses"] == 0 and _stats["calibrated_sec"] is None:
+            _stats["calibrated_sec"] = _compute(model, audio)[1]
+        return cached
+
+    feats, sec = _compute(model, audio)
+    _stats["misses"] += 1
+    _stats["compute_sec"] += sec
+    if _mode == "memory":
+        _memory[_key(path, n_mels)] = feats
+        while len(_memory) > MEMORY_ITEMS:
+            _memory.popitem(last=False)
+    else:
+        cache = audio_cache.default_cache()
+        if cache:
+            cache.put(path, feats, tag=tag)
+    return feats
+
+
+def stats():
+    per_clip = (_stats["compute_sec"] / _stats["misses"]) if _stats["misses"] else (_stats["calibrated_sec"] or 0.0)
+    return {
+        "mode": _mode,
+        "hits": _stats["hits"],
+        "misses": _stats["misses"],
+        "compute_sec": round(_stats["compute_sec"], 3),
+        "saved_sec_est": round(_stats["hits"] * per_clip, 3),
+    }
+
+
+def parse_stats(text):
+    """stats() dicts printed as "mel cache: {...}" in runner output"""
+    found = []
+    for line in text.splitlines():
+        _, sep, rest = line.partition("mel cache: ")
+        if sep and rest.startswith("{"):
+            try:
+                found.append(ast.literal_eval(rest.strip()))
+            except (ValueError, SyntaxError):
+                continue
+    return found
+
+
+def report(paths):
+    """Summed hits / misses / saved_sec_est over runner logs"""
+    total = {"runs": 0, "hits": 0, "misses": 0, "saved_sec_est": 0.0}
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                found = parse_stats(f.read())
+        except OSError:
+            continue
+        for s in found:
+            total["runs"] += 1
+            total["hits"] += s.get("hits", 0)
+            total["misses"] += s.get("misses", 0)
+            total["saved_sec_est"] += s.get("saved_sec_est", 0.0)
+    return total
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Total the mel cache savings reported in runner logs")
+    ap.add_argument("action", choices=["report"])
+    ap.add_argument("logs", nargs="+", help="Log files (globs)")
+    args = ap.parse_args()
+    t = report(sorted({p for pattern in args.logs for p in glob.glob(pattern, recursive=True)}))
+    lookups = t["hits"] + t["misses"]
+    rate = t["hits"] / lookups if lookups else 0.0
+    print(f"mel cache: {t['runs']} runs, {t['hits']} hits / {t['misses']} misses ({rate:.0%}), "
+          f"~{t['saved_sec_est'] / 60:.1f} min of feature extraction saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Shared model registry / warm model pool for all ASR runners.
+
+Models are cached per (system, model_id, device, compute_type, load options)
+in an LRU bounded by a memory budget, so a mixed-system sweep in one process loads
+each checkpoint exactly once:
+
+    from model_registry import get_model
+    model = get_model("whisper", "small", "cpu", "int8")
+    processor, model = get_model("wav2vec2", LANG_MODELS["hu"], "cpu")
+
+Budget: ASR_MODEL_BUDGET_GB (default 16). When a new load goes over budget,
+least-recently-used entries are dropped (the newest entry is always kept).
+
+CPU threads: ASR_CPU_THREADS (default 0 = library default) sets faster-whisper's
+cpu_threads and torch.set_num_threads() for the CTC/omnilingual models, and
+ASR_NUM_WORKERS (default 1) faster-whisper's num_workers. experiments.py sets
+them per worker when it runs several runners side by side.
+"""
+
+import gc
+import os
+import sys
+import time
+from collections import Counter, OrderedDict
+
+LOADERS = {}
+CPU_THREADS = int(os.environ.get("ASR_CPU_THREADS", "0"))
+NUM_WORKERS = int(os.environ.get("ASR_NUM_WORKERS", "1"))
+
+
+def register_loader(system):
+    """Decorator: loader(model_id, device, compute_type, **kwargs) -> model object"""
+    def deco(fn):
+        LOADERS[system] = fn
+        return fn
+    return deco
+
+
+def _torch_threads():
+    if CPU_THREADS > 0:
+        import torch
+        torch.set_num_threads(CPU_THREADS)
+
+
+@register_loader("whisper")
+def _load_whisper(model_id, device, compute_type, **kwargs):
+    from faster_whisper import WhisperModel
+    kwargs.setdefault("cpu_threads", CPU_THREADS)
+    kwargs.setdefault("num_workers", NUM_WORKERS)
+    return WhisperModel(model_id, device=device, compute_type=compute_type or "default", **kwargs)
+
+
+@register_loader("wav2vec2")
+def _load_wav2vec2(model_id, device, compute_type, **kwargs):
+    from transformers import Wav2Vec2ForCTC, Wav2Vec2Processor
+    _torch_threads()
+    processor = Wav2Vec2Processor.from_pretrained(model_id)
+    model = Wav2Vec2ForCTC.from_pretrained(model_id, **kwargs).to(device)
+    model.eval()
+    return processor, model
+
+
+@register_loader("mms")
+def _load_mms(model_id, device, compute_type, **kwargs):
+    from transformers import AutoProcessor, Wav2Vec2ForCTC
+    _torch_threads()
+    processor = AutoProcessor.from_pretrained(model_id)
+    model = Wav2Vec2ForCTC.from_pretrained(model_id, **kwargs).to(device)
+    model.eval()
+    return processor, model
+
+
+@register_loader("omnilingual")
+def _load_omnilingual(model_id, device, compute_type, **kwargs):
+    from omnilingual_asr.models.inference.pipeline import ASRInferencePipeline
+    _torch_threads()
+    return ASRInferencePipeline(model_card=model_id, **kwargs)
+
+
+def _rss_bytes():
+    """Resident set size of this process (psutil, else /proc/self/statm), or None"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _torch_bytes(obj):
+    """Parameter + buffer bytes of any torch module inside obj, else None"""
+    items = obj if isinstance(obj, tuple) else (obj,)
+    total = None
+    for item in items:
+        if hasattr(item, "parameters") and hasattr(item, "buffers"):
+            total = (total or 0) + sum(
+                t.numel() * t.element_size()
+                for t in list(item.parameters()) + list(item.buffers())
+            )
+    return total
+
+
+def _freeze(value):
+    """Hashable form of a load option (dicts / lists / sets nested inside included)"""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(repr(_freeze(v)) for v in value))
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class ModelRegistry:
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()  # key -> (model, nbytes)
+        self.loads = Counter()
+        self.load_sec = {}
+
+    def get(self, system, model_id, device="cpu", compute_type=None, **load_kwargs):
+        """Return a cached model, loading it on first use (different load_kwargs load another instance)"""
+        key = (system, model_id, device, compute_type, _freeze(load_kwargs))
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+        if system not in LOADERS:
+            raise ValueError(f"No loader for system '{system}'. Available: {sorted(LOADERS)}")
+
+        print(f"[registry] Loading {system}:{model_id} on {device} ({compute_type or 'default'})...",
+              file=sys.stderr)
+        rss0 = _rss_bytes()
+        t0 = time.time()
+        model = LOADERS[system](model_id, device, compute_type, **load_kwargs)
+        self.load_sec[key] = time.time() - t0
+
+        nbytes = _torch_bytes(model)
+        if nbytes is None:
+            rss1 = _rss_bytes()
+            if rss0 is None or rss1 is None:
+                print(f"[registry] WARNING: cannot measure RSS (install psutil); "
+                      f"{system}:{model_id} counts as 0 GB against the budget", file=sys.stderr)
+                nbytes = 0
+            else:
+                nbytes = max(rss1 - rss0, 0)
+
+        self._entries[key] = (model, nbytes)
+        self.loads[key] += 1
+        self._evict()
+        print(f"[registry] Loaded in {self.load_sec[key]:.1f}s (~{nbytes / 1e9:.2f} GB, "
+              f"pool {self.used_bytes() / 1e9:.2f}/{self.budget_bytes / 1e9:.2f} GB)", file=sys.stderr)
+        return model
+
+    def used_bytes(self):
+        return sum(nbytes for _, nbytes in self._entries.values())
+
+    def _evict(self):
+        evicted = False
+        while self.used_bytes() > self.budget_bytes and len(self._entries) > 1:
+            key, _ = self._entries.popitem(last=False)
+            print(f"[registry] Evicting {key[0]}:{key[1]} ({key[2]})", file=sys.stderr)
+            evicted = True
+        if not evicted:
+            return
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def clear(self):
+        self._entries.clear()
+        gc.collect()
+
+    @staticmethod
+    def _label(key):
+        return f"{key[0]}:{key[1]}@{key[2]}" + (f" {key[4]}" if key[4] else "")
+
+    def stats(self):
+        return {
+            "entries": [self._label(k) for k in self._entries],
+            "used_gb": round(self.used_bytes() / 1e9, 3),
+            "budget_gb": round(self.budget_bytes / 1e9, 3),
+            "loads": {self._label(k): n for k, n in self.loads.items()},
+        }
+
+
+REGISTRY = ModelRegistry(float(os.environ.get("ASR_MODEL_BUDGET_GB", "16")) * 1e9)
+
+
+def get_model(system, model_id, device="cpu", compute_type=None, **load_kwargs):
+    return REGISTRY.get(system, model_id, device, compute_type, **load_kwargs)
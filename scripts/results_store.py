@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Columnar results store (partitioned Parquet).
+
+Analyses used to rebuild their dataset by globbing and json.load-ing every
+sidecar under results/transcripts/**. Runners now also append one row per
+
+    (file, system, model, mode, config)
+
+to a Hive-partitioned Parquet dataset (ASR_RESULTS_STORE, default
+results/store; "off" disables writes):
+
+    results/store/mode=hinted/system=omnilingual/language=mn/part-<run>-<writer>-<n>.parquet
+
+with the transcript, timings and LID fields as columns. Readers go through
+pyarrow.dataset, so partition filters prune whole directories, other
+filters are pushed down to the row groups, and only the requested columns
+are read:
+
+    import results_store
+    df = results_store.load(["file", "language", "rtf"],
+                            filters={"mode": "hinted", "system": ["whisper-small", "omnilingual"]})
+
+A re-run of the same key supersedes the older row (latest written_at wins).
+The sidecar schemas differ per runner; normalize() maps them onto the
+columns:
+  processing_time_sec   processing_time_sec | elapsed_sec | latency_sec
+                        (run_whisper.py's duration_sec, which is wall time there;
+                        see wall_time_sidecar())
+  duration_sec          audio_sec | duration_sec (audio length)
+  rtf                   processing_time_sec / duration_sec, recomputed
+  file                  canonical_file(): relative to the working directory,
+                        the form the live runners write, so keys dedupe
+  decode_sec            audio decoding: decode_sec | timing.audio_load_sec
+Fields without a column are kept in `extra` (JSON). Existing trees of
+sidecars are brought in with import_results.py.
+
+pyarrow is optional: without it writers warn once and do nothing, and
+available() is False so loaders fall back to the sidecars. available() is
+also False (with a warning) until import_results.py has completed once
+(<store>/_import/complete): a store holding only rows from runs since it
+was introduced would otherwise hide every older sidecar from the analyses.
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import quote
+
+STORE_ROOT = os.environ.get("ASR_RESULTS_STORE", "results/store")
+
+KEY = ["file", "system", "model", "mode", "config"]
+PARTITIONS = ["mode", "system", "language"]
+CONFIG_KEYS = ("beam_size", "vad_filter", "compute_type", "cfg")
+
+_FIELDS = [
+    ("file", "string"),
+    ("file_id", "string"),
+    ("system", "string"),
+    ("model", "string"),
+    ("mode", "string"),
+    ("language", "string"),
+    ("config", "string"),
+    ("transcript", "string"),
+    ("duration_sec", "float64"),
+    ("processing_time_sec", "float64"),
+    ("rtf", "float64"),
+    ("decode_sec", "float64"),
+    ("detected_language", "string"),
+    ("language_prob", "float64"),
+    ("fallback", "string"),
+    ("device", "string"),
+    ("batch_size", "int64"),
+    ("extra", "string"),
+    ("run_id", "string"),
+    ("written_at", "float64"),
+]
+COLUMNS = [name for name, _ in _FIELDS]
+
+# sidecar keys consumed by normalize(); everything else goes to `extra`
+_CONSUMED = {
+    "file", "audio_file", "system", "model", "mode", "language", "language_used", "lang",
+    "transcript", "text", "duration_sec", "audio_sec", "processing_time_sec", "elapsed_sec",
+    "latency_sec", "rtf", "decode_sec", "detected_language", "lid_language",
+    "language_probability", "lid_prob", "fallback", "device", "batch_size", "config",
+} | set(CONFIG_KEYS)
+
+IMPORT_MARKER = os.path.join("_import", "complete")
+
+_warned = False
+_warned_import = False
+
+
+def _pyarrow():
+    global _warned
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        if not _warned:
+            print("⚠️  pyarrow not installed: results store disabled (sidecars only)", file=sys.stderr)
+            _warned = True
+        return None
+
+
+def schema():
+    import pyarrow as pa
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in _FIELDS])
+
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    return ds.partitioning(pa.schema([(p, pa.string()) for p in PARTITIONS]), flavor="hive")
+
+
+def config_key(record):
+    """Canonical decode-config string, e.g. "beam_size=1,vad_filter=True" ("default" if none)"""
+    parts = []
+    for k in CONFIG_KEYS:
+        v = record.get(k)
+        if isinstance(v, dict):  # sweep_decode.py: cfg = {..., "tag": "b5_t0_bo1"}
+            v = v.get("tag") or json.dumps(v, sort_keys=True)
+        if v is not None:
+            parts.append(f"{k}={v}")
+    return ",".join(parts) or "default"
+
+
+def _num(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _first(record, *keys):
+    for k in keys:
+        if record.get(k) is not None:
+            return record[k]
+    return None
+
+
+def canonical_file(path):
+    """Audio path as the live runners store it: normalized, relative to the working directory if under it"""
+    if not path:
+        return path
+    p = os.path.normpath(str(path))
+    if os.path.isabs(p):
+        try:
+            rel = os.path.relpath(p)
+        except ValueError:  # other drive
+            rel = p
+        if not rel.startswith(".."):
+            p = rel
+    return p.replace(os.sep, "/")
+
+
+def wall_time_sidecar(record):
+    """
+    True for run_whisper.py sidecars whose duration_sec is wall time: the
+    original runner wrote {model, mode, language, duration_sec, ...} with no
+    audio length and no other timing field.
+    """
+    return (record.get("duration_sec") is not None and "model" in record
+            and not record.keys() & {"audio_sec", "processing_time_sec", "elapsed_sec", "latency_sec"})
+
+
+def normalize(record, **fields):
+    """
+    One store row from a runner result / legacy sidecar dict. Keyword
+    arguments (system=, model=, mode=, language=, config=, ...) override
+    what the record says - runners know their layout better than their JSON.
+    For wall_time_sidecar() records the audio length is unknown; pass it as
+    duration_sec= and rtf is computed from it.
+    """
+    r = dict(record)
+    timing = r.get("timing") if isinstance(r.get("timing"), dict) else {}
+
+    processing = _num(_first(r, "processing_time_sec", "elapsed_sec", "latency_sec"))
+    if processing is None and r.get("audio_sec") is not None:
+        processing = _num(r.get("duration_sec"))  # run_whisper.py: duration_sec is wall time
+        duration = _num(r["audio_sec"])
+    elif wall_time_sidecar(r):
+        processing, duration = _num(r["duration_sec"]), None
+    else:
+        duration = _num(_first(r, "audio_sec", "duration_sec"))
+    rtf = processing / duration if (processing is not None and duration) else _num(r.get("rtf"))
+
+    file = str(_first(r, "file", "audio_file") or "")
+    mode = r.get("mode") or "unk"
+    language = _first(r, "language_used", "language", "lang")
+    detected = _first(r, "detected_language", "lid_language")
+    transcript = _first(r, "transcript", "text")
+    fallback = r.get("fallback")
+
+    row = {
+        "file": file,
+        "file_id": Path(file).stem,
+        "system": r.get("system") or "unk",
+        "model": r.get("model") or "",
+        "mode": mode,
+        "language": language or "unk",
+        "config": r.get("config") or config_key(r),
+        "transcript": transcript.strip() if isinstance(transcript, str) else None,
+        "duration_sec": duration,
+        "processing_time_sec": processing,
+        "rtf": rtf,
+        "decode_sec": _num(_first(r, "decode_sec") or timing.get("audio_load_sec")),
+        "detected_language": detected,
+        "language_prob": _num(_first(r, "language_probability", "lid_prob")),
+        "fallback": str(fallback) if fallback is not None else None,
+        "device": r.get("device"),
+        "batch_size": int(r["batch_size"]) if r.get("batch_size") is not None else None,
+    }
+    extra = {k: v for k, v in r.items() if k not in _CONSUMED}
+    row["extra"] = json.dumps(extra, ensure_ascii=False, default=str) if extra else None
+    for k, v in fields.items():
+        if v is not None:
+            row[k] = v
+    row["file"] = canonical_file(row["file"])
+    if row["rtf"] is None and row["processing_time_sec"] is not None and row["duration_sec"]:
+        row["rtf"] = row["processing_time_sec"] / row["duration_sec"]
+    if not row["file_id"] and row["file"]:
+        row["file_id"] = Path(row["file"]).stem
+    if row["detected_language"] is None and row["mode"] == "lid2asr":
+        row["detected_language"] = row["language"]
+    return row
+
+
+class ResultsWriter:
+    """
+    Buffers rows and writes one Parquet part file per partition on flush.
+    Part files are written under a dot-name and renamed into place, so
+    readers (which skip dot/underscore files) never see a partial file.
+
+        with ResultsWriter() as store:
+            store.append(sidecar, system="mms", language=lang)
+    """
+
+    def __init__(self, root=None, run_id=None, flush_rows=1000):
+        root = root or STORE_ROOT
+        self.enabled = root != "off" and _pyarrow() is not None
+        self.root = Path(root)
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.flush_rows = flush_rows
+        self.rows = []
+        self.written = 0
+        # part names must not collide between writers sharing a run_id (or a
+        # pid and second, e.g. several shards compacted by one process)
+        self._token = uuid.uuid4().hex[:12]
+        self._seq = 0
+
+    def append(self, record, **fields):
+        if not self.enabled:
+            return
+        row = normalize(record, **fields)
+        row.setdefault("run_id", self.run_id)
+        row.setdefault("written_at", time.time())
+        self.rows.append(row)
+        if len(self.rows) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.enabled or not self.rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        groups = {}
+        for row in self.rows:
+            groups.setdefault(tuple(row[p] for p in PARTITIONS), []).append(row)
+        data_schema = pa.schema([f for f in schema() if f.name not in PARTITIONS])
+        for values, rows in groups.items():
+            part_dir = self.root.joinpath(*(f"{p}={quote(str(v), safe='')}" for p, v in zip(PARTITIONS, values)))
+            part_dir.mkdir(parents=True, exist_ok=True)
+            table = pa.Table.from_pylist(rows, schema=data_schema)
+            name = f"part-{self.run_id}-{self._token}-{self._seq:05d}.parquet"
+            self._seq += 1
+            tmp = part_dir / f".{name}.tmp"
+            pq.write_table(table, tmp, compression="zstd")
+            os.replace(tmp, part_dir / name)
+        self.written += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def available(root=None):
+    """True if pyarrow is importable, the store has data and legacy sidecars have been imported"""
+    global _warned_import
+    root = Path(root or STORE_ROOT)
+    if not root.is_dir():
+        return False
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    if next(root.rglob("*.parquet"), None) is None:
+        return False
+    if not (root / IMPORT_MARKER).exists():
+        if not _warned_import:
+            print(f"⚠️  {root} has no import of the legacy sidecars yet (scripts/import_results.py): "
+                  f"reading sidecars", file=sys.stderr)
+            _warned_import = True
+        return False
+    return True
+
+
+def dataset(root=None):
+    import pyarrow.dataset as ds
+    return ds.dataset(str(root or STORE_ROOT), format="parquet", schema=schema(),
+                      partitioning=_partitioning())
+
+
+def _expression(filters):
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    expr = None
+    for col, value in filters.items():
+        if isinstance(value, (list, tuple, set)):
+            e = pc.field(col).isin(list(value))
+        elif value is None:
+            e = pc.field(col).is_null()
+        else:
+            e = pc.field(col) == value
+        expr = e if expr is None else expr & e
+    return expr
+
+
+def load(columns=None, filters=None, root=None, latest=True):
+    """
+    pandas DataFrame of store rows. filters is {column: value or [values]}
+    (ANDed) or a pyarrow.dataset expression; columns=None reads everything.
+    latest=True keeps only the newest row per (file, system, model, mode, config).
+    """
+    read = list(columns) if columns else list(COLUMNS)
+    if latest:
+        read += [c for c in KEY + ["written_at"] if c not in read]
+    table = dataset(root).to_table(columns=read, filter=_expression(filters))
+    df = table.to_pandas()
+    if latest and len(df):
+        df = (df.sort_values("written_at", kind="stable")
+                .drop_duplicates(KEY, keep="last")
+                .sort_index())
+    if columns:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
+
+
+def one_config(df, by=("system", "model"), config=None):
+    """
+    Rows of one decode config per `by` group. Several configs in a group (e.g.
+    greedy run_whisper.py and beam-5 run_whisper_beam.py rows of whisper-small)
+    would be averaged together, which the per-directory sidecar readers never
+    did: they raise ValueError unless config (default $ASR_RESULTS_CONFIG)
+    picks one.
+    """
+    config = config or os.environ.get("ASR_RESULTS_CONFIG")
+    if not len(df):
+        return df
+    by = list(by)
+    key = df[by].astype(str).agg("/".join, axis=1) if by else df["config"].map(lambda _: "all")
+    configs = df.groupby(key)["config"].unique()
+    mixed = configs[configs.map(len) > 1]
+    if mixed.empty:
+        return df
+    if config is None or not all(config in c for c in mixed):
+        detail = "; ".join(f"{k}: {sorted(c)}" for k, c in mixed.items())
+        raise ValueError(f"results store rows mix decode configs ({detail}); "
+                         f"set ASR_RESULTS_CONFIG to the one to analyze")
+    return df[~key.isin(mixed.index) | (df["config"] == config)]
+
+
+def extra_field(df, key):
+    """Series with one field pulled out of the JSON `extra` column"""
+    return df["extra"].map(lambda s: json.loads(s).get(key) if isinstance(s, str) else None)
@@ -34,22 +34,17 @@ if [ "$AUDIO_COUNT" -lt 5 ]; then
     fi
 fi
 
-# Create output directory
-mkdir -p "${OUTDIR}"
-
 echo "======================================"
 echo "Starting batch comparison..."
 echo "======================================"
 echo
 
-# Run comparison
-python scripts/compare_systems.py \
-    --audio data/wav \
-    --mode hinted \
-    --langs mn hu \
-    --whisper-model "${WHISPER_MODEL}" \
+# One resumable task per language (scripts/experiments.py --grid comparison)
+python scripts/experiments.py run --grid comparison \
+    --models "${WHISPER_MODEL}" \
     --device "${DEVICE}" \
-    --out-csv "${OUTDIR}/system_comparison.csv"
+    --outdir "${OUTDIR}" \
+    --ledger "${OUTDIR}/experiments.sqlite"
 
 echo
 echo "======================================"
@@ -57,11 +52,11 @@ echo "✅ Comparison Complete!"
 echo "======================================"
 echo
 echo "Results saved to:"
-echo "  ${OUTDIR}/system_comparison.csv"
+echo "  ${OUTDIR}/system_comparison_${WHISPER_MODEL}_<lang>_default.csv"
 echo
 echo "Next steps:"
-echo "  1. Review results: cat ${OUTDIR}/system_comparison.csv"
-echo "  2. Generate plots: python scripts/plot_comparison.py --csv ${OUTDIR}/system_comparison.csv"
+echo "  1. Review results: cat ${OUTDIR}/system_comparison_*.csv"
+echo "  2. Generate plots: python scripts/plot_comparison.py --csv ${OUTDIR}/system_comparison_${WHISPER_MODEL}_mn_default.csv"
 echo "  3. Document findings: update docs/thesis_materials/05_results_comparison.md"
 echo "  4. Commit: ./scripts/document_milestone.sh \"Completed system comparison\""
 echo
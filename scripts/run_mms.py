@@ -7,10 +7,13 @@ Supports 1100+ languages including MN, HU, ES, FR
 import argparse
 import time
 import json
-import torch
-import librosa
 from pathlib import Path
-from transformers import Wav2Vec2ForCTC, AutoProcessor
+
+from model_registry import get_model
+import ctc_batch
+import audio_loader
+import results_store
+import run_shard
 
 # MMS model supports 1100+ languages
 MODEL_ID = 'facebook/mms-1b-all'
@@ -23,75 +26,262 @@ LANG_MAP = {
     'fr': 'fra',  # French
 }
 
-class MMS_ASR:
-    def __init__(self, language: str, device: str = 'cuda'):
-        """Initialize MMS for a specific language"""
-        if language not in LANG_MAP:
-            raise ValueError(f"Language '{language}' not supported. Available: {list(LANG_MAP.keys())}")
-        
-        self.language = language
-        self.lang_code = LANG_MAP[language]
+class MMSEngine:
+    """
+    Multi-language MMS: the 1B base is loaded once (model registry) and only
+    the language adapter + tokenizer target language are switched.
+    """
+    def __init__(self, device: str = 'cuda', chunk_sec: float = 20.0, stride_sec: float = 2.0):
         self.device = device
+        # Long inputs are split into chunk_sec windows with stride_sec context (ctc_batch.py)
+        self.chunk_sec = chunk_sec
+        self.stride_sec = stride_sec
         self.model_id = MODEL_ID
+        self.processor, self.model = get_model('mms', self.model_id, device)
+        self.switch_times = []  # (language, seconds)
+
+    def set_language(self, language: str) -> float:
+        """Activate the adapter for language; returns switch latency (0 if already active)"""
+        if language not in LANG_MAP:
+            raise ValueError(f"Language '{language}' not supported. Available: {list(LANG_MAP.keys())}")
+        lang_code = LANG_MAP[language]
+        # The registry model is shared, so the active adapter is tracked on the model itself
+        if getattr(self.model, '_mms_active_lang', None) == lang_code:
+            return 0.0
         
-        print(f"[MMS] Loading {self.model_id} for {language} ({self.lang_code}) on {device}...")
-        self.processor = AutoProcessor.from_pretrained(self.model_id)
-        self.model = Wav2Vec2ForCTC.from_pretrained(self.model_id).to(device)
-        self.model.eval()
+        t0 = time.time()
+        self.processor.tokenizer.set_target_lang(lang_code)
+        self.model.load_adapter(lang_code)
+        self.model._mms_active_lang = lang_code
+        switch_sec = time.time() - t0
         
-        # Set target language
-        self.processor.tokenizer.set_target_lang(self.lang_code)
-        self.model.load_adapter(self.lang_code)
+        self.switch_times.append((language, switch_sec))
+        print(f"[MMS] Adapter -> {language} ({lang_code}) in {switch_sec:.2f}s")
+        return switch_sec
+
+    def transcribe(self, audio_path: str, language: str):
+        """Transcribe audio file with the adapter for language"""
+        self.set_language(language)
+        lang_code = LANG_MAP[language]
         
-    def transcribe(self, audio_path: str):
-        """Transcribe audio file"""
-        # Load audio with librosa (more compatible)
-        audio, sr = librosa.load(audio_path, sr=16000, mono=True)
+        # Decode to 16 kHz mono float32 (timed separately from inference)
+        audio, decode_sec = audio_loader.decode_16k(audio_path)
         
         # Get audio duration
         duration_sec = len(audio) / 16000
         
         # Process audio
         t0 = time.time()
-        inputs = self.processor(audio, sampling_rate=16000, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
-        
-        # Inference
-        with torch.no_grad():
-            outputs = self.model(**inputs).logits
-        
-        # Decode
-        predicted_ids = torch.argmax(outputs, dim=-1)
-        transcription = self.processor.batch_decode(predicted_ids)[0]
+        transcription = ctc_batch.transcribe_long(
+            self.processor, self.model, audio, self.device, self.chunk_sec, self.stride_sec
+        )
         
         processing_time = time.time() - t0
         rtf = processing_time / duration_sec if duration_sec > 0 else 0
         
         return {
             'text': transcription,
-            'language': self.lang_code,
+            'language': lang_code,
             'duration_sec': duration_sec,
             'processing_time_sec': processing_time,
+            'decode_sec': decode_sec,
             'rtf': rtf,
             'model': self.model_id.split('/')[-1],
             'device': self.device
         }
 
+    def transcribe_many(self, audio_paths, language: str, max_batch_audio_sec: float = 60.0,
+                        chunk_files: int = 256):
+        """
+        Batched transcription with length bucketing (ctc_batch.py).
+        Yields (audio_path, result) in input order; result is None for a
+        clip that could not be decoded.
+        """
+        self.set_language(language)
+        # Audio is decoded ahead in background processes (audio_loader.py)
+        for items in audio_loader.iter_prefetched_chunks(audio_paths, chunk_files, skip_errors=True):
+            for path, audio, _ in items:
+                if audio is None:
+                    yield path, None
+            items = [item for item in items if item[1] is not None]
+            if not items:
+                continue
+            audios = [a for _, a, _ in items]
+            results = ctc_batch.transcribe_bucketed(
+                self.processor, self.model, audios, self.device, max_batch_audio_sec,
+                self.chunk_sec, self.stride_sec
+            )
+            for (path, _, decode_sec), r in zip(items, results):
+                yield path, {
+                    'text': r['text'],
+                    'language': LANG_MAP[language],
+                    'duration_sec': r['duration_sec'],
+                    'processing_time_sec': r['processing_time_sec'],
+                    'decode_sec': decode_sec,
+                    'rtf': r['rtf'],
+                    'model': self.model_id.split('/')[-1],
+                    'device': self.device,
+                    'batch_size': r['batch_size'],
+                }
+
+
+class MMS_ASR:
+    def __init__(self, language: str, device: str = 'cuda'):
+        """Initialize MMS for a specific language"""
+        if language not in LANG_MAP:
+            raise ValueError(f"Language '{language}' not supported. Available: {list(LANG_MAP.keys())}")
+        
+        self.language = language
+        self.lang_code = LANG_MAP[language]
+        self.device = device
+        self.model_id = MODEL_ID
+        
+        # Base model is shared via the model registry; only the adapter is per-language
+        print(f"[MMS] Using {self.model_id} for {language} ({self.lang_code}) on {device}")
+        self.engine = MMSEngine(device)
+        self.engine.set_language(language)
+        
+    def transcribe(self, audio_path: str):
+        """Transcribe audio file"""
+        return self.engine.transcribe(audio_path, self.language)
+
+
+def sidecar(result, input_path: Path):
+    """The per-clip JSON record for a transcribe() result"""
+    result_json = {
+        'file': str(input_path),
+        'transcript': result['text'],
+        'language_used': result['language'],
+        'duration_sec': result['duration_sec'],
+        'processing_time_sec': result['processing_time_sec'],
+        'rtf': result['rtf'],
+        'model': result['model'],
+        'device': result['device'],
+        'system': 'mms',
+        'mode': 'hinted'
+    }
+    for key in ('decode_sec', 'batch_size'):
+        if key in result:
+            result_json[key] = result[key]
+    return result_json
+
+
+def save_result(result, input_path: Path, outdir: Path, lang: str, save_json: bool, store=None):
+    outdir = outdir / lang
+    outdir.mkdir(parents=True, exist_ok=True)
+    
+    base_name = input_path.stem
+    txt_file = outdir / f"{base_name}.txt"
+    json_file = outdir / f"{base_name}.json"
+    
+    # Save transcript
+    with open(txt_file, 'w', encoding='utf-8') as f:
+        f.write(result['text'])
+    
+    # Save JSON if requested
+    result_json = sidecar(result, input_path)
+    if save_json:
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(result_json, f, indent=2, ensure_ascii=False)
+    if store is not None:
+        store.append(result_json, language=lang)
+    return txt_file
+
+
+def run_multi_language(args):
+    """All languages in one process: files grouped by language, one adapter switch per group"""
+    engine = MMSEngine(args.device, args.chunk_sec, args.stride_sec)
+    outdir = Path(args.outdir)
+    
+    shard = None
+    if args.outputs == 'shard':
+        shard = run_shard.RunShard(args.shard or outdir / run_shard.SHARD_NAME, args.store,
+                                   export_dir=outdir if args.export_files else None, export_sidecars=args.save_json,
+                                   resume=not args.no_resume)
+        if shard.resumed:
+            print(f"[MMS] resuming {shard.path}: {shard.resumed} clips already done")
+    sink = shard or results_store.ResultsWriter(args.store)
+    
+    with sink:
+        for lang in args.languages:
+            audio_files = sorted(Path(args.in_dir).glob(f"{lang}/*.mp3"))
+            if shard is not None:
+                audio_files = [f for f in audio_files if not shard.done(f)]
+            if not audio_files:
+                print(f"❌ No audio files to process for {lang}")
+                continue
+            
+            engine.set_language(lang)
+            total_time = 0.0
+            done = failed = 0
+            results = engine.transcribe_many(audio_files, lang, args.max_batch_audio_sec)
+            for audio_file, result in results:
+                if result is None:
+                    failed += 1  # logged by the prefetcher
+                    continue
+                done += 1
+                if shard is not None:
+                    shard.append(audio_file, f"{lang}/{audio_file.stem}", result['text'],
+                                 sidecar(result, audio_file), language=lang)
+                else:
+                    save_result(result, audio_file, outdir, lang, args.save_json, sink)
+                total_time += result['processing_time_sec']
+                if done % 100 == 0:
+                    print(f"  {lang}: Processed {done}/{len(audio_files)} files "
+                          f"(avg: {total_time / done:.3f}s per file)" + (f", {failed} failed" if failed else ""))
+            print(f"✅ {lang.upper()} completed: {done} files, {total_time:.1f}s inference"
+                  + (f", {failed} failed to decode" if failed else ""))
+    
+    # Adapter switch latency is kept out of per-file processing_time_sec
+    switches = [{'language': l, 'switch_sec': t} for l, t in engine.switch_times]
+    outdir.mkdir(parents=True, exist_ok=True)
+    with open(outdir / 'adapter_switch_times.json', 'w', encoding='utf-8') as f:
+        json.dump(switches, f, indent=2)
+    for sw in switches:
+        print(f"  adapter switch {sw['language']}: {sw['switch_sec']:.2f}s")
+
 
 def main():
     parser = argparse.ArgumentParser(description='MMS ASR Evaluation')
-    parser.add_argument('--infile', required=True, help='Input audio file')
-    parser.add_argument('--hint-lang', required=True, choices=['mn', 'hu', 'es', 'fr'],
-                      help='Target language')
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument('--infile', help='Input audio file')
+    src.add_argument('--in-dir', help='Audio root with <lang>/*.mp3 (all languages, one model load)')
+    parser.add_argument('--hint-lang', choices=['mn', 'hu', 'es', 'fr'],
+                      help='Target language (required with --infile)')
+    parser.add_argument('--languages', nargs='+', default=['mn', 'hu', 'es', 'fr'],
+                      help='Languages to process with --in-dir')
     parser.add_argument('--device', default='cuda', choices=['cuda', 'cpu'],
                       help='Device to use for inference')
     parser.add_argument('--save-json', action='store_true',
                       help='Save results as JSON')
+    parser.add_argument('--max-batch-audio-sec', type=float, default=60.0,
+                      help='Padded audio seconds per forward pass with --in-dir')
+    parser.add_argument('--chunk-sec', type=float, default=20.0,
+                      help='Window length for long inputs (bounds peak memory)')
+    parser.add_argument('--stride-sec', type=float, default=2.0,
+                      help='Left/right context per window, dropped when stitching')
     parser.add_argument('--outdir', default='results/transcripts/hinted/mms',
                       help='Output directory')
+    parser.add_argument('--outputs', choices=['shard', 'files'], default='shard',
+                      help='--in-dir: append-only results.jsonl (resumable) or per-clip .txt/.json files '
+                           'written as it goes')
+    parser.add_argument('--export-files', action='store_true',
+                      help="With --outputs shard: also write the per-clip .txt/.json tree for this run's clips")
+    parser.add_argument('--shard', default=None,
+                      help='Shard path (default: <outdir>/results.jsonl)')
+    parser.add_argument('--no-resume', action='store_true',
+                      help='Start a fresh shard (the existing one is kept as <shard>.<time>.bak)')
+    parser.add_argument('--store', default=results_store.STORE_ROOT,
+                      help='Columnar results store to append to ("off" disables)')
     
     args = parser.parse_args()
     
+    if args.in_dir:
+        run_multi_language(args)
+        return
+    if not args.hint_lang:
+        parser.error('--hint-lang is required with --infile')
+    
     # Initialize model
     asr = MMS_ASR(args.hint_lang, args.device)
     
@@ -99,39 +289,9 @@ def main():
     input_path = Path(args.infile)
     result = asr.transcribe(str(input_path))
     
-    # Prepare output paths
-    outdir = Path(args.outdir) / args.hint_lang
-    outdir.mkdir(parents=True, exist_ok=True)
-    
-    base_name = input_path.stem
-    txt_file = outdir / f"{base_name}.txt"
-    json_file = outdir / f"{base_name}.json"
-    
-    # Save transcript
-    with open(txt_file, 'w', encoding='utf-8') as f:
-        f.write(result['text'])
-    
+    with results_store.ResultsWriter(args.store) as store:
+        txt_file = save_result(result, input_path, Path(args.outdir), args.hint_lang, args.save_json, store)
     print(f"Wrote: {txt_file}")
-    
-    # Save JSON if requested
-    if args.save_json:
-        result_json = {
-            'file': str(input_path),
-            'transcript': result['text'],
-            'language_used': result['language'],
-            'duration_sec': result['duration_sec'],
-            'processing_time_sec': result['processing_time_sec'],
-            'rtf': result['rtf'],
-            'model': result['model'],
-            'device': result['device'],
-            'system': 'mms',
-            'mode': 'hinted'
-        }
-        
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(result_json, f, indent=2, ensure_ascii=False)
-        
-        print(f"Wrote: {json_file}")
 
 
 if __name__ == '__main__':
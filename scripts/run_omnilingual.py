@@ -9,7 +9,8 @@ import time
 import json
 import torch
 from pathlib import Path
-from omnilingual_asr.models.inference.pipeline import ASRInferencePipeline
+
+from model_registry import get_model
 
 # Language code mapping for OmniLingual (uses ISO 639-3 + script)
 LANG_MAP = {
@@ -35,9 +36,8 @@ class OmniLingualASR:
         self.lang_code = LANG_MAP[language]
         self.model_card = model_card
         
-        print(f"[OmniLingual] Loading {model_card} for {language} ({self.lang_code})...")
-        self.pipeline = ASRInferencePipeline(model_card=model_card)
-        print("✓ Model loaded")
+        print(f"[OmniLingual] Using {model_card} for {language} ({self.lang_code})")
+        self.pipeline = get_model('omnilingual', model_card, None)
         
     def transcribe(self, audio_path: str):
         """Transcribe audio file"""
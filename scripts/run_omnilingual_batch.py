@@ -1,15 +1,19 @@
 #!/usr/bin/env python3
 """
 Optimized OmniLingual batch processing
-Loads model ONCE per language, processes all files
+Loads model ONCE, feeds the pipeline duration-sorted batches of files
 """
 
 import argparse
 import time
 import json
+from collections import Counter
 from pathlib import Path
-from omnilingual_asr.models.inference.pipeline import ASRInferencePipeline
-import librosa
+from model_registry import get_model
+from duration_index import durations
+import audio_loader
+import results_store
+import run_shard
 
 # Language code mapping
 LANG_MAP = {
@@ -19,91 +23,128 @@ LANG_MAP = {
     'fr': 'fra_Latn',
 }
 
-def process_model_language(model_card, lang, audio_dir, output_dir):
-    """Process all files for one model and language"""
+def process_model_language(model_card, lang, audio_dir, output_dir, batch_size=8, prefetch=2, workers=4,
+                           store=None, shard=None):
+    """
+    Process all files for one model and language.
+    
+    Files are sorted by duration and sent to the pipeline batch_size at a
+    time; audio for the next `prefetch` batches is decoded in background
+    processes (audio_loader.py) while the model runs. Each batch's wall time
+    is split over its files in proportion to their duration, so per-file
+    processing_time_sec / rtf stay comparable with the per-file runners
+    (compare_whisper_omni.py). Decode time is recorded as decode_sec.
+    
+    With a shard (run_shard.py) results are appended to it instead of the
+    per-clip .txt/.json files (written on close only with --export-files),
+    and clips already in it are skipped.
+    """
     
     lang_code = LANG_MAP[lang]
     audio_files = sorted(Path(audio_dir).glob(f"{lang}/*.mp3"))
+    if shard is not None:
+        audio_files = [f for f in audio_files if not shard.done(f)]
     
     if not audio_files:
-        print(f"❌ No audio files found for {lang}")
+        print(f"❌ No audio files to process for {lang}")
         return
     
     print(f"\n--- Processing {lang.upper()} with {model_card} ---")
-    print(f"Files to process: {len(audio_files)}")
+    print(f"Files to process: {len(audio_files)} (batch_size={batch_size})")
     
-    # Load model ONCE
-    print(f"Loading {model_card}...")
-    pipeline = ASRInferencePipeline(model_card=model_card)
-    print("✓ Model loaded\n")
+    # Loaded once per model card (registry), reused across languages
+    pipeline = get_model('omnilingual', model_card, None)
     
     # Prepare output directory
     outdir = Path(output_dir) / model_card / lang
-    outdir.mkdir(parents=True, exist_ok=True)
+    if shard is None:
+        outdir.mkdir(parents=True, exist_ok=True)
+    
+    # Duration-sorted order keeps padding inside a batch small (header-only, cached: duration_index.py);
+    # files the index cannot read sort first and are left to the decoder
+    indexed = durations(audio_files)
+    durs = {f: indexed.get(str(f)) or 0.0 for f in audio_files}
+    todo = []
+    for audio_file in sorted(audio_files, key=durs.get):
+        if durs[audio_file] > 40:
+            print(f"⚠️  Skipping {audio_file.name} (duration {durs[audio_file]:.1f}s > 40s limit)")
+            continue
+        todo.append(audio_file)
+    
+    # Prefetch queue: audio for the next `prefetch` batches is decoded ahead
+    # (undecodable clips are logged by the prefetcher and counted as failed)
+    batches = audio_loader.iter_prefetched_chunks(
+        todo, batch_size, workers=workers, max_ready=(prefetch + 1) * batch_size, skip_errors=True
+    )
     
-    # Process all files
     total_time = 0
-    for i, audio_file in enumerate(audio_files, 1):
-        # Load audio
-        audio, sr = librosa.load(str(audio_file), sr=16000, mono=True)
-        duration_sec = len(audio) / 16000
-        
-        # Check duration
-        if duration_sec > 40:
-            print(f"⚠️  Skipping {audio_file.name} (duration {duration_sec:.1f}s > 40s limit)")
+    done = 0
+    failed = 0
+    for batch_items in batches:
+        failed += sum(a is None for _, a, _ in batch_items)
+        batch_items = [item for item in batch_items if item[1] is not None]
+        if not batch_items:
             continue
-        
-        # Prepare audio dict
-        audio_data = {
-            "waveform": audio,
-            "sample_rate": sr
-        }
-        
-        # Transcribe with timing
+        batch = [f for f, _, _ in batch_items]
+        audio_data = [{"waveform": a, "sample_rate": 16000} for _, a, _ in batch_items]
+
+        # Transcribe the whole batch with timing
         t0 = time.time()
         transcriptions = pipeline.transcribe(
-            [audio_data],
-            lang=[lang_code],
-            batch_size=1
+            audio_data,
+            lang=[lang_code] * len(audio_data),
+            batch_size=len(audio_data)
         )
-        processing_time = time.time() - t0
-        total_time += processing_time
-        
-        transcription = transcriptions[0] if transcriptions else ""
-        rtf = processing_time / duration_sec if duration_sec > 0 else 0
-        
-        # Save results
-        base_name = audio_file.stem
-        txt_file = outdir / f"{base_name}.txt"
-        json_file = outdir / f"{base_name}.json"
-        
-        # Save transcript
-        with open(txt_file, 'w', encoding='utf-8') as f:
-            f.write(transcription)
-        
-        # Save JSON
-        result_json = {
-            'file': str(audio_file),
-            'transcript': transcription,
-            'language_used': lang_code,
-            'duration_sec': duration_sec,
-            'processing_time_sec': processing_time,
-            'rtf': rtf,
-            'model': model_card,
-            'system': 'omnilingual',
-            'mode': 'hinted'
-        }
-        
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(result_json, f, indent=2, ensure_ascii=False)
-        
+        batch_time = time.time() - t0
+        total_time += batch_time
+
+        batch_audio = sum(len(a["waveform"]) for a in audio_data) / 16000 or 1.0
+        for (audio_file, _, decode_sec), data, transcription in zip(batch_items, audio_data, transcriptions):
+            duration_sec = len(data["waveform"]) / 16000
+            processing_time = batch_time * duration_sec / batch_audio
+            rtf = processing_time / duration_sec if duration_sec > 0 else 0
+
+            result_json = {
+                'file': str(audio_file),
+                'transcript': transcription,
+                'language_used': lang_code,
+                'duration_sec': duration_sec,
+                'processing_time_sec': processing_time,
+                'rtf': rtf,
+                'model': model_card,
+                'system': 'omnilingual',
+                'mode': 'hinted',
+                'decode_sec': decode_sec,
+                'batch_size': len(audio_data),
+                'batch_time_sec': batch_time
+            }
+            if shard is not None:
+                shard.append(audio_file, f"{lang}/{audio_file.stem}", transcription, result_json, language=lang)
+                continue
+
+            # Save results
+            base_name = audio_file.stem
+            txt_file = outdir / f"{base_name}.txt"
+            json_file = outdir / f"{base_name}.json"
+
+            # Save transcript
+            with open(txt_file, 'w', encoding='utf-8') as f:
+                f.write(transcription)
+
+            # Save JSON
+            with open(json_file, 'w', encoding='utf-8') as f:
+                json.dump(result_json, f, indent=2, ensure_ascii=False)
+            if store is not None:
+                store.append(result_json, language=lang)
+
         # Progress updates
-        if i % 100 == 0:
-            avg = total_time / i
-            print(f"  Processed {i}/{len(audio_files)} files (avg: {avg:.3f}s per file)")
-    
-    avg_time = total_time / len(audio_files)
-    print(f"✅ {lang.upper()} completed: {len(audio_files)} files")
+        done += len(batch)
+        if done // 100 != (done - len(batch)) // 100:
+            print(f"  Processed {done}/{len(todo)} files (avg: {total_time / done:.3f}s per file)")
+
+    avg_time = total_time / done if done else 0
+    print(f"✅ {lang.upper()} completed: {done} files ({len(audio_files) - done - failed} skipped, "
+          f"{failed} failed to decode)")
     print(f"   Total time: {total_time:.2f}s, Average: {avg_time:.3f}s per file\n")
 
 
@@ -118,8 +159,28 @@ def main():
                       help='Directory containing audio files')
     parser.add_argument('--output-dir', default='results/transcripts/hinted/omnilingual',
                       help='Output directory')
+    parser.add_argument('--batch-size', type=int, default=8,
+                      help='Files per pipeline.transcribe call')
+    parser.add_argument('--prefetch', type=int, default=2,
+                      help='Batches of audio decoded ahead of the model')
+    parser.add_argument('--workers', type=int, default=4,
+                      help='Audio decoding processes')
+    parser.add_argument('--outputs', choices=['shard', 'files'], default='shard',
+                      help='One append-only <output-dir>/<model>/results.jsonl per model (resumable) '
+                           'or per-clip .txt/.json files written as it goes')
+    parser.add_argument('--export-files', action='store_true',
+                      help="With --outputs shard: also write the per-clip .txt/.json tree for this run's clips")
+    parser.add_argument('--shard', default=None,
+                      help='Shard path for a single model (default: <output-dir>/<model>/results.jsonl)')
+    parser.add_argument('--no-resume', action='store_true',
+                      help='Start fresh shards (existing ones are kept as <shard>.<time>.bak)')
+    parser.add_argument('--store', default=results_store.STORE_ROOT,
+                      help='Columnar results store to append to ("off" disables)')
     
     args = parser.parse_args()
+    if args.shard and len(args.models) > 1:
+        # shard entries are keyed by audio path: a second model would skip every clip the first wrote
+        parser.error('--shard takes a single --models entry (each model has its own default shard)')
     
     start_time = time.time()
     
@@ -131,18 +192,37 @@ def main():
     print(f"Estimated time: ~12-18 hours")
     print("="*60)
     
+    shard_paths = {}
     for model in args.models:
         print(f"\n{'='*60}")
         print(f"MODEL: {model}")
         print(f"{'='*60}")
         
-        for lang in args.languages:
-            process_model_language(
-                model_card=model,
-                lang=lang,
-                audio_dir=args.audio_dir,
-                output_dir=args.output_dir
-            )
+        shard = store = None
+        if args.outputs == 'shard':
+            shard = run_shard.RunShard(args.shard or Path(args.output_dir) / model / run_shard.SHARD_NAME,
+                                       args.store,
+                                       export_dir=Path(args.output_dir) / model if args.export_files else None,
+                                       resume=not args.no_resume)
+            shard_paths[model] = shard.path
+            if shard.resumed:
+                print(f"Resuming {shard.path}: {shard.resumed} clips already done")
+        else:
+            store = results_store.ResultsWriter(args.store)
+        
+        with (shard or store):
+            for lang in args.languages:
+                process_model_language(
+                    model_card=model,
+                    lang=lang,
+                    audio_dir=args.audio_dir,
+                    output_dir=args.output_dir,
+                    batch_size=args.batch_size,
+                    prefetch=args.prefetch,
+                    workers=args.workers,
+                    store=store,
+                    shard=shard
+                )
     
     total_time = time.time() - start_time
     hours = int(total_time // 3600)
@@ -156,9 +236,15 @@ def main():
     # Print summary
     for model in args.models:
         print(f"\n{model}:")
+        langs = None
+        if model in shard_paths:
+            langs = Counter(r["fields"].get("language") for r in run_shard.read_shard(shard_paths[model]))
         for lang in args.languages:
-            result_dir = Path(args.output_dir) / model / lang
-            count = len(list(result_dir.glob("*.json"))) if result_dir.exists() else 0
+            if langs is not None:
+                count = langs[lang]
+            else:
+                result_dir = Path(args.output_dir) / model / lang
+                count = len(list(result_dir.glob("*.json"))) if result_dir.exists() else 0
             print(f"  {lang}: {count} files")
 
 
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Append-only per-run result shards.
+
+Batch runners used to create a directory tree and write a .txt plus an
+indented .json for every clip. A shard is one JSONL file per run instead,
+one line per clip:
+
+    {"key": <audio path>, "path": "<lang>/<stem>", "text": ..., "sidecar": {...},
+     "fields": {system, model, mode, language, ...}, "written_at": ...}
+
+Lines are buffered and appended with a single O_APPEND write + fsync every
+flush_every clips or flush_sec seconds, so a killed run loses at most the
+last unflushed batch. On reopen, a torn last line is terminated and
+skipped by readers, and the clips already in the shard are reported done
+so the runner can resume where it stopped (resume=False, the runners'
+--no-resume, moves an existing shard aside to <shard>.<time>.bak instead).
+close() also compacts the shard into the columnar results store
+(results_store.py). Compaction is incremental: <shard>.compacted holds the
+byte offset already in the store, so a resumed run only adds its own rows.
+
+The per-clip <path>.txt/.json tree is not written by default (one shard
+instead of two inodes per clip is the point). Runners given --export-files
+pass export_dir, and close() then writes the files for the records appended
+since the last export (<shard>.exported holds that offset). The whole tree
+can be regenerated by hand for tools that still read it:
+
+    python scripts/run_shard.py export results/transcripts/hinted/small/results.jsonl
+    python scripts/run_shard.py compact results/transcripts/**/results.jsonl
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import results_store
+
+SHARD_NAME = "results.jsonl"
+
+
+def read_records(path, offset=0):
+    """(records from byte offset on, offset after the last complete line); torn / unparsable lines skipped"""
+    records = []
+    end = offset
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                end += len(line)
+                try:
+                    records.append(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return records, end
+
+
+def read_shard(path):
+    """Records of a shard in write order (unparsable / torn lines skipped)"""
+    return read_records(path)[0]
+
+
+class RunShard:
+    """
+        shard = RunShard(os.path.join(outdir, "results.jsonl"))
+        todo = [p for p in paths if not shard.done(p)]
+        ...
+        shard.append(path, f"{lang}/{stem}", text, sidecar, system="mms", language=lang)
+        shard.close()
+    """
+
+    def __init__(self, path, store=None, flush_every=200, flush_sec=30.0, export_dir=None, export_sidecars=True,
+                 resume=True):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not resume and self.path.exists():
+            os.replace(self.path, f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}.bak")
+            for marker in (_marker(self.path), _marker(self.path, "exported")):
+                if os.path.exists(marker):
+                    os.remove(marker)
+        self.store = store or results_store.STORE_ROOT
+        self.flush_every = flush_every
+        self.flush_sec = flush_sec
+        self.export_dir = export_dir
+        self.export_sidecars = export_sidecars
+        self._done = {r.get("key") for r in read_shard(self.path)}
+        self.resumed = len(self._done)
+        self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if self.path.stat().st_size and not self._ends_with_newline():
+            os.write(self.fd, b"\n")  # terminate a line torn by a crash
+        self.lines = []
+        self.appended = 0
+        self._last_flush = time.time()
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def done(self, key):
+        return str(key) in self._done
+
+    def append(self, key, path, text, sidecar, **fields):
+        key = str(key)
+        record = {"key": key, "path": path, "text": text, "sidecar": sidecar,
+                  "fields": fields, "written_at": time.time()}
+        self.lines.append(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._done.add(key)
+        self.appended += 1
+        if len(self.lines) >= self.flush_every or time.time() - self._last_flush >= self.flush_sec:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            data = "".join(self.lines).encode("utf-8")
+            while data:
+                data = data[os.write(self.fd, data):]
+            os.fsync(self.fd)
+            self.lines = []
+        self._last_flush = time.time()
+
+    def close(self, compact=True):
+        self.flush()
+        os.close(self.fd)
+        if self.export_dir is not None:
+            export_legacy(self.path, self.export_dir, self.export_sidecars, incremental=True)
+        if compact:
+            compact_shard(self.path, self.store)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _marker(path, kind="compacted"):
+    return f"{path}.{kind}"
+
+
+def _read_marker(path, kind):
+    """Byte offset recorded by the last compaction / export (0 if none or the shard was replaced)"""
+    try:
+        with open(_marker(path, kind)) as f:
+            offset = int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+    return offset if offset <= os.path.getsize(path) else 0
+
+
+def _write_marker(path, kind, offset):
+    with open(_marker(path, kind) + ".tmp", "w") as f:
+        f.write(str(offset))
+    os.replace(_marker(path, kind) + ".tmp", _marker(path, kind))
+
+
+def compact_shard(path, store=None):
+    """Append the shard's records not yet compacted to the results store; returns rows written"""
+    writer = results_store.ResultsWriter(store, run_id=f"shard-{Path(path).parent.name}-{os.getpid()}",
+                                         flush_rows=10 ** 9)
+    if not writer.enabled:
+        return 0
+    records, end = read_records(path, _read_marker(path, "compacted"))
+    for r in records:
+        writer.append(r["sidecar"] or {}, file=r["key"], transcript=r["text"],
+                      written_at=r["written_at"], **r["fields"])
+    writer.close()
+    # rows are on disk before the offset moves past them
+    _write_marker(path, "compacted", end)
+    return writer.written
+
+
+def export_legacy(path, outdir=None, sidecars=True, incremental=False):
+    """
+    Write <outdir>/<path>.txt (+ .json when the record has a sidecar) for every
+    record, or with incremental=True only for those since the last export.
+    """
+    outdir = Path(outdir or Path(path).parent)
+    records, end = read_records(path, _read_marker(path, "exported") if incremental else 0)
+    n = 0
+    for r in records:
+        base = outdir / r["path"]
+        base.parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{base}.txt", "w", encoding="utf-8") as f:
+            f.write(r["text"])
+        if sidecars and r["sidecar"] is not None:
+            with open(f"{base}.json", "w", encoding="utf-8") as f:
+                json.dump(r["sidecar"], f, indent=2, ensure_ascii=False)
+        n += 1
+    if incremental:
+        _write_marker(path, "exported", end)
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export or compact run shards")
+    ap.add_argument("action", choices=["export", "compact"])
+    ap.add_argument("shards", nargs="+", help="Shard files (globs)")
+    ap.add_argument("--outdir", help="export: root for the txt/json tree (default: next to each shard)")
+    ap.add_argument("--store", default=results_store.STORE_ROOT)
+    args = ap.parse_args()
+
+    paths = sorted({p for pattern in args.shards for p in glob.glob(pattern, recursive=True)})
+    if not paths:
+        sys.exit("no shards matched")
+    for p in paths:
+        if args.action == "export":
+            print(f"{p}: {export_legacy(p, args.outdir)} clips exported")
+        else:
+            print(f"{p}: {compact_shard(p, args.store)} rows → {args.store}")
+
+
+if __name__ == "__main__":
+    main()
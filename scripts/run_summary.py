@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import argparse, os, json, csv, glob
-import soundfile as sf
+
+import results_store
+from duration_index import durations
 
 LANGS = {"mn","hu","fr","es"}
 
@@ -20,12 +22,9 @@ def load_lid_map(lid_dir):
         }
     return lid
 
-def audio_duration_sec(wav_path):
-    try:
-        info = sf.info(wav_path)
-        return float(info.frames)/float(info.samplerate)
-    except Exception:
-        return None
+def audio_duration_sec(wav_paths):
+    # header-only durations from the shared index, {path: seconds or None}
+    return durations(sorted({p for p in wav_paths if p}))
 
 def iter_asr_sidecars(root_dir):
     # expects .../transcripts/<mode>/<system>/<lang>/json/*.json
@@ -40,7 +39,26 @@ def iter_asr_sidecars(root_dir):
         system= parts[idx+2] if idx+2 < len(parts) else "unk"
         lang  = parts[idx+3] if idx+3 < len(parts) else "unk"
         j = json.load(open(fp, encoding="utf-8"))
-        yield fp, mode, system, lang, j
+        # transcript length (characters) from the adjacent txt if available
+        text_len = None
+        txt_fp = fp.replace("/json/", "/txt/").rsplit(".", 1)[0] + ".txt"
+        if os.path.exists(txt_fp):
+            try:
+                with open(txt_fp, encoding="utf-8") as f:
+                    text_len = len(f.read().strip())
+            except Exception:
+                pass
+        yield mode, system, lang, j, text_len
+
+def iter_store_rows():
+    # same tuples as iter_asr_sidecars, from the columnar results store
+    df = results_store.load(["file", "mode", "system", "language", "processing_time_sec", "transcript", "extra"])
+    for r in df.itertuples(index=False):
+        extra = json.loads(r.extra) if isinstance(r.extra, str) else {}
+        side = {"file": r.file or None, "latency_sec": r.processing_time_sec,
+                "avg_logprob": extra.get("avg_logprob"), "no_speech_prob": extra.get("no_speech_prob")}
+        text_len = len(r.transcript) if isinstance(r.transcript, str) else None
+        yield r.mode, r.system, r.language, side, text_len
 
 def load_manifest_buckets(manifest_dir):
     # map absolute path -> bucket
@@ -67,28 +85,24 @@ def main():
     lid_map = load_lid_map(args.lid_dir) if os.path.isdir(args.lid_dir) else {}
     buckets = load_manifest_buckets(args.manifest_dir) if os.path.isdir(args.manifest_dir) else {}
 
+    if results_store.available():
+        sidecars = list(iter_store_rows())
+    else:
+        sidecars = list(iter_asr_sidecars(args.transcripts_root))
+    dur_map = audio_duration_sec(side.get("file") for *_, side, _ in sidecars)
+
     rows = []
-    for sidecar_fp, mode, system, path_lang, side in iter_asr_sidecars(args.transcripts_root):
+    for mode, system, path_lang, side, text_len in sidecars:
         wav_path     = side.get("file")
         ref_lang     = infer_lang_from_path(wav_path) if wav_path else "unk"
         lid_pred     = lid_map.get(wav_path,{}).get("lid_pred")
         lid_conf     = lid_map.get(wav_path,{}).get("lid_conf")
         latency_sec  = side.get("latency_sec")
-        dur_sec      = audio_duration_sec(wav_path) if wav_path else None
+        dur_sec      = dur_map.get(wav_path) if wav_path else None
         rtf          = (dur_sec/latency_sec) if (dur_sec and latency_sec and latency_sec>0) else None
         avg_logprob  = side.get("avg_logprob")
         no_speech    = side.get("no_speech_prob")
         bucket       = buckets.get(wav_path)
-        text_len     = None
-        # extract transcript length (characters) from adjacent txt if available
-        base = os.path.splitext(os.path.basename(sidecar_fp))[0]
-        txt_fp = sidecar_fp.replace("/json/", "/txt/").rsplit(".", 1)[0] + ".txt"
-        if os.path.exists(txt_fp):
-            try:
-                with open(txt_fp, encoding="utf-8") as f:
-                    text_len = len(f.read().strip())
-            except Exception:
-                pass
 
         rows.append([
             wav_path, ref_lang, mode, system, path_lang,
@@ -7,10 +7,11 @@ Matches the interface of run_whisper.py for fair comparison
 import argparse
 import time
 import json
-import torch
-import torchaudio
 from pathlib import Path
-from transformers import Wav2Vec2ForCTC, Wav2Vec2Processor
+
+from model_registry import get_model
+import ctc_batch
+import audio_loader
 
 # Language-specific models
 # MN & HU use base multilingual XLSR-53 (supports 53 languages)
@@ -31,43 +32,27 @@ class Wav2Vec2ASR:
         self.device = device
         self.model_id = LANG_MODELS[language]
         
-        print(f"[Wav2Vec2] Loading {self.model_id} on {device}...")
-        self.processor = Wav2Vec2Processor.from_pretrained(self.model_id)
-        self.model = Wav2Vec2ForCTC.from_pretrained(
-            self.model_id,
+        # Shared across instances/runners via the model registry
+        print(f"[Wav2Vec2] Using {self.model_id} on {device}")
+        self.processor, self.model = get_model(
+            'wav2vec2', self.model_id, device,
             use_safetensors=True
-        ).to(device)
-        self.model.eval()  # Set to evaluation mode
+        )
         
     def transcribe(self, audio_path: str):
         """Transcribe audio file"""
-        # Load audio
-        audio, sr = torchaudio.load(audio_path)
-        
-        # Resample to 16kHz if needed
-        if sr != 16000:
-            audio = torchaudio.functional.resample(audio, sr, 16000)
+        # Decode to 16 kHz mono float32 (timed separately from inference)
+        audio, decode_sec = audio_loader.decode_16k(audio_path)
         
         # Get audio duration
-        duration_sec = audio.shape[1] / 16000
+        duration_sec = len(audio) / 16000
         
-        # Process audio
-        inputs = self.processor(
-            audio.squeeze().cpu().numpy(),
-            sampling_rate=16000,
-            return_tensors='pt'
-        )
-        
-        # Move to device
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
-        
-        # Inference with timing
+        # Inference with timing (long inputs: 20 s windows, 2 s context, logit stitching)
         start_time = time.perf_counter()
         
-        with torch.no_grad():
-            logits = self.model(**inputs).logits
-            predicted_ids = torch.argmax(logits, dim=-1)
-            transcription = self.processor.batch_decode(predicted_ids)[0]
+        transcription = ctc_batch.transcribe_long(
+            self.processor, self.model, audio, self.device
+        )
         
         end_time = time.perf_counter()
         processing_time = end_time - start_time
@@ -80,6 +65,7 @@ class Wav2Vec2ASR:
             'language': self.language,
             'duration_sec': duration_sec,
             'processing_time_sec': processing_time,
+            'decode_sec': decode_sec,
             'rtf': rtf,
             'model': self.model_id.split('/')[-1],  # Short name
             'device': self.device
@@ -131,6 +117,7 @@ def main():
             'language_used': result['language'],
             'duration_sec': result['duration_sec'],
             'processing_time_sec': result['processing_time_sec'],
+            'decode_sec': result['decode_sec'],
             'rtf': result['rtf'],
             'model': result['model'],
             'device': result['device'],
@@ -1,75 +1,275 @@
 #!/usr/bin/env python
-import argparse, os, json, time, pathlib, re
-from faster_whisper import WhisperModel
+"""
+faster-whisper ASR runner (hinted / lid2asr)
+
+Single file:   --infile data/wav/mn/x.mp3
+Many files:    --manifest files.txt   (one audio path per line)
+               --in-dir data/wav/mn   (recursive)
+
+In manifest / in-dir mode the model is loaded once and every file is
+streamed through it, so per-file timing excludes model load.
+With --batch-size N > 1, clips of up to 30 s are decoded N at a time in one
+encoder/decoder call (see whisper_batch.py); batch wall time is split over
+clips in proportion to their duration. That path decodes in a single pass
+without model.transcribe()'s temperature fallback, so its WER is not the
+batch-size-1 baseline.
+
+Manifest / in-dir results go to one append-only shard per run
+(<outdir>/<mode>/<model>/results.jsonl, see run_shard.py); a re-run with the
+same shard skips clips already in it. No per-clip .txt/.json tree is
+written unless --export-files is given (then the clips of this run are
+exported when it finishes, see run_shard.py export); --outputs files
+writes it clip by clip instead (no resume).
+"""
+import argparse, os, json, time, pathlib, re, sys
+import whisper_batch
+import audio_loader
+import mel_cache
+import results_store
+import run_shard
+from model_registry import get_model
 
 LANG_RE = re.compile(r"/(mn|hu|fr|es)/", re.IGNORECASE)
+AUDIO_EXTS = (".wav", ".flac", ".mp3", ".m4a", ".ogg")
+
 def guess_lang_from_path(path):
     m = LANG_RE.search("/" + path.replace("\\","/") + "/")
     return (m.group(1).lower() if m else None)
 
-ap = argparse.ArgumentParser()
-ap.add_argument("--model", default="tiny")
-ap.add_argument("--mode", choices=["hinted","lid2asr"], required=True)
-ap.add_argument("--infile", required=True)
-ap.add_argument("--hint-lang", help="Required if mode=hinted")
-ap.add_argument("--device", default="cuda", help='"cpu", "cuda", or "auto"')
-ap.add_argument("--outdir", default="results/transcripts")
-args = ap.parse_args()
-
-pathlib.Path(args.outdir).mkdir(parents=True, exist_ok=True)
-model = WhisperModel(
-    args.model,
-    device="cuda",
-    compute_type="float16",
-    download_root="models"
-)
-
-language = None
-lid_meta = {}
-t0 = time.time()
-
-if args.mode == "hinted":
-    if not args.hint_lang:
-        language = guess_lang_from_path(args.infile)
-        if not language:
-            raise ValueError("No language hint provided and couldn't guess from path")
-    else:
-        language = args.hint_lang.lower()
-else:  # lid2asr mode
-    segments, info = model.transcribe(
-        args.infile,
-        task="lang_id",
-        beam_size=1
-    )
-    language = info.language
-    lid_meta = {
-        "detected_language": language,
-        "language_probability": info.language_probability
+def iter_manifest(path):
+    """Yield audio paths from a file list (blank lines and # comments skipped)"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+def iter_in_dir(root):
+    """Yield audio files under root in sorted order"""
+    for dirpath, _, files in sorted(os.walk(root)):
+        for fn in sorted(files):
+            if fn.lower().endswith(AUDIO_EXTS):
+                yield os.path.join(dirpath, fn)
+
+def load_model(model_name, device, compute_type=None):
+    if compute_type is None:
+        compute_type = "float16" if device == "cuda" else "int8"
+    return get_model("whisper", model_name, device, compute_type, download_root="models")
+
+def hinted_language(infile, hint_lang=None):
+    if hint_lang:
+        return hint_lang.lower()
+    language = guess_lang_from_path(infile)
+    if not language:
+        raise ValueError("No language hint provided and couldn't guess from path")
+    return language
+
+def transcribe_file(model, infile, mode, hint_lang=None, audio=None, audio_load_sec=None):
+    """
+    Run one file through an already-loaded model. Returns (text, meta).
+
+    The file is decoded once. In lid2asr mode the language comes from
+    detect_language on the first window's encoder output; both modes then
+    decode with model.transcribe and the language fixed
+    (whisper_batch.transcribe_single).
+    audio/audio_load_sec come from the prefetcher when available; decode time
+    is reported in timing.audio_load_sec, not in duration_sec / rtf.
+    """
+    language = hinted_language(infile, hint_lang) if mode == "hinted" else None
+
+    if audio is None:
+        audio, audio_load_sec = audio_loader.decode_16k(infile)
+
+    r = whisper_batch.transcribe_single(model, audio, language=language, path=infile)
+    elapsed = r["elapsed_sec"]
+
+    meta = {
+        "language": r["language"],
+        "duration_sec": elapsed,
+        "audio_sec": r["audio_sec"],
+        "rtf": (elapsed / r["audio_sec"]) if r["audio_sec"] else None,
+        "timing": {"audio_load_sec": audio_load_sec, **r["timing"]},
     }
+    if mode == "lid2asr":
+        meta["detected_language"] = r["language"]
+        meta["language_probability"] = r["language_probability"]
+    return r["text"], meta
 
-segments, info = model.transcribe(
-    args.infile,
-    language=language,
-    beam_size=1
-)
+def write_outputs(outdir, mode, model_name, infile, text, meta, store=None, config=None):
+    outfile = os.path.splitext(os.path.basename(infile))[0]
+    outdir = os.path.join(outdir, mode, model_name, meta["language"])
+    pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
 
-text = "".join(s.text for s in segments)
-duration = time.time() - t0
+    with open(os.path.join(outdir, outfile + ".txt"), "w", encoding="utf-8") as f:
+        f.write(text.strip())
 
-outfile = os.path.splitext(os.path.basename(args.infile))[0]
-outdir = os.path.join(args.outdir, args.mode, args.model, language)
-pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+    meta = {"model": model_name, "mode": mode, **meta}
+    with open(os.path.join(outdir, outfile + ".json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    if store is not None:
+        store.append(meta, file=infile, system=f"whisper-{model_name}", transcript=text, config=config)
+    return os.path.join(outdir, outfile + ".txt")
+
+def write_shard(shard, mode, model_name, infile, text, meta, config=None):
+    """One shard line instead of <mode>/<model>/<lang>/<stem>.txt/.json (run_shard.py export restores those)"""
+    outfile = os.path.splitext(os.path.basename(infile))[0]
+    meta = {"model": model_name, "mode": mode, **meta}
+    shard.append(infile, f"{meta['language']}/{outfile}", text.strip(), meta,
+                 system=f"whisper-{model_name}", config=config)
+
+def run_batched(model, items, args, stats, emit):
+    """Decode prefetched clips batch_size at a time; clips over 30 s fall back to transcribe_file"""
+    for batch in whisper_batch.iter_batches(items, args.batch_size):
+        paths, audios, languages, load_secs, long_items = [], [], [], [], []
+        for infile, audio, decode_sec in batch:
+            if audio is None:
+                stats["failed"] += 1
+                continue
+            try:
+                language = hinted_language(infile, args.hint_lang) if args.mode == "hinted" else None
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"❌ {infile}: {e}", file=sys.stderr)
+                continue
+            if not whisper_batch.fits_one_window(model, audio):
+                long_items.append((infile, audio, decode_sec))
+                continue
+            paths.append(infile)
+            audios.append(audio)
+            languages.append(language)
+            load_secs.append(decode_sec)
+        for item in long_items:
+            run_single(model, *item, args, stats, emit)
+        if not paths:
+            continue
+
+        results, wall_sec = whisper_batch.transcribe_batch(model, audios, languages, paths=paths)
+        whisper_batch.amortize(results, wall_sec)
+
+        for infile, r, decode_sec in zip(paths, results, load_secs):
+            meta = {
+                "language": r["language"],
+                "duration_sec": r["elapsed_sec"],
+                "audio_sec": r["audio_sec"],
+                "rtf": r["rtf"],
+                "timing": {"audio_load_sec": decode_sec, **r["timing"]},
+                "batch_size": len(paths),
+                "batch_wall_sec": wall_sec,
+            }
+            if args.mode == "lid2asr":
+                meta["detected_language"] = r["language"]
+                meta["language_probability"] = r["language_probability"]
+            emit(infile, r["text"], meta)
+            stats["done"] += 1
+            stats["audio"] += r["audio_sec"]
+        stats["wall"] += wall_sec
+        print(f"Processed {stats['done']} files...", file=sys.stderr)
+
+def run_single(model, infile, audio, decode_sec, args, stats, emit):
+    if audio is None:
+        stats["failed"] += 1
+        return
+    try:
+        text, meta = transcribe_file(model, infile, args.mode, args.hint_lang,
+                                     audio=audio, audio_load_sec=decode_sec)
+    except Exception as e:
+        stats["failed"] += 1
+        print(f"❌ {infile}: {e}", file=sys.stderr)
+        return
+    emit(infile, text, meta)
+    stats["done"] += 1
+    stats["wall"] += meta["duration_sec"]
+    stats["audio"] += meta["audio_sec"] or 0.0
+    if stats["done"] % 50 == 0:
+        print(f"Processed {stats['done']} files...", file=sys.stderr)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", default="tiny")
+    ap.add_argument("--mode", choices=["hinted","lid2asr"], required=True)
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--infile", help="Single audio file")
+    src.add_argument("--manifest", help="Text file with one audio path per line")
+    src.add_argument("--in-dir", help="Directory to scan recursively for audio")
+    ap.add_argument("--hint-lang", help="Language for hinted mode (default: guessed from path)")
+    ap.add_argument("--device", default="cuda", help='"cpu", "cuda", or "auto"')
+    ap.add_argument("--compute-type", default=None, help="CTranslate2 compute type (default: float16 on cuda, int8 otherwise)")
+    ap.add_argument("--batch-size", type=int, default=1, help="Clips per encoder/decoder call (manifest/in-dir only)")
+    ap.add_argument("--decode-workers", type=int, default=None, help="Audio decoding processes (default: ASR_DECODE_WORKERS or min(4, cores/2))")
+    ap.add_argument("--mel-cache", choices=["off", "memory", "disk"], default=mel_cache.mode(),
+                    help="Reuse log-mel features across model sizes (default: $ASR_MEL_CACHE or off)")
+    ap.add_argument("--outdir", default="results/transcripts")
+    ap.add_argument("--outputs", choices=["shard", "files"], default="shard",
+                    help="manifest/in-dir: append-only results.jsonl (resumable) or per-clip .txt/.json "
+                         "files written as it goes")
+    ap.add_argument("--export-files", action="store_true",
+                    help="With --outputs shard: also write the per-clip .txt/.json tree for this run's clips")
+    ap.add_argument("--shard", default=None,
+                    help="Shard path (default: <outdir>/<mode>/<model>/results.jsonl)")
+    ap.add_argument("--no-resume", action="store_true",
+                    help="Start a fresh shard (the existing one is kept as <shard>.<time>.bak)")
+    ap.add_argument("--store", default=results_store.STORE_ROOT,
+                    help='Columnar results store to append to (default: $ASR_RESULTS_STORE or results/store; "off" disables)')
+    args = ap.parse_args()
+    mel_cache.set_mode(args.mel_cache)
+    args.store_config = results_store.config_key({"compute_type": args.compute_type})
+
+    pathlib.Path(args.outdir).mkdir(parents=True, exist_ok=True)
+
+    t_load = time.time()
+    model = load_model(args.model, args.device, args.compute_type)
+    load_sec = time.time() - t_load
+
+    if args.infile:
+        text, meta = transcribe_file(model, args.infile, args.mode, args.hint_lang)
+        with results_store.ResultsWriter(args.store) as store:
+            write_outputs(args.outdir, args.mode, args.model, args.infile, text, meta,
+                          store, args.store_config)
+        if args.mel_cache != "off":
+            print(f"[run_whisper] mel cache: {mel_cache.stats()}", file=sys.stderr)
+        return
+
+    files = iter_manifest(args.manifest) if args.manifest else iter_in_dir(args.in_dir)
+    print(f"[run_whisper] {args.model} loaded in {load_sec:.1f}s on {args.device}", file=sys.stderr)
+
+    if args.outputs == "shard":
+        tree = os.path.join(args.outdir, args.mode, args.model)
+        shard = run_shard.RunShard(args.shard or os.path.join(tree, run_shard.SHARD_NAME), args.store,
+                                   export_dir=tree if args.export_files else None,
+                                   resume=not args.no_resume)
+        if shard.resumed:
+            print(f"[run_whisper] resuming {shard.path}: {shard.resumed} clips already done", file=sys.stderr)
+            files = (f for f in files if not shard.done(f))
+        sink = shard
+        emit = lambda infile, text, meta: write_shard(shard, args.mode, args.model, infile, text, meta,
+                                                      args.store_config)
+    else:
+        sink = results_store.ResultsWriter(args.store)
+        emit = lambda infile, text, meta: write_outputs(args.outdir, args.mode, args.model, infile, text,
+                                                        meta, sink, args.store_config)
 
-with open(os.path.join(outdir, outfile + ".txt"), "w", encoding="utf-8") as f:
-    f.write(text.strip())
+    # Audio is decoded in background processes ahead of the model
+    items = audio_loader.AudioPrefetcher(files, workers=args.decode_workers,
+                                         max_ready=max(16, 2 * args.batch_size), skip_errors=True)
+    stats = {"done": 0, "failed": 0, "audio": 0.0, "wall": 0.0}
+    t_run = time.time()
+    with sink:
+        if args.batch_size > 1:
+            run_batched(model, items, args, stats, emit)
+        else:
+            for item in items:
+                run_single(model, *item, args, stats, emit)
+    run_sec = time.time() - t_run
 
-meta = {
-    "model": args.model,
-    "mode": args.mode,
-    "language": language,
-    "duration_sec": duration,
-    **lid_meta
-}
+    rtf = (stats["wall"] / stats["audio"]) if stats["audio"] else 0.0
+    throughput = (stats["audio"] / run_sec) if run_sec else 0.0
+    print(f"✅ Completed {stats['done']} files ({stats['failed']} failed), "
+          f"audio {stats['audio']:.1f}s, processing {stats['wall']:.1f}s, RTF {rtf:.3f}, "
+          f"decode {items.decode_sec:.1f}s (background), "
+          f"model load {load_sec:.1f}s (excluded)", file=sys.stderr)
+    print(f"batch_size={args.batch_size}: {throughput:.2f} audio-sec per wall-sec", file=sys.stderr)
+    if args.mel_cache != "off":
+        print(f"mel cache: {mel_cache.stats()}", file=sys.stderr)
 
-with open(os.path.join(outdir, outfile + ".json"), "w", encoding="utf-8") as f:
-    json.dump(meta, f, indent=2, ensure_ascii=False)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
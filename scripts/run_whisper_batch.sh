@@ -11,25 +11,14 @@ echo "File list: $FILE_LIST"
 echo "Total files: $(wc -l < "$FILE_LIST")"
 echo ""
 
-count=0
-while IFS= read -r audio_file; do
-    # Extract language from path (data/wav/LANG/file.mp3)
-    lang=$(echo "$audio_file" | sed -E 's|.*/([a-z]{2})/[^/]+$|\1|')
-    
-    # Process
-    python scripts/run_whisper.py \
-        --mode hinted \
-        --model small \
-        --device cpu \
-        --infile "$audio_file" \
-        --outdir results/transcripts \
-        --hint-lang "$lang"
-    
-    count=$((count + 1))
-    if [ $((count % 50)) -eq 0 ]; then
-        echo "Processed $count files..."
-    fi
-done < "$FILE_LIST"
+# Model is loaded once; every file in the list is streamed through it
+# (language is taken from the data/wav/LANG/ folder of each path)
+python scripts/run_whisper.py \
+    --mode hinted \
+    --model small \
+    --device cpu \
+    --manifest "$FILE_LIST" \
+    --outdir results/transcripts
 
 echo ""
-echo "✅ Completed $count files"
+echo "✅ Completed $FILE_LIST"
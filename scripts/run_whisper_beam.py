@@ -1,7 +1,17 @@
 #!/usr/bin/env python
-"""Modified run_whisper.py with beam_size parameter for testing"""
+"""Modified run_whisper.py with beam_size parameter for testing
+
+lid2asr takes the language from one encoder pass (detect_language on the
+first 30 s window), applies the folder fallback on low confidence, and then
+decodes once with model.transcribe; the sidecar "timing" block breaks the
+work into encode / LID / decode. The final pass runs with Silero VAD as in
+the original script; --no-vad turns it off (not comparable to earlier runs).
+"""
 import argparse, os, json, time, pathlib, re
-from faster_whisper import WhisperModel
+import whisper_batch
+import mel_cache
+import results_store
+from model_registry import get_model
 
 LANG_RE = re.compile(r"/(mn|hu|fr|es)/", re.IGNORECASE)
 def guess_lang_from_path(path):
@@ -16,56 +26,53 @@ ap.add_argument("--hint-lang", help="Required if mode=hinted")
 ap.add_argument("--device", default="cpu", help='"cpu", "cuda", or "auto"')
 ap.add_argument("--outdir", default="results/transcripts")
 ap.add_argument("--beam-size", type=int, default=5, help="Beam size (1=greedy, 5=default)")
+ap.add_argument("--no-vad", dest="vad_filter", action="store_false",
+                help="Skip Silero VAD on the final pass (changes WER/timing vs. earlier results)")
+ap.add_argument("--mel-cache", choices=["off", "memory", "disk"], default=mel_cache.mode(),
+                help="Reuse log-mel features across model sizes (default: $ASR_MEL_CACHE or off)")
+ap.add_argument("--store", default=results_store.STORE_ROOT,
+                help='Columnar results store to append to (default: $ASR_RESULTS_STORE or results/store; "off" disables)')
 args = ap.parse_args()
+mel_cache.set_mode(args.mel_cache)
 
 if args.device == "cpu":
     os.environ["CT2_FORCE_CPU"] = "1"
 
 pathlib.Path(args.outdir).mkdir(parents=True, exist_ok=True)
-model = WhisperModel(args.model, device=args.device)
+model = get_model("whisper", args.model, args.device)
 
 language = None
 lid_meta = {}
 t0 = time.time()
 
+t_load = time.perf_counter()
+audio = whisper_batch.load_audio(model, args.infile)
+audio_load_sec = time.perf_counter() - t_load
+
 if args.mode == "hinted":
     assert args.hint_lang, "--hint-lang is required for hinted mode"
     language = args.hint_lang
-else:
-    tried = []
-    # LID attempt 1: VAD on
-    try:
-        tried.append("vad_filter=True")
-        segments, info = model.transcribe(args.infile, task="transcribe", without_timestamps=True, vad_filter=True, beam_size=args.beam_size)
-        language = getattr(info, "language", None)
-        lid_meta = {"lid_language": language, "lid_prob": getattr(info, "language_probability", None), "tried": tried}
-    except Exception:
-        language = None
-    # LID attempt 2: VAD off
-    if not language:
-        try:
-            tried.append("vad_filter=False")
-            segments, info = model.transcribe(args.infile, task="transcribe", without_timestamps=True, vad_filter=False, beam_size=args.beam_size)
-            language = getattr(info, "language", None)
-            lid_meta = {"lid_language": language, "lid_prob": getattr(info, "language_probability", None), "tried": tried}
-        except Exception:
-            language = None
-    # Fallbacks: low-confidence or unknown
-    lid_prob = (lid_meta.get("lid_prob") if isinstance(lid_meta, dict) else None)
+
+timing = {}
+if args.mode == "lid2asr":
+    lid_lang, lid_prob, timing = whisper_batch.detect_language_single(model, audio, args.infile)
+    lid_meta = {"lid_language": lid_lang, "lid_prob": lid_prob, "tried": ["detect_language"]}
+    language = lid_lang
+    # Fallback: low-confidence LID -> decode with the folder language
     folder_lang = guess_lang_from_path(args.infile)
-    if (lid_prob is not None and lid_prob < 0.60 and folder_lang):
+    if lid_prob is not None and lid_prob < 0.60 and folder_lang and folder_lang != lid_lang:
         language = folder_lang
-        lid_meta = {**lid_meta, "fallback": "folder_on_low_conf"}
-    if not language:
-        language = guess_lang_from_path(args.infile)
-        lid_meta = {"lid_language": language, "lid_prob": None, "tried": tried + ["fallback:folder"]}
+        lid_meta["fallback"] = "folder_on_low_conf"
 
-# Final ASR pass with beam_size parameter
-segments, info = model.transcribe(args.infile, task="transcribe", language=language, vad_filter=True, beam_size=args.beam_size)
-text = "".join(s.text for s in segments)
+result = whisper_batch.transcribe_single(model, audio, language=language,
+                                         beam_size=args.beam_size, vad_filter=args.vad_filter,
+                                         path=args.infile)
+result["timing"].update(timing)
+language = result["language"]
+text = result["text"]
 
 # Get audio duration
-duration_sec = getattr(info, "duration", None)
+duration_sec = result["audio_sec"]
 
 stem = os.path.splitext(os.path.basename(args.infile))[0]
 sysname = f"whisper-{args.model}"
@@ -78,15 +85,23 @@ with open(os.path.join(outbase, f"{stem}.txt"), "w", encoding="utf-8") as f:
 elapsed = round(time.time()-t0, 3)
 sidecar = {
   "file": args.infile, "system": sysname, "mode": args.mode,
-  "language_used": language, "avg_logprob": getattr(info, "avg_logprob", None),
+  "language_used": language,
   "elapsed_sec": elapsed,
   "duration_sec": duration_sec,
   "rtf": round(elapsed / duration_sec, 4) if duration_sec else None,
   "device": args.device,
-  "beam_size": args.beam_size
+  "beam_size": args.beam_size,
+  "vad_filter": args.vad_filter,
+  "timing": {"audio_load_sec": round(audio_load_sec, 4),
+             **{k: round(v, 4) for k, v in result["timing"].items()}}
 }
 sidecar.update(lid_meta)
 with open(os.path.join(outbase, f"{stem}.json"), "w", encoding="utf-8") as f:
     json.dump(sidecar, f, ensure_ascii=False, indent=2)
+# same config key as the original runner's sidecars, which always used VAD
+store_config = results_store.config_key({"beam_size": args.beam_size,
+                                         "vad_filter": None if args.vad_filter else False})
+with results_store.ResultsWriter(args.store) as store:
+    store.append(sidecar, model=args.model, transcript=text, config=store_config)
 
 print(f"Wrote: {outbase}/{stem}.txt")
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Persistent, incremental WER/CER scoring.
+
+Scores are cached in SQLite (ASR_SCORE_CACHE, default
+data/cache/scores.sqlite) keyed by
+
+    (hash(hypothesis), hash(reference), scoring.SCORER_VERSION)
+
+so re-running an evaluation only scores pairs that are new or changed;
+bumping SCORER_VERSION invalidates everything. Sidecar reads are cached
+too, keyed by the JSON's (and its .txt's) size and mtime, so unchanged
+model outputs are not re-parsed.
+
+Misses are scored in a process pool:
+
+    cache = ScoreCache()
+    results = cache.score([(ref, hyp), ...], workers=8)   # score_pair dicts / None
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from scoring import SCORER_VERSION, score_pair
+
+CACHE_PATH = os.environ.get("ASR_SCORE_CACHE", "data/cache/scores.sqlite")
+
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _score_safe(pair):
+    ref, hyp = pair
+    try:
+        return score_pair(ref, hyp)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _stat_key(*paths):
+    key = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            key.append(f"{st.st_size}:{st.st_mtime_ns}")
+        except OSError:
+            key.append("-")
+    return "|".join(key)
+
+
+class ScoreCache:
+    def __init__(self, path=CACHE_PATH, version=SCORER_VERSION):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.version = version
+        self.conn = sqlite3.connect(str(self.path), timeout=60)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            " hyp_hash TEXT, ref_hash TEXT, version TEXT, result TEXT,"
+            " PRIMARY KEY (hyp_hash, ref_hash, version))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sidecars (path TEXT PRIMARY KEY, stat TEXT, file_id TEXT, hypothesis TEXT)"
+        )
+        self.hits = self.misses = 0
+        self.score_sec = 0.0
+        self._sidecar_puts = []
+
+    # --- sidecars ------------------------------------------------------------
+
+    def read_sidecar(self, json_file):
+        """(file_id, hypothesis) for a model output JSON (hypothesis falls back to the .txt)"""
+        json_file = Path(json_file)
+        txt_file = json_file.with_suffix('.txt')
+        stat = _stat_key(json_file, txt_file)
+        row = self.conn.execute("SELECT stat, file_id, hypothesis FROM sidecars WHERE path = ?",
+                                (str(json_file),)).fetchone()
+        if row and row[0] == stat:
+            return row[1], row[2]
+
+        with open(json_file) as f:
+            data = json.load(f)
+        file_id = Path(data.get('file', '')).stem
+        hypothesis = data.get('transcript', '')
+        if not hypothesis and txt_file.exists():
+            with open(txt_file, 'r', encoding='utf-8') as f:
+                hypothesis = f.read().strip()
+        self._sidecar_puts.append((str(json_file), stat, file_id, hypothesis))
+        return file_id, hypothesis
+
+    # --- scores --------------------------------------------------------------
+
+    def _lookup(self, keys):
+        found = {}
+        uniq = list(dict.fromkeys(keys))
+        for i in range(0, len(uniq), 400):
+            chunk = uniq[i:i + 400]
+            q = ("SELECT hyp_hash, ref_hash, result FROM scores WHERE version = ? AND ("
+                 + " OR ".join(["(hyp_hash = ? AND ref_hash = ?)"] * len(chunk)) + ")")
+            args = [self.version] + [h for k in chunk for h in k]
+            for hh, rh, result in self.conn.execute(q, args):
+                found[(hh, rh)] = json.loads(result)
+        return found
+
+    def score(self, pairs, workers=None):
+        """score_pair() result (or None if unscorable) for each (reference, hypothesis)"""
+        keys = [(text_hash(hyp), text_hash(ref)) for ref, hyp in pairs]
+        found = self._lookup(keys)
+
+        todo = {}
+        for key, pair in zip(keys, pairs):
+            if key not in found and key not in todo:
+                todo[key] = pair
+        self.hits += len(pairs) - sum(1 for k in keys if k in todo)
+        self.misses += len(todo)
+
+        if todo:
+            t0 = time.time()
+            items = list(todo.items())
+            workers = workers or os.cpu_count() or 1
+            if workers > 1 and len(items) > 200:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(_score_safe, [p for _, p in items], chunksize=64))
+            else:
+                results = [_score_safe(p) for _, p in items]
+            self.score_sec += time.time() - t0
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)",
+                    [(k[0], k[1], self.version, json.dumps(r)) for (k, _), r in zip(items, results)],
+                )
+            found.update({k: r for (k, _), r in zip(items, results)})
+
+        self.flush()
+        return [found[k] for k in keys]
+
+    def flush(self):
+        if self._sidecar_puts:
+            with self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO sidecars VALUES (?, ?, ?, ?)", self._sidecar_puts)
+            self._sidecar_puts = []
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "score_sec": round(self.score_sec, 3)}
+
+    def close(self):
+        self.flush()
+        self.conn.close()
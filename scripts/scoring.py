@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Shared WER/CER scoring kernel.
+
+jiwer.wer + jiwer.cer + jiwer.compute_measures each re-run their transforms
+and alignment for every pair. score_pair() tokenizes once (words -> integer
+ids, characters -> code points), aligns words and characters with one
+edit-distance pass each, and returns hits/substitutions/deletions/insertions
+for both plus the jiwer measures.
+
+Results are identical to jiwer 3.x with its default transforms:
+  words  re.sub(r"\\s\\s+", " ") + strip + split(" ")   (wer_default)
+  chars  strip, every character incl. spaces            (cer_default)
+and the same alignment tie-breaking as rapidfuzz.Levenshtein.opcodes
+(common prefix/suffix removed first, then backtrace preferring deletion,
+insertion, substitution/match), so S/D/I splits match too. Empty
+references raise like jiwer does.
+
+Alignment uses rapidfuzz editops directly on the token ids (jiwer's own
+backend, minus its per-call transforms and result objects). Without
+rapidfuzz, a pure-Python kernel runs Hyyro's bit-parallel recurrence on
+Python ints (one big-int step per hypothesis token) and backtraces the same
+VP/VN matrix the same way, giving identical counts.
+"""
+
+import re
+
+try:
+    from rapidfuzz.distance import Levenshtein as _rf_levenshtein
+except ImportError:  # pure-Python kernel below gives the same counts
+    _rf_levenshtein = None
+
+# Bump when tokenization/normalization changes: cached scores (score_cache.py)
+# are keyed by it
+SCORER_VERSION = "jiwer3-default/1"
+
+_MULTI_SPACE = re.compile(r"\s\s+")
+_vocab = {}
+
+
+def words(text):
+    """jiwer wer_default tokenization"""
+    return [w for w in _MULTI_SPACE.sub(" ", text).strip().split(" ") if w]
+
+
+def chars(text):
+    """jiwer cer_default tokenization (a string is a sequence of characters)"""
+    return text.strip()
+
+
+def word_ids(tokens):
+    """Map words to stable integer ids (shared vocabulary for the process)"""
+    return [_vocab.setdefault(w, len(_vocab)) for w in tokens]
+
+
+def _bit_rows(ref, hyp):
+    """
+    Hyyro's bit-parallel Levenshtein: one (VP, VN) pair per hypothesis token,
+    bit i set where D[i+1][j] - D[i][j] is +1 / -1 (ref along the bits)
+    """
+    full = (1 << len(ref)) - 1
+    peq = {}
+    for i, tok in enumerate(ref):
+        peq[tok] = peq.get(tok, 0) | (1 << i)
+    get = peq.get
+    vp, vn = full, 0
+    vps, vns = [], []
+    for tok in hyp:
+        x = get(tok, 0)
+        d0 = (((x & vp) + vp) ^ vp) | x | vn
+        hp = ((vn | ~(d0 | vp)) << 1 | 1) & full
+        hn = (d0 & vp) << 1
+        vp = (hn | ~(d0 | hp)) & full
+        vn = hp & d0
+        vps.append(vp)
+        vns.append(vn)
+    return vps, vns
+
+
+def _python_counts(ref, hyp):
+    # common prefix / suffix are hits (and fixed in the alignment, as in rapidfuzz)
+    k = min(len(ref), len(hyp))
+    prefix = 0
+    while prefix < k and ref[prefix] == hyp[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < k - prefix and ref[-1 - suffix] == hyp[-1 - suffix]:
+        suffix += 1
+    ref, hyp = ref[prefix:len(ref) - suffix], hyp[prefix:len(hyp) - suffix]
+    n, m = len(ref), len(hyp)
+    hits = prefix + suffix
+    if n == 0 or m == 0:
+        return hits, 0, n, m
+
+    # backtrace as rapidfuzz does: deletion, else insertion, else diagonal
+    vps, vns = _bit_rows(ref, hyp)
+    subs = dels = ins = 0
+    col, row = n, m
+    while row and col:
+        if (vps[row - 1] >> (col - 1)) & 1:
+            dels += 1
+            col -= 1
+            continue
+        row -= 1
+        if row and (vns[row - 1] >> (col - 1)) & 1:
+            ins += 1
+        else:
+            col -= 1
+            if ref[col] != hyp[row]:
+                subs += 1
+            else:
+                hits += 1
+    return hits, subs, dels + col, ins + row
+
+
+def _rapidfuzz_counts(ref, hyp):
+    subs = dels = ins = 0
+    for op in _rf_levenshtein.editops(ref, hyp).as_list():
+        tag = op[0]
+        if tag == "replace":
+            subs += 1
+        elif tag == "delete":
+            dels += 1
+        else:
+            ins += 1
+    return len(ref) - subs - dels, subs, dels, ins
+
+
+def align_counts(ref, hyp):
+    """(hits, substitutions, deletions, insertions) for two token sequences"""
+    if _rf_levenshtein is not None:
+        return _rapidfuzz_counts(ref, hyp)
+    return _python_counts(ref, hyp)
+
+
+def score_pair(reference, hypothesis):
+    """
+    Word and character alignment counts plus jiwer measures for one pair:
+    wer, mer, wil, wip, hits, substitutions, deletions, insertions,
+    cer, char_hits, char_substitutions, char_deletions, char_insertions,
+    ref_words, hyp_words, ref_chars, hyp_chars
+    """
+    ref_w, hyp_w = words(reference), words(hypothesis)
+    if not ref_w:
+        raise ValueError("one or more references are empty strings")
+    H, S, D, I = align_counts(word_ids(ref_w), word_ids(hyp_w))
+    ref_c, hyp_c = chars(reference), chars(hypothesis)
+    cH, cS, cD, cI = align_counts(ref_c, hyp_c)
+
+    wip = (H / len(ref_w)) * (H / len(hyp_w)) if len(hyp_w) >= 1 else 0
+    return {
+        "wer": float(S + D + I) / float(H + S + D),
+        "mer": float(S + D + I) / float(H + S + D + I),
+        "wil": 1 - wip,
+        "wip": wip,
+        "hits": H,
+        "substitutions": S,
+        "deletions": D,
+        "insertions": I,
+        "cer": float(cS + cD + cI) / float(cH + cS + cD),
+        "char_hits": cH,
+        "char_substitutions": cS,
+        "char_deletions": cD,
+        "char_insertions": cI,
+        "ref_words": len(ref_w),
+        "hyp_words": len(hyp_w),
+        "ref_chars": len(ref_c),
+        "hyp_chars": len(hyp_c),
+    }
+
+
+def wer_cer(reference, hypothesis):
+    """(wer, cer) for one pair - drop-in for jiwer.wer / jiwer.cer"""
+    r = score_pair(reference, hypothesis)
+    return r["wer"], r["cer"]
+
+
+def verify(csv_paths):
+    """Re-score every (reference, hypothesis) row of results CSVs with jiwer and this kernel"""
+    import csv
+    import time
+    import warnings
+
+    import jiwer
+
+    warnings.filterwarnings("ignore", category=DeprecationWarning)
+    keys = ["wer", "mer", "wil", "wip", "hits", "substitutions", "deletions", "insertions"]
+    n = mismatches = 0
+    t_jiwer = t_kernel = 0.0
+    for path in csv_paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        if not rows or not {"reference", "hypothesis"} <= set(rows[0]):
+            continue
+        for row in rows:
+            ref, hyp = row["reference"], row["hypothesis"]
+            t0 = time.perf_counter()
+            try:
+                m = jiwer.compute_measures(ref, hyp)
+                expected = tuple(m[k] for k in keys) + (jiwer.cer(ref, hyp),)
+            except (ValueError, ZeroDivisionError) as e:
+                expected = type(e)
+            t1 = time.perf_counter()
+            try:
+                r = score_pair(ref, hyp)
+                got = tuple(r[k] for k in keys) + (r["cer"],)
+            except (ValueError, ZeroDivisionError) as e:
+                got = type(e)
+            t_kernel += time.perf_counter() - t1
+            t_jiwer += t1 - t0
+            n += 1
+            if got != expected:
+                mismatches += 1
+                print(f"MISMATCH {path}: {ref!r} / {hyp!r}\n  jiwer  {expected}\n  kernel {got}")
+    print(f"{n} pairs, {mismatches} mismatches; jiwer {t_jiwer:.2f}s, kernel {t_kernel:.2f}s")
+    return mismatches
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import sys
+
+    ap = argparse.ArgumentParser(description="Check the scoring kernel against jiwer")
+    ap.add_argument("--verify", nargs="+", default=["results/**/*.csv"],
+                    help="Results CSVs (globs) with reference/hypothesis columns")
+    args = ap.parse_args()
+    paths = sorted({p for pattern in args.verify for p in glob.glob(pattern, recursive=True)})
+    sys.exit(1 if verify(paths) else 0)
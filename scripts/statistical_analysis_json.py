@@ -9,16 +9,21 @@ import numpy as np
 from scipy import stats
 from pathlib import Path
 
-def load_json_results(results_dir='results/transcripts'):
-    """Load all JSON results"""
-    print("="*60)
-    print("Loading JSON experiment results...")
-    print("="*60)
-    
+import results_store
+
+def load_store_results():
+    """Timed rows from the results store (processing_time_sec reported as elapsed_sec)"""
+    df = results_store.load(['file', 'language', 'mode', 'system', 'model', 'config', 'processing_time_sec',
+                             'device'], filters={'language': ['mn', 'hu', 'es', 'fr'], 'mode': ['hinted', 'lid2asr']})
+    df = results_store.one_config(df[df['processing_time_sec'].notna()]).drop(columns=['model', 'config'])
+    df['file'] = df['file'].map(lambda f: Path(f).name)
+    df = df.rename(columns={'processing_time_sec': 'elapsed_sec'})
+    return df.fillna({'mode': 'unknown', 'system': 'unknown', 'device': 'unknown'}).to_dict('records')
+
+def load_sidecar_results(results_dir):
+    """Rows from the per-file JSON sidecars"""
     results = []
-    results_path = Path(results_dir)
-    
-    for json_file in results_path.rglob('*.json'):
+    for json_file in Path(results_dir).rglob('*.json'):
         try:
             with open(json_file) as f:
                 data = json.load(f)
@@ -50,6 +55,19 @@ def load_json_results(results_dir='results/transcripts'):
             print(f"  Warning: Could not process {json_file.name}: {e}")
             continue
     
+    return results
+
+def load_json_results(results_dir='results/transcripts'):
+    """Load all JSON results (from the results store when it has data)"""
+    print("="*60)
+    print("Loading JSON experiment results...")
+    print("="*60)
+    
+    if results_store.available():
+        results = load_store_results()
+    else:
+        results = load_sidecar_results(results_dir)
+    
     if not results:
         print("\n❌ No results found!")
         return None
@@ -2,15 +2,73 @@
 """
 Optimized beam search comparison - loads model ONCE
 Processes all files with the same model instance
+
+--batch-sizes > 1 decodes several clips per encoder/decoder call
+(whisper_batch.py) and reports throughput in audio-sec per wall-sec.
 """
 
 import argparse
 import time
 from pathlib import Path
-from faster_whisper import WhisperModel
 import json
+from model_registry import get_model
+import whisper_batch
+import mel_cache
+
+def run_sequential(model, audio_files, lang_code, beam_size):
+    """One model.transcribe call per file. Returns [(file, time, audio_sec)]"""
+    results = []
+    for i, audio_file in enumerate(audio_files, 1):
+        start = time.time()
+        
+        # Transcribe with specified beam size
+        segments, info = model.transcribe(
+            str(audio_file),
+            language=lang_code,
+            beam_size=beam_size,
+            vad_filter=False
+        )
+        
+        # Consume segments (needed for timing)
+        _ = list(segments)
+        
+        results.append((audio_file.name, time.time() - start, info.duration))
+        
+        # Progress updates
+        if i % 100 == 0:
+            avg = sum(r[1] for r in results) / i
+            print(f"  Processed {i}/{len(audio_files)} files... (avg: {avg:.3f}s per file)")
+    return results
+
 
-def process_language(lang_code, model_name, beam_sizes, device, audio_dir, output_dir):
+def run_batched(model, audio_files, lang_code, beam_size, batch_size):
+    """batch_size clips per encoder/decoder call. Returns [(file, time, audio_sec)]"""
+    results = []
+    for batch in whisper_batch.iter_batches(audio_files, batch_size):
+        start = time.time()
+        audios = [whisper_batch.load_audio(model, str(f)) for f in batch]
+        short = [(f, a) for f, a in zip(batch, audios) if whisper_batch.fits_one_window(model, a)]
+        decode_time = time.time() - start
+        
+        if short:
+            out, model_time = whisper_batch.transcribe_batch(
+                model, [a for _, a in short], [lang_code] * len(short), beam_size=beam_size,
+                paths=[str(f) for f, _ in short]
+            )
+            whisper_batch.amortize(out, decode_time + model_time)
+            results.extend((f.name, r["elapsed_sec"], r["audio_sec"]) for (f, _), r in zip(short, out))
+        
+        # Clips longer than one 30 s window go through the sequential path
+        long_files = [f for f, a in zip(batch, audios) if not whisper_batch.fits_one_window(model, a)]
+        results.extend(run_sequential(model, long_files, lang_code, beam_size))
+        
+        if len(results) % 100 < batch_size:
+            avg = sum(r[1] for r in results) / len(results)
+            print(f"  Processed {len(results)}/{len(audio_files)} files... (avg: {avg:.3f}s per file)")
+    return results
+
+
+def process_language(lang_code, model_name, beam_sizes, device, audio_dir, output_dir, batch_sizes=(1,)):
     """Process all files for a language with both beam sizes"""
     
     audio_files = sorted(Path(audio_dir).glob(f"{lang_code}/*.mp3"))
@@ -22,61 +80,43 @@ def process_language(lang_code, model_name, beam_sizes, device, audio_dir, outpu
     print(f"Processing {lang_code.upper()} - {len(audio_files)} files")
     print(f"{'='*50}")
     
-    # Load model ONCE
-    print(f"Loading Whisper {model_name} model on {device}...")
-    model = WhisperModel(model_name, device=device)
-    print("✓ Model loaded\n")
+    # Loaded once for all languages (model registry)
+    model = get_model("whisper", model_name, device)
     
     for beam_size in beam_sizes:
-        mode_name = "greedy" if beam_size == 1 else f"beam{beam_size}"
-        print(f"\n--- Testing beam_size={beam_size} ({mode_name}) ---")
-        
-        output_file = Path(output_dir) / f"{lang_code}_beam{beam_size}.txt"
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        
-        results = []
-        total_time = 0
-        
-        for i, audio_file in enumerate(audio_files, 1):
-            start = time.time()
+        for batch_size in batch_sizes:
+            mode_name = "greedy" if beam_size == 1 else f"beam{beam_size}"
+            print(f"\n--- Testing beam_size={beam_size} ({mode_name}), batch_size={batch_size} ---")
             
-            # Transcribe with specified beam size
-            segments, info = model.transcribe(
-                str(audio_file),
-                language=lang_code,
-                beam_size=beam_size,
-                vad_filter=False
-            )
+            suffix = "" if batch_size == 1 else f"_bs{batch_size}"
+            output_file = Path(output_dir) / f"{lang_code}_beam{beam_size}{suffix}.txt"
+            output_file.parent.mkdir(parents=True, exist_ok=True)
             
-            # Consume segments (needed for timing)
-            _ = list(segments)
+            wall_start = time.time()
+            if batch_size == 1:
+                results = run_sequential(model, audio_files, lang_code, beam_size)
+            else:
+                results = run_batched(model, audio_files, lang_code, beam_size, batch_size)
+            wall_time = time.time() - wall_start
             
-            elapsed = time.time() - start
-            total_time += elapsed
+            total_time = sum(r[1] for r in results)
+            audio_total = sum(r[2] for r in results)
+            throughput = audio_total / wall_time if wall_time > 0 else 0.0
             
-            results.append({
-                'file': audio_file.name,
-                'time': elapsed
-            })
+            # Save results
+            with open(output_file, 'w') as f:
+                for name, elapsed, _ in results:
+                    f.write(f"{name},{elapsed:.6f}\n")
+                
+                # Summary line (throughput = audio-sec per wall-sec)
+                avg_time = total_time / len(results)
+                f.write(f"SUMMARY,{len(results)},{total_time:.6f},{avg_time:.6f},{batch_size},{throughput:.4f}\n")
             
-            # Progress updates
-            if i % 100 == 0:
-                avg = total_time / i
-                print(f"  Processed {i}/{len(audio_files)} files... (avg: {avg:.3f}s per file)")
-        
-        # Save results
-        with open(output_file, 'w') as f:
-            for r in results:
-                f.write(f"{r['file']},{r['time']:.6f}\n")
-            
-            # Summary line
-            avg_time = total_time / len(results)
-            f.write(f"SUMMARY,{len(results)},{total_time:.6f},{avg_time:.6f}\n")
-        
-        print(f"✓ Completed {len(results)} files")
-        print(f"  Total time: {total_time:.2f}s")
-        print(f"  Average: {avg_time:.3f}s per file")
-        print(f"  Saved: {output_file}")
+            print(f"✓ Completed {len(results)} files")
+            print(f"  Total time: {total_time:.2f}s")
+            print(f"  Average: {avg_time:.3f}s per file")
+            print(f"  Throughput: {throughput:.2f} audio-sec per wall-sec (batch_size={batch_size})")
+            print(f"  Saved: {output_file}")
 
 
 def main():
@@ -86,6 +126,8 @@ def main():
     parser.add_argument('--model', default='small', help='Whisper model size')
     parser.add_argument('--beam-sizes', nargs='+', type=int, default=[1, 5],
                       help='Beam sizes to test')
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1],
+                      help='Clips per encoder/decoder call (1=sequential)')
     parser.add_argument('--device', default='cpu', choices=['cpu', 'cuda'],
                       help='Device for inference')
     parser.add_argument('--audio-dir', default='data/wav',
@@ -93,7 +135,11 @@ def main():
     parser.add_argument('--output-dir', default='results/beam_comparison',
                       help='Output directory for results')
     
+    parser.add_argument('--mel-cache', choices=['off', 'memory', 'disk'], default=mel_cache.mode(),
+                      help='Reuse log-mel features across beam/batch settings and model sizes (batched path)')
+    
     args = parser.parse_args()
+    mel_cache.set_mode(args.mel_cache)
     
     start_time = time.time()
     
@@ -103,6 +149,7 @@ def main():
     print(f"Languages: {', '.join(args.languages)}")
     print(f"Model: {args.model}")
     print(f"Beam sizes: {args.beam_sizes}")
+    print(f"Batch sizes: {args.batch_sizes}")
     print(f"Device: {args.device}")
     print(f"Estimated time: ~2-3 hours (loads model once per language)")
     print("="*60)
@@ -114,7 +161,8 @@ def main():
             beam_sizes=args.beam_sizes,
             device=args.device,
             audio_dir=args.audio_dir,
-            output_dir=args.output_dir
+            output_dir=args.output_dir,
+            batch_sizes=args.batch_sizes
         )
     
     total_time = time.time() - start_time
@@ -126,18 +174,25 @@ def main():
     print("="*60)
     print(f"Total time: {hours}h {minutes}m")
     print(f"Results saved in: {args.output_dir}/")
+    if args.mel_cache != 'off':
+        st = mel_cache.stats()
+        print(f"Mel cache: {st['hits']} hits, {st['misses']} misses, ~{st['saved_sec_est']:.1f}s feature extraction saved")
     
     # Print summary
     for lang in args.languages:
         for beam in args.beam_sizes:
-            result_file = Path(args.output_dir) / f"{lang}_beam{beam}.txt"
-            if result_file.exists():
-                with open(result_file) as f:
-                    summary = [line for line in f if line.startswith('SUMMARY')]
-                    if summary:
-                        parts = summary[0].strip().split(',')
-                        print(f"  {lang} beam={beam}: {parts[1]} files, avg={float(parts[3]):.3f}s")
-
+            for bs in args.batch_sizes:
+                suffix = "" if bs == 1 else f"_bs{bs}"
+                result_file = Path(args.output_dir) / f"{lang}_beam{beam}{suffix}.txt"
+                if result_file.exists():
+                    with open(result_file) as f:
+                        summary = [line for line in f if line.startswith('SUMMARY')]
+                        if summary:
+                            parts = summary[0].strip().split(',')
+                            line = f"  {lang} beam={beam} batch={bs}: {parts[1]} files, avg={float(parts[3]):.3f}s"
+                            if len(parts) > 5:
+                                line += f", {float(parts[5]):.2f} audio-s/wall-s"
+                            print(line)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Character n-gram inverted index for fuzzy sentence lookup.
+
+Scoring a hypothesis against every TSV sentence with SequenceMatcher is
+O(files x sentences). The index shortlists the k sentences sharing the
+most character trigrams with the hypothesis (Dice coefficient over gram
+sets, computed with one np.bincount over the posting lists); only those
+are scored exactly.
+
+    index = NgramIndex(normalized_sentences)
+    for idx, dice in index.top_k(normalized_hyp, k=20):
+        ...
+"""
+
+from collections import defaultdict
+
+import numpy as np
+
+
+def char_ngrams(text, n=3):
+    """Set of character n-grams of text padded with one space on each side"""
+    padded = f" {text} "
+    if len(padded) < n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class NgramIndex:
+    def __init__(self, texts, n=3):
+        self.n = n
+        self.texts = list(texts)
+        postings = defaultdict(list)
+        self.sizes = np.zeros(len(self.texts), dtype=np.int32)
+        for i, text in enumerate(self.texts):
+            grams = char_ngrams(text, n)
+            self.sizes[i] = len(grams)
+            for g in grams:
+                postings[g].append(i)
+        self.postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.texts)
+
+    def dice(self, query):
+        """Dice coefficient of query's gram set with every indexed text (dense array)"""
+        grams = char_ngrams(query, self.n)
+        hits = [self.postings[g] for g in grams if g in self.postings]
+        if not hits:
+            return np.zeros(len(self.texts), dtype=np.float32)
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.texts))
+        return 2.0 * shared / (len(grams) + self.sizes)
+
+    def top_k(self, query, k=20, exclude=None):
+        """[(idx, dice)] of the k best candidates, best first, skipping indices in exclude"""
+        scores = self.dice(query)
+        if exclude:
+            scores[list(exclude)] = -1.0
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Globally optimal one-to-one assignment of model transcripts to TSV sentences.
+
+Greedy matching in file order lets an early bad match take the sentence a
+later file needs. Here every file gets a shortlist of candidate sentences
+from the trigram index (text_index.py), each candidate is scored exactly
+(SequenceMatcher ratio), and the sparse file x sentence score graph is
+solved as a minimum-cost bipartite matching
+(scipy.sparse.csgraph.min_weight_full_bipartite_matching, LAPJV on the
+sparse graph). Each file also has a private "unmatched" column costing
+as much as a match at min_score, so weak files stay unmatched rather than
+forcing a bad pairing.
+
+    rows = assign_references(hypotheses, sentences, k=20, min_score=0.5)
+    # rows[i]: tsv_index (-1 = unmatched), score, best_score, margin, top_choice, ...
+"""
+
+from difflib import SequenceMatcher
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+from text_index import NgramIndex
+
+EPS = 1e-6  # keeps every edge weight > 0 (zeros would be dropped from the sparse graph)
+
+
+def candidate_scores(hypotheses, sentences, k=20, min_score=0.5, index=None):
+    """Per hypothesis {sentence_idx: ratio} for shortlisted candidates scoring > min_score"""
+    index = index or NgramIndex(sentences)
+    out = []
+    sm = SequenceMatcher(None)
+    for hyp in hypotheses:
+        if k:
+            shortlist = [i for i, _ in index.top_k(hyp, k)]
+        else:
+            shortlist = range(len(sentences))
+        sm.set_seq1(hyp)
+        scores = {}
+        for idx in shortlist:
+            sm.set_seq2(sentences[idx])
+            if sm.real_quick_ratio() <= min_score or sm.quick_ratio() <= min_score:
+                continue
+            score = sm.ratio()
+            if score > min_score:
+                scores[idx] = score
+        out.append(scores)
+    return out
+
+
+def solve_assignment(cands, n_sentences, min_score=0.5):
+    """Maximum-total-score one-to-one assignment; returns sentence index per hypothesis (-1 = none)"""
+    n = len(cands)
+    if n == 0:
+        return []
+    rows, cols, weights = [], [], []
+    for i, scores in enumerate(cands):
+        for j, s in scores.items():
+            rows.append(i); cols.append(j); weights.append(1.0 + EPS - s)
+        rows.append(i); cols.append(n_sentences + i); weights.append(1.0 + EPS - min_score)
+    graph = csr_matrix((weights, (rows, cols)), shape=(n, n_sentences + n))
+    row_ind, col_ind = min_weight_full_bipartite_matching(graph)
+    assigned = np.full(n, -1, dtype=np.int64)
+    for r, c in zip(row_ind, col_ind):
+        if c < n_sentences:
+            assigned[r] = c
+    return assigned.tolist()
+
+
+def assign_references(hypotheses, sentences, k=20, min_score=0.5):
+    """
+    One row per hypothesis:
+      tsv_index    assigned sentence (-1 = unmatched)
+      score        ratio with the assigned sentence
+      best_score   best ratio among its candidates
+      margin       score minus the runner-up candidate's score (confidence)
+      top_choice   False if its best candidate went to another file
+      n_candidates candidates above min_score
+    """
+    cands = candidate_scores(hypotheses, sentences, k, min_score)
+    assigned = solve_assignment(cands, len(sentences), min_score)
+    rows = []
+    for scores, idx in zip(cands, assigned):
+        ranked = sorted(scores.values(), reverse=True)
+        best = ranked[0] if ranked else 0.0
+        score = scores.get(idx, 0.0)
+        others = [s for j, s in scores.items() if j != idx]
+        rows.append({
+            "tsv_index": idx,
+            "score": score,
+            "best_score": best,
+            "margin": score - max(others, default=0.0) if idx >= 0 else 0.0,
+            "top_choice": idx >= 0 and score >= best,
+            "n_candidates": len(scores),
+        })
+    return rows
+
+
+def write_confidence_report(path, file_ids, hypotheses, sentences, rows):
+    """CSV with one line per file: assignment, score, margin and flags"""
+    import csv
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["file_id", "tsv_index", "score", "best_score", "margin",
+                    "top_choice", "n_candidates", "hypothesis", "reference"])
+        for fid, hyp, r in zip(file_ids, hypotheses, rows):
+            ref = sentences[r["tsv_index"]] if r["tsv_index"] >= 0 else ""
+            w.writerow([fid, r["tsv_index"], f"{r['score']:.4f}", f"{r['best_score']:.4f}",
+                        f"{r['margin']:.4f}", int(r["top_choice"]), r["n_candidates"], hyp, ref])
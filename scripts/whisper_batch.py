@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Cross-clip batched decoding for faster-whisper.
+
+model.transcribe() handles one clip at a time, which leaves most CPU cores
+idle on 3-6 s Common Voice clips. Here several clips are each padded to one
+30 s mel window, stacked, and pushed through a single encoder call and a
+single CTranslate2 generate() call (the same mechanism faster-whisper's
+BatchedInferencePipeline uses for chunks of one long file).
+
+generate() here is a single greedy/beam pass: unlike model.transcribe() it
+has no temperature fallback and no compression-ratio / log-prob checks, so
+batched WER is not directly comparable to per-file runs. Clips longer than
+one window are not batched; transcribe_single() handles one clip of any
+length through model.transcribe() and is what the per-file runners use.
+"""
+
+import time
+
+import numpy as np
+from faster_whisper.audio import pad_or_trim
+from faster_whisper.tokenizer import Tokenizer
+
+import audio_loader
+import mel_cache
+
+WINDOW_SEC = 30.0
+
+
+def load_audio(model, path):
+    """Decode a file to 16 kHz mono float32 (Whisper's rate), via the decoded-audio cache"""
+    return audio_loader.decode_16k(path)[0]
+
+
+def fits_one_window(model, audio):
+    return len(audio) <= WINDOW_SEC * model.feature_extractor.sampling_rate
+
+
+def iter_batches(items, batch_size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def encode_batch(model, audios, paths=None):
+    """
+    Log-mel + encoder for a list of <=30 s waveforms. Returns encoder output.
+    With paths, features come from the mel cache when enabled (mel_cache.py).
+    """
+    paths = paths or [None] * len(audios)
+    feats = np.stack([
+        pad_or_trim(mel_cache.features(model, a, p)) for a, p in zip(audios, paths)
+    ]).astype(np.float32)
+    return model.encode(feats)
+
+
+def detect_languages(model, encoder_output):
+    """Batched LID on encoder output. Returns [(language, probability), ...]"""
+    results = model.model.detect_language(encoder_output)
+    out = []
+    for res in results:
+        token, prob = res[0]
+        out.append((token[2:-2], prob))
+    return out
+
+
+def generate_batch(model, encoder_output, languages, beam_size=1):
+    """Decode a whole encoded batch in one generate() call (one prompt per clip)"""
+    tokenizers = [
+        Tokenizer(model.hf_tokenizer, model.model.is_multilingual,
+                  task="transcribe", language=lang)
+        for lang in languages
+    ]
+    prompts = [
+        model.get_prompt(tok, previous_tokens=[], without_timestamps=True)
+        for tok in tokenizers
+    ]
+    results = model.model.generate(
+        encoder_output,
+        prompts,
+        beam_size=beam_size,
+        max_length=model.max_length,
+        suppress_blank=True,
+        suppress_tokens=[-1],
+    )
+    return [tok.decode(res.sequences_ids[0]).strip() for tok, res in zip(tokenizers, results)]
+
+
+def transcribe_batch(model, audios, languages=None, beam_size=1, paths=None):
+    """
+    Transcribe a batch of <=30 s waveforms in one encoder/decoder pass.
+
+    languages: list of language codes, or None entries to run batched LID
+    on the same encoder output first.
+
+    Returns (results, wall_sec) where results is a list of dicts with
+    'text', 'language', 'language_probability', 'audio_sec' and a batch-level
+    'timing' breakdown (encode_sec / lid_sec / decode_sec).
+    """
+    sr = model.feature_extractor.sampling_rate
+    languages = list(languages) if languages else [None] * len(audios)
+    timing = {"encode_sec": 0.0, "lid_sec": 0.0, "decode_sec": 0.0}
+
+    t0 = time.perf_counter()
+    encoder_output = encode_batch(model, audios, paths)
+    timing["encode_sec"] = time.perf_counter() - t0
+
+    probs = [None] * len(audios)
+    if any(lang is None for lang in languages):
+        t0 = time.perf_counter()
+        detected = detect_languages(model, encoder_output)
+        for i, (lang, prob) in enumerate(detected):
+            if languages[i] is None:
+                languages[i] = lang
+                probs[i] = prob
+        timing["lid_sec"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    texts = generate_batch(model, encoder_output, languages, beam_size=beam_size)
+    timing["decode_sec"] = time.perf_counter() - t0
+    wall_sec = sum(timing.values())
+
+    results = [
+        {
+            "text": text,
+            "language": lang,
+            "language_probability": prob,
+            "audio_sec": len(audio) / sr,
+            "timing": dict(timing),
+        }
+        for text, lang, prob, audio in zip(texts, languages, probs, audios)
+    ]
+    return results, wall_sec
+
+
+def detect_language_single(model, audio, path=None):
+    """
+    LID for one waveform from the encoder output of its first 30 s window
+    (features via the mel cache when path is given).
+
+    Returns (language, probability, timing) with encode_sec / lid_sec.
+    """
+    sr = model.feature_extractor.sampling_rate
+    timing = {"encode_sec": 0.0, "lid_sec": 0.0}
+    t0 = time.perf_counter()
+    encoder_output = encode_batch(model, [audio[: int(WINDOW_SEC * sr)]], [path])
+    timing["encode_sec"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    language, prob = detect_languages(model, encoder_output)[0]
+    timing["lid_sec"] = time.perf_counter() - t0
+    return language, prob, timing
+
+
+def transcribe_single(model, audio, language=None, beam_size=1, vad_filter=False, path=None):
+    """
+    LID + ASR for one waveform of any length.
+
+    language=None first runs detect_language_single. The transcript always
+    comes from model.transcribe on the already-decoded array with the
+    language fixed, so hinted and lid2asr clips get the same decoding
+    (temperature fallback, compression-ratio / log-prob checks) and differ
+    only in where the language came from. model.transcribe computes its own
+    features and encoder output; its time is reported as decode_sec.
+
+    Returns a dict like transcribe_batch results plus 'elapsed_sec'.
+    """
+    timing = {"encode_sec": 0.0, "lid_sec": 0.0, "decode_sec": 0.0}
+    prob = None
+    if language is None:
+        language, prob, lid_timing = detect_language_single(model, audio, path)
+        timing.update(lid_timing)
+
+    t0 = time.perf_counter()
+    segments, _ = model.transcribe(audio, language=language, beam_size=beam_size,
+                                   vad_filter=vad_filter)
+    text = "".join(s.text for s in segments).strip()
+    timing["decode_sec"] = time.perf_counter() - t0
+
+    return {
+        "text": text,
+        "language": language,
+        "language_probability": prob,
+        "audio_sec": len(audio) / model.feature_extractor.sampling_rate,
+        "timing": timing,
+        "elapsed_sec": sum(timing.values()),
+    }
+
+
+def amortize(results, wall_sec):
+    """Attribute batch wall time (and stage timings) to each clip in proportion to its duration"""
+    total_audio = sum(r["audio_sec"] for r in results) or 1.0
+    for r in results:
+        share = r["audio_sec"] / total_audio
+        r["elapsed_sec"] = wall_sec * share
+        if "timing" in r:
+            r["timing"] = {k: v * share for k, v in r["timing"].items()}
+        r["rtf"] = (r["elapsed_sec"] / r["audio_sec"]) if r["audio_sec"] else None
+    return results
@@ -1,8 +1,11 @@
-import os, sys, json, glob, shlex, subprocess
+import os, sys, json, glob
 from pathlib import Path
 from transformers import pipeline
 
 ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+import audio_loader
+
 IN_DIR = ROOT / "data" / "wav"
 OUT_DIR = ROOT / "experiments" / "whisper_tiny"
 OUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -10,12 +13,10 @@ OUT_FP = OUT_DIR / "preds.jsonl"
 
 MODEL_ID = os.environ.get("ASR_MODEL", "openai/whisper-tiny")
 
-def ensure_wav16k(file_path: Path) -> Path:
+def pred_key(file_path: Path) -> str:
+    # preds/refs are keyed by the name of the old ffmpeg output (<stem>_16k.wav)
     file_path = file_path.resolve()
-    out = file_path.with_suffix("").with_name(file_path.stem + "_16k.wav")
-    cmd = f'ffmpeg -y -i {shlex.quote(str(file_path))} -ar 16000 -ac 1 {shlex.quote(str(out))}'
-    subprocess.run(cmd, shell=True, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    return out
+    return str(file_path.with_suffix("").with_name(file_path.stem + "_16k.wav"))
 
 def main():
     files = []
@@ -26,20 +27,23 @@ def main():
         print(f"No audio found in {IN_DIR}")
         sys.exit(0)
 
-    print(f"Found {len(files)} file(s). Preparing WAVs…")
-    wavs = [ensure_wav16k(Path(f)) for f in files]
-
+    print(f"Found {len(files)} file(s).")
     print(f"Loading ASR model: {MODEL_ID}")
     asr = pipeline("automatic-speech-recognition", model=MODEL_ID, device=-1)
 
+    # 16 kHz mono arrays are decoded in parallel while the model runs
     with open(OUT_FP, "w", encoding="utf-8") as w:
-        for wp in wavs:
-            try:
-                text = asr(str(wp))["text"]
-            except Exception as e:
-                text = f"<<ERROR {e}>>"
-            w.write(json.dumps({"audio": str(wp), "text": text}, ensure_ascii=False) + "\n")
-            print(f"✓ {wp}")
+        for f, audio, info in audio_loader.AudioPrefetcher(files, skip_errors=True):
+            key = pred_key(Path(f))
+            if audio is None:
+                text = f"<<ERROR {info}>>"
+            else:
+                try:
+                    text = asr({"raw": audio, "sampling_rate": audio_loader.SAMPLE_RATE})["text"]
+                except Exception as e:
+                    text = f"<<ERROR {e}>>"
+            w.write(json.dumps({"audio": key, "source": f, "text": text}, ensure_ascii=False) + "\n")
+            print(f"✓ {f}")
 
     print(f"\nWrote predictions → {OUT_FP}")
 